@@ -69,7 +69,7 @@ export class BroadcastHandler {
 
         // Video Frame Relay (Phase 8 - Binary 60fps)
         // High-frequency, low-latency relay using Volatile Events (UDP-like)
-        socket.on('video_frame', (data: { sessionId: string; image: Buffer }) => {
+        socket.on('video_frame', (data: { sessionId: string; image: Buffer }, ack?: () => void) => {
             if (data && data.sessionId && data.image) {
                 // Volatile: If client can't keep up, drop the packet. Don't buffer.
                 // Binary: 'image' is now a Buffer (raw JPEG bytes)
@@ -79,6 +79,8 @@ export class BroadcastHandler {
                     timestamp: Date.now()
                 });
             }
+            // Relay agents time the round trip of this ack to adapt fps/quality to the uplink
+            if (typeof ack === 'function') ack();
         });
 
         // Voice generation request from relay (ElevenLabs TTS)
@@ -0,0 +1,245 @@
+"""
+PitBox Relay Agent - Adaptive Video Controller
+Congestion control for the live video feed.
+
+VideoEncoder used to push a JPEG at VIDEO_FPS whether or not the uplink
+kept up, so a slow connection just built latency. The controller watches
+two signals:
+
+  - send backlog: packets queued in the Socket.IO client but not yet written
+  - ack timing:   round trip of server acks for video frames (if the server acks;
+                  acks stop being requested after ACK_PROBE_FRAMES without one,
+                  since the Socket.IO client keeps every pending callback)
+
+and moves along a quality ladder: down one rung immediately on congestion
+(at most once per DOWN_COOLDOWN_S), up one rung only after the link has
+stayed clear for a hold time that doubles each time a step up is followed
+by congestion.
+
+Frames whose content barely changed since the last sent frame are skipped
+(a cheap mean-absolute-difference check on a tiny grayscale thumbnail),
+with a forced refresh every MAX_SKIP_S so the dashboard never looks frozen.
+"""
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OperatingPoint:
+    """What the live feed is currently sending."""
+    rung: int
+    fps: int
+    width: int
+    height: int
+    quality: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# (fps scale, resolution scale, quality delta) relative to the configured maximum
+LADDER_STEPS = [
+    (1.0,  1.0,  0),
+    (0.5,  1.0,  0),
+    (0.5,  1.0, -15),
+    (0.33, 0.75, -15),
+    (0.25, 0.75, -25),
+    (0.17, 0.5, -30),
+    (0.08, 0.5, -35),
+]
+
+MIN_FPS = 2
+MIN_QUALITY = 30
+
+
+def build_ladder(fps: int, width: int, height: int, quality: int) -> List[OperatingPoint]:
+    """Operating points from best (rung 0) to cheapest, derived from config."""
+    ladder = []
+    for rung, (fps_scale, res_scale, q_delta) in enumerate(LADDER_STEPS):
+        # Even dimensions keep JPEG/H.264 chroma subsampling happy
+        ladder.append(OperatingPoint(
+            rung=rung,
+            fps=max(MIN_FPS, round(fps * fps_scale)),
+            width=max(2, int(width * res_scale) // 2 * 2),
+            height=max(2, int(height * res_scale) // 2 * 2),
+            quality=max(MIN_QUALITY, quality + q_delta),
+        ))
+    return ladder
+
+
+class AdaptiveVideoController:
+    """Picks the live video operating point from backlog and ack timing."""
+
+    BACKLOG_HIGH = 4          # queued packets => congested
+    BACKLOG_LOW = 1           # queued packets => clear
+    RTT_HIGH_MS = 300         # ack round trip => congested
+    RTT_LOW_MS = 120          # ack round trip => clear
+    MAX_UNACKED = 30          # outstanding acks => congested (once acks are seen)
+    DOWN_COOLDOWN_S = 1.0
+    UP_HOLD_S = 5.0
+    UP_HOLD_MAX_S = 60.0
+    ACK_TIMEOUT_S = 5.0
+    ACK_PROBE_FRAMES = 60     # stop requesting acks if none arrive within this many frames
+
+    DIFF_THUMB = (64, 36)
+    MAX_SKIP_S = 1.0
+
+    def __init__(self, fps: int, width: int, height: int, quality: int,
+                 diff_threshold: float = 1.5, enabled: bool = True):
+        self.ladder = build_ladder(fps, width, height, quality)
+        self.enabled = enabled
+        self.diff_threshold = diff_threshold
+        self.rung = 0
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._unacked: Dict[int, float] = {}
+        self.acks_seen = False
+        self.rtt_ms = 0.0
+        self.backlog = 0
+
+        now = time.monotonic()
+        self._last_down = 0.0
+        self._clear_since = now
+        self._up_hold_s = self.UP_HOLD_S
+        self._last_up = 0.0
+
+        self._last_thumb = None
+        self._last_sent_at = 0.0
+
+        # Stats
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.steps_down = 0
+        self.steps_up = 0
+
+    @property
+    def operating_point(self) -> OperatingPoint:
+        return self.ladder[self.rung]
+
+    # ─── Link Signals ───────────────────────
+
+    def on_sent(self) -> int:
+        """Record a frame handed to the socket. Returns its ack sequence number."""
+        now = time.monotonic()
+        with self._lock:
+            self._seq += 1
+            self._unacked[self._seq] = now
+            # Forget frames the server will never ack
+            stale = [s for s, t in self._unacked.items() if now - t > self.ACK_TIMEOUT_S]
+            for s in stale:
+                del self._unacked[s]
+            self.frames_sent += 1
+            self._last_sent_at = now
+            return self._seq
+
+    def wants_ack(self) -> bool:
+        """Request an ack for the next frame? Only while the server is known to (or may) ack."""
+        with self._lock:
+            return self.acks_seen or self.frames_sent < self.ACK_PROBE_FRAMES
+
+    def on_ack(self, seq: int):
+        """Server acknowledged frame `seq` (called from the Socket.IO thread)."""
+        now = time.monotonic()
+        with self._lock:
+            sent_at = self._unacked.pop(seq, None)
+            if sent_at is None:
+                return
+            # Everything sent before an acked frame has been delivered too
+            for s in [s for s in self._unacked if s < seq]:
+                del self._unacked[s]
+            rtt = (now - sent_at) * 1000
+            self.rtt_ms = rtt if not self.acks_seen else self.rtt_ms + 0.2 * (rtt - self.rtt_ms)
+            self.acks_seen = True
+
+    # ─── Control ────────────────────────────
+
+    def update(self, backlog: int) -> OperatingPoint:
+        """Feed the current send backlog; returns the operating point to use."""
+        now = time.monotonic()
+        with self._lock:
+            self.backlog = backlog
+            unacked = len(self._unacked)
+            if not self.enabled:
+                return self.operating_point
+
+            congested = backlog >= self.BACKLOG_HIGH
+            clear = backlog <= self.BACKLOG_LOW
+            if self.acks_seen:
+                congested = congested or self.rtt_ms > self.RTT_HIGH_MS or unacked > self.MAX_UNACKED
+                clear = clear and self.rtt_ms < self.RTT_LOW_MS
+
+            if congested:
+                self._clear_since = now
+                if self.rung < len(self.ladder) - 1 and now - self._last_down >= self.DOWN_COOLDOWN_S:
+                    # Stepping up just caused this: wait longer before probing again
+                    if now - self._last_up < self._up_hold_s:
+                        self._up_hold_s = min(self._up_hold_s * 2, self.UP_HOLD_MAX_S)
+                    self.rung += 1
+                    self._last_down = now
+                    self.steps_down += 1
+                    self._log_change('⬇️', backlog)
+            elif clear:
+                if self.rung > 0 and now - self._clear_since >= self._up_hold_s:
+                    self.rung -= 1
+                    self._last_up = now
+                    self._clear_since = now
+                    self.steps_up += 1
+                    self._log_change('⬆️', backlog)
+                elif now - self._last_down > self.UP_HOLD_MAX_S:
+                    self._up_hold_s = self.UP_HOLD_S  # Link has been stable for a while
+            else:
+                self._clear_since = now
+
+            return self.operating_point
+
+    def _log_change(self, arrow: str, backlog: int):
+        op = self.operating_point
+        logger.info(
+            f"{arrow} Live video rung {op.rung}: {op.width}x{op.height} @ {op.fps}fps "
+            f"q{op.quality} (backlog {backlog}, rtt {self.rtt_ms:.0f}ms)"
+        )
+
+    # ─── Frame Difference ───────────────────
+
+    def should_skip(self, frame) -> bool:
+        """
+        True if `frame` (a SharedFrame) is nearly identical to the last sent
+        frame. The thumbnail comes from the frame's shared resize cache.
+        """
+        if self.diff_threshold <= 0 or not CV2_AVAILABLE:
+            return False
+        thumb = cv2.cvtColor(frame.resized(*self.DIFF_THUMB), cv2.COLOR_BGR2GRAY)
+        last, self._last_thumb = self._last_thumb, thumb
+        if last is None or time.monotonic() - self._last_sent_at >= self.MAX_SKIP_S:
+            return False
+        if float(cv2.absdiff(thumb, last).mean()) < self.diff_threshold:
+            self._last_thumb = last  # Compare against what the viewer actually has
+            self.frames_skipped += 1
+            return True
+        return False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'adaptive': self.enabled,
+                'operating_point': self.operating_point.to_dict(),
+                'backlog': self.backlog,
+                'rtt_ms': round(self.rtt_ms, 1) if self.acks_seen else None,
+                'unacked': len(self._unacked),
+                'frames_sent': self.frames_sent,
+                'frames_skipped': self.frames_skipped,
+                'steps_down': self.steps_down,
+                'steps_up': self.steps_up,
+            }
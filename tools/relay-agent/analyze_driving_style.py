@@ -4,14 +4,21 @@ Driving Style Analyzer - Runs captured telemetry through behavioral analysis
 Computes BSI (Braking Smoothness Index), TCI (Throttle Control Index), 
 CPI-2 (Cornering Precision Index), and RCI (Rotation Control Index)
 """
-import json
 import math
 from pathlib import Path
 from collections import defaultdict
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 
+from session_cache import cached_cars
+from session_log import CarSample, Event
+from session_pipeline import Analyzer, SessionContext, register
+
 LOG_DIR = Path("race_logs/20260303_110231")
+# Labels for the standalone run over LOG_DIR (the pipeline takes them from the session)
+DRIVER_NAME = "Conrad Weeden"
+TRACK_NAME = "Auto Club Speedway"
+CAR_NAME = "Toyota Tundra TRD Pro"
 
 @dataclass
 class TelemetrySample:
@@ -43,39 +50,23 @@ class LapAnalysis:
     steering_reversals: int
     samples: int
 
+def telemetry_sample(car: CarSample) -> TelemetrySample:
+    return TelemetrySample(
+        ts=car.ts,
+        speed_mph=car.speed_mph,
+        rpm=car.rpm,
+        gear=car.gear,
+        throttle=car.throttle * 100,
+        brake=car.brake * 100,
+        steering=car.steering,
+        lap=car.lap,
+        position=car.position,
+        track_pct=car.track_pct,
+    )
+
 def load_telemetry() -> List[TelemetrySample]:
     """Load player telemetry from all_events"""
-    samples = []
-    
-    with open(LOG_DIR / "all_events.jsonl", 'r', errors='ignore') as f:
-        for line in f:
-            try:
-                event = json.loads(line)
-                if event.get('event') != 'telemetry:driver':
-                    continue
-                    
-                data = event.get('data', {})
-                cars = data.get('cars', [])
-                
-                for car in cars:
-                    if car.get('isPlayer'):
-                        samples.append(TelemetrySample(
-                            ts=event.get('ts', 0),
-                            speed_mph=car.get('speed', 0) * 2.237,
-                            rpm=car.get('rpm', 0),
-                            gear=car.get('gear', 0),
-                            throttle=car.get('throttle', 0) * 100,
-                            brake=car.get('brake', 0) * 100,
-                            steering=car.get('steering', 0),
-                            lap=car.get('lap', 0),
-                            position=car.get('position', 0),
-                            track_pct=car.get('pos', {}).get('s', 0),
-                        ))
-                        break
-            except:
-                pass
-    
-    return samples
+    return [telemetry_sample(car) for car in cached_cars(LOG_DIR)]
 
 def compute_bsi(samples: List[TelemetrySample]) -> Dict:
     """
@@ -361,22 +352,12 @@ def generate_coaching(bsi: Dict, tci: Dict, cpi2: Dict, rci: Dict, samples: List
     
     return coaching
 
-def analyze_session():
-    """Main analysis function"""
-    print("Loading telemetry data...")
-    samples = load_telemetry()
-    
+def score_session(samples: List[TelemetrySample]) -> Optional[Dict]:
+    """Behavioral indices, overall score, grade and coaching (None if too little driving)"""
     # Filter to driving samples
     driving_samples = [s for s in samples if s.speed_mph > 10]
-    
-    print(f"Loaded {len(samples)} total samples")
-    print(f"Driving samples (speed > 10 mph): {len(driving_samples)}")
-    
     if len(driving_samples) < 100:
-        print("Not enough driving data for analysis!")
-        return
-    
-    print("\nComputing behavioral indices...")
+        return None
     
     bsi = compute_bsi(driving_samples)
     tci = compute_tci(driving_samples)
@@ -386,13 +367,6 @@ def analyze_session():
     # Overall score (weighted average)
     overall = (bsi['score'] * 0.25 + tci['score'] * 0.25 + cpi2['score'] * 0.25 + rci['score'] * 0.25)
     
-    print("\n" + "="*60)
-    print("🏎️  DRIVING STYLE ANALYSIS - Conrad Weeden")
-    print("    Auto Club Speedway | Toyota Tundra TRD Pro")
-    print("="*60)
-    
-    print(f"\n📊 OVERALL SCORE: {overall:.0f}/100")
-    
     # Grade
     if overall >= 80:
         grade = "A - Excellent"
@@ -404,7 +378,85 @@ def analyze_session():
         grade = "D - Needs Work"
     else:
         grade = "F - Struggling"
-    print(f"   Grade: {grade}")
+    
+    return {
+        'bsi': bsi,
+        'tci': tci,
+        'cpi2': cpi2,
+        'rci': rci,
+        'overall': overall,
+        'grade': grade,
+        'coaching': generate_coaching(bsi, tci, cpi2, rci, driving_samples),
+        'driving_samples': len(driving_samples),
+    }
+
+def render_report(result: Dict, driver: str, track: str, car: str) -> str:
+    """Markdown report for a score_session() result"""
+    bsi, tci, cpi2, rci = result['bsi'], result['tci'], result['cpi2'], result['rci']
+    lines = [
+        f"# 🏎️ Driving Style Analysis\n\n",
+        f"**Driver:** {driver}\n",
+        f"**Track:** {track}\n",
+        f"**Car:** {car}\n\n",
+        f"## Overall Score: {result['overall']:.0f}/100 ({result['grade']})\n\n",
+        f"## Behavioral Indices\n\n",
+        f"| Index | Score | Rating |\n",
+        f"|-------|-------|--------|\n",
+        f"| Braking Smoothness (BSI) | {bsi['score']}/100 | {'🟢' if bsi['score'] >= 60 else '🟡' if bsi['score'] >= 40 else '🔴'} |\n",
+        f"| Throttle Control (TCI) | {tci['score']}/100 | {'🟢' if tci['score'] >= 60 else '🟡' if tci['score'] >= 40 else '🔴'} |\n",
+        f"| Cornering Precision (CPI-2) | {cpi2['score']}/100 | {'🟢' if cpi2['score'] >= 60 else '🟡' if cpi2['score'] >= 40 else '🔴'} |\n",
+        f"| Rotation Control (RCI) | {rci['score']}/100 | {'🟢' if rci['score'] >= 60 else '🟡' if rci['score'] >= 40 else '🔴'} |\n\n",
+        f"## Coaching Feedback\n\n",
+    ]
+    lines.extend(f"{tip}\n\n" for tip in result['coaching'])
+    return "".join(lines)
+
+@register('style')
+class DrivingStyleAnalyzer(Analyzer):
+    """BSI/TCI/CPI-2/RCI from the player samples of a pipeline pass"""
+    report_file = "DRIVING_ANALYSIS.md"
+    
+    def begin(self, ctx: SessionContext):
+        self.samples = []
+        self.first_sample = None
+    
+    def feed(self, evt: Event, player: Optional[CarSample]):
+        self.first_sample = self.first_sample or player
+        self.samples.append(telemetry_sample(player))
+    
+    def finish(self, ctx: SessionContext) -> Optional[str]:
+        self.result = score_session(self.samples)
+        if not self.result:
+            return None
+        return render_report(
+            self.result,
+            driver=self.first_sample.driver_name or 'Unknown',
+            track=ctx.session_info.get('trackName', 'Unknown'),
+            car=self.first_sample.car_name or 'Unknown',
+        )
+
+def analyze_session():
+    """Main analysis function"""
+    print("Loading telemetry data...")
+    samples = load_telemetry()
+    
+    print(f"Loaded {len(samples)} total samples")
+    
+    print("\nComputing behavioral indices...")
+    result = score_session(samples)
+    if result is None:
+        print("Not enough driving data for analysis!")
+        return
+    print(f"Driving samples (speed > 10 mph): {result['driving_samples']}")
+    bsi, tci, cpi2, rci = result['bsi'], result['tci'], result['cpi2'], result['rci']
+    
+    print("\n" + "="*60)
+    print(f"🏎️  DRIVING STYLE ANALYSIS - {DRIVER_NAME}")
+    print(f"    {TRACK_NAME} | {CAR_NAME}")
+    print("="*60)
+    
+    print(f"\n📊 OVERALL SCORE: {result['overall']:.0f}/100")
+    print(f"   Grade: {result['grade']}")
     
     print("\n" + "-"*60)
     print("BEHAVIORAL INDICES")
@@ -436,8 +488,7 @@ def analyze_session():
     print("🎓 COACHING FEEDBACK")
     print("-"*60)
     
-    coaching = generate_coaching(bsi, tci, cpi2, rci, driving_samples)
-    for tip in coaching:
+    for tip in result['coaching']:
         print(f"\n{tip}")
     
     print("\n" + "="*60)
@@ -445,21 +496,7 @@ def analyze_session():
     # Save report
     report_file = LOG_DIR / "DRIVING_ANALYSIS.md"
     with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(f"# 🏎️ Driving Style Analysis\n\n")
-        f.write(f"**Driver:** Conrad Weeden\n")
-        f.write(f"**Track:** Auto Club Speedway\n")
-        f.write(f"**Car:** Toyota Tundra TRD Pro\n\n")
-        f.write(f"## Overall Score: {overall:.0f}/100 ({grade})\n\n")
-        f.write(f"## Behavioral Indices\n\n")
-        f.write(f"| Index | Score | Rating |\n")
-        f.write(f"|-------|-------|--------|\n")
-        f.write(f"| Braking Smoothness (BSI) | {bsi['score']}/100 | {'🟢' if bsi['score'] >= 60 else '🟡' if bsi['score'] >= 40 else '🔴'} |\n")
-        f.write(f"| Throttle Control (TCI) | {tci['score']}/100 | {'🟢' if tci['score'] >= 60 else '🟡' if tci['score'] >= 40 else '🔴'} |\n")
-        f.write(f"| Cornering Precision (CPI-2) | {cpi2['score']}/100 | {'🟢' if cpi2['score'] >= 60 else '🟡' if cpi2['score'] >= 40 else '🔴'} |\n")
-        f.write(f"| Rotation Control (RCI) | {rci['score']}/100 | {'🟢' if rci['score'] >= 60 else '🟡' if rci['score'] >= 40 else '🔴'} |\n\n")
-        f.write(f"## Coaching Feedback\n\n")
-        for tip in coaching:
-            f.write(f"{tip}\n\n")
+        f.write(render_report(result, DRIVER_NAME, TRACK_NAME, CAR_NAME))
     
     print(f"\n✅ Analysis saved to: {report_file}")
 
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Analyze Phoenix Raceway session"""
-import json
 from pathlib import Path
 from collections import defaultdict
 
+from session_cache import cached_cars
+from session_log import SessionLog
+
 LOG_DIR = Path("race_logs/20260303_110231")
 
 def analyze():
@@ -11,9 +13,8 @@ def analyze():
     print("PHOENIX RACEWAY SESSION ANALYSIS")
     print("="*60)
     
-    # Load stats
-    with open(LOG_DIR / "stats.json") as f:
-        stats = json.load(f)
+    log = SessionLog(LOG_DIR)
+    stats = log.stats()
     
     print(f"\n📊 SESSION OVERVIEW")
     print(f"   Duration: {stats['elapsed_seconds']/60:.1f} minutes")
@@ -21,26 +22,19 @@ def analyze():
     print(f"   Telemetry Updates: {stats['event_counts'].get('telemetry:update', 0):,}")
     
     # Load player telemetry
-    player_file = LOG_DIR / "player_telemetry.jsonl"
-    player_data = []
-    with open(player_file) as f:
-        for line in f:
-            try:
-                player_data.append(json.loads(line))
-            except:
-                pass
+    samples = list(cached_cars(LOG_DIR))
+    player_data = [car.to_dict() for car in samples]
     
     print(f"   Player Samples: {len(player_data):,}")
     
-    # Filter driving data (speed > 0)
-    driving = [d for d in player_data if d.get('speed', 0) > 5]
+    # Filter driving data (speed > 5 mph)
+    driving = [d for d in player_data if d['speed_mph'] > 5]
     
     if driving:
-        # Speed is already in mph from telemetry_update
-        speeds = [d['speed'] for d in driving]
+        speeds = [d['speed_mph'] for d in driving]
         rpms = [d['rpm'] for d in driving if d.get('rpm', 0) > 0]
-        throttles = [d['throttle'] for d in driving]
-        brakes = [d['brake'] for d in driving]
+        throttles = [d['throttle'] * 100 for d in driving]
+        brakes = [d['brake'] * 100 for d in driving]
         
         print(f"\n🏎️  SPEED ANALYSIS ({len(driving)} driving samples)")
         print(f"   Max Speed: {max(speeds):.1f} mph")
@@ -65,36 +59,22 @@ def analyze():
     
     # Analyze from all_events for full car data
     print("\n\n📡 Analyzing full telemetry from all_events...")
-    all_events_file = LOG_DIR / "all_events.jsonl"
-    
-    player_full = []
-    with open(all_events_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for i, line in enumerate(f):
-            if i > 100000:  # Limit scan
-                break
-            try:
-                event = json.loads(line)
-                if event.get('event') == 'telemetry:driver':
-                    data = event.get('data', {})
-                    cars = data.get('cars', [])
-                    for car in cars:
-                        if car.get('isPlayer'):
-                            player_full.append({
-                                'ts': event.get('ts'),
-                                'speed_ms': car.get('speed', 0),
-                                'speed_mph': car.get('speed', 0) * 2.237,
-                                'rpm': car.get('rpm', 0),
-                                'throttle': car.get('throttle', 0) * 100,
-                                'brake': car.get('brake', 0) * 100,
-                                'gear': car.get('gear', 0),
-                                'lap': car.get('lap', 0),
-                                'position': car.get('position', 0),
-                                'driver': car.get('driverName', ''),
-                                'car': car.get('carName', ''),
-                            })
-                            break
-            except:
-                pass
+    player_full = [
+        {
+            'ts': car.ts,
+            'speed_ms': car.speed,
+            'speed_mph': car.speed_mph,
+            'rpm': car.rpm,
+            'throttle': car.throttle * 100,
+            'brake': car.brake * 100,
+            'gear': car.gear,
+            'lap': car.lap,
+            'position': car.position,
+            'driver': car.driver_name,
+            'car': car.car_name,
+        }
+        for car in samples
+    ]
     
     if player_full:
         driver = player_full[0].get('driver', 'Unknown')
@@ -130,22 +110,13 @@ def analyze():
                 print(f"\n🔄 LAPS: {max(laps)}")
     
     # Incidents
-    incidents_file = LOG_DIR / "incidents.jsonl"
-    if incidents_file.exists():
-        incidents = []
-        with open(incidents_file) as f:
-            for line in f:
-                try:
-                    incidents.append(json.loads(line))
-                except:
-                    pass
-        
+    incidents = log.incidents()
+    if incidents:
         print(f"\n⚠️  INCIDENTS ({len(incidents)} total)")
         
         driver_inc = defaultdict(int)
         for inc in incidents:
-            data = inc.get('data', inc)
-            for d in data.get('driverNames', []):
+            for d in inc.data.get('driverNames', []):
                 driver_inc[d] += 1
         
         print(f"\n   By Driver (top 10):")
@@ -4,14 +4,21 @@ Strategy Analyzer - Race strategy analysis from captured telemetry
 Analyzes: Lap times, fuel consumption, tire degradation, pit windows, 
 gap trends, position changes, and opponent modeling
 """
-import json
 from pathlib import Path
 from collections import defaultdict
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
 import statistics
 
+from session_cache import cached_cars
+from session_log import CarSample, Event, SessionLog
+from session_pipeline import Analyzer, SessionContext, register
+
 LOG_DIR = Path("race_logs/20260303_110231")
+# Labels for the standalone run over LOG_DIR (the pipeline takes them from the session)
+DRIVER_NAME = "Conrad Weeden"
+TRACK_NAME = "Phoenix Raceway"
+CAR_NAME = "Toyota Tundra TRD Pro"
 
 @dataclass
 class LapData:
@@ -44,32 +51,15 @@ class GapData:
 
 def load_telemetry_data() -> Tuple[List[dict], List[dict], List[dict]]:
     """Load telemetry, incidents, and standings data"""
-    telemetry = []
-    incidents = []
-    standings = []
+    log = SessionLog(LOG_DIR)
+    
+    # Player telemetry
+    telemetry = [car.to_dict() for car in cached_cars(LOG_DIR)]
     
-    # Load player telemetry
-    player_file = LOG_DIR / "player_telemetry.jsonl"
-    if player_file.exists():
-        with open(player_file, 'r', errors='ignore') as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    telemetry.append(data)
-                except:
-                    pass
-    
-    # Load incidents
-    incident_file = LOG_DIR / "incidents.jsonl"
-    if incident_file.exists():
-        with open(incident_file, 'r', errors='ignore') as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    incidents.append(data)
-                except:
-                    pass
+    # Incidents
+    incidents = [{'ts': evt.ts, 'data': evt.data} for evt in log.incidents()]
     
+    standings = []
     return telemetry, incidents, standings
 
 def extract_lap_data(telemetry: List[dict]) -> List[LapData]:
@@ -260,7 +250,7 @@ def analyze_pace_consistency(laps: List[LapData]) -> Dict:
         'lap_count': len(times)
     }
 
-def analyze_incidents(incidents: List[dict], driver_name: str = "Conrad Weeden") -> Dict:
+def analyze_incidents(incidents: List[dict], driver_name: str = DRIVER_NAME) -> Dict:
     """Analyze incident patterns"""
     driver_incidents = [i for i in incidents if driver_name in str(i.get('data', {}).get('driver_names', []))]
     
@@ -296,13 +286,14 @@ def format_time(seconds: float) -> str:
     secs = seconds % 60
     return f"{mins}:{secs:06.3f}" if mins > 0 else f"{secs:.3f}"
 
-def generate_report(laps, stints, incidents, position_data, fuel_data, pace_data, incident_data):
+def generate_report(laps, stints, incidents, position_data, fuel_data, pace_data, incident_data,
+                    track: str = TRACK_NAME, car: str = CAR_NAME):
     """Generate markdown strategy report"""
     
     report = []
     report.append("# 🏁 Race Strategy Analysis\n")
-    report.append(f"**Track:** Phoenix Raceway")
-    report.append(f"**Car:** Toyota Tundra TRD Pro")
+    report.append(f"**Track:** {track}")
+    report.append(f"**Car:** {car}")
     report.append(f"**Laps Completed:** {pace_data.get('lap_count', 0)}\n")
     
     # Overall Summary
@@ -403,33 +394,72 @@ def generate_report(laps, stints, incidents, position_data, fuel_data, pace_data
     
     return "\n".join(report)
 
-def main():
-    print("Loading telemetry data...")
-    telemetry, incidents, _ = load_telemetry_data()
-    print(f"Loaded {len(telemetry)} telemetry samples, {len(incidents)} incidents")
-    
-    print("Extracting lap data...")
+def build_report(telemetry: List[dict], incidents: List[dict], verbose: bool = False,
+                 driver: str = DRIVER_NAME, track: str = TRACK_NAME, car: str = CAR_NAME) -> Optional[str]:
+    """Strategy report from player telemetry rows and incident rows (None without laps)"""
+    def step(msg):
+        if verbose:
+            print(msg)
+    
+    step("Extracting lap data...")
     laps = extract_lap_data(telemetry)
-    print(f"Extracted {len(laps)} laps")
+    step(f"Extracted {len(laps)} laps")
+    if not laps:
+        return None
     
-    print("Analyzing stints...")
+    step("Analyzing stints...")
     stints = analyze_stints(laps)
-    print(f"Found {len(stints)} stints")
+    step(f"Found {len(stints)} stints")
     
-    print("Analyzing position changes...")
+    step("Analyzing position changes...")
     position_data = analyze_position_changes(laps)
     
-    print("Analyzing fuel strategy...")
+    step("Analyzing fuel strategy...")
     fuel_data = analyze_fuel_strategy(laps, stints)
     
-    print("Analyzing pace consistency...")
+    step("Analyzing pace consistency...")
     pace_data = analyze_pace_consistency(laps)
     
-    print("Analyzing incidents...")
-    incident_data = analyze_incidents(incidents)
+    step("Analyzing incidents...")
+    incident_data = analyze_incidents(incidents, driver)
+    
+    step("\nGenerating report...")
+    return generate_report(laps, stints, incidents, position_data, fuel_data, pace_data, incident_data,
+                           track=track, car=car)
+
+@register('strategy')
+class StrategyAnalyzer(Analyzer):
+    """Stints, pace, fuel and position analysis from the player samples of a pipeline pass"""
+    report_file = "STRATEGY_ANALYSIS.md"
+    
+    def begin(self, ctx: SessionContext):
+        self.telemetry = []
+        self.first_sample = None
+    
+    def feed(self, evt: Event, player: Optional[CarSample]):
+        self.first_sample = self.first_sample or player
+        self.telemetry.append(player.to_dict())
+    
+    def finish(self, ctx: SessionContext) -> Optional[str]:
+        if self.first_sample is None:
+            return None
+        incidents = [{'ts': evt.ts, 'data': evt.data} for evt in ctx.incidents]
+        return build_report(
+            self.telemetry, incidents,
+            driver=self.driver or self.first_sample.driver_name,
+            track=ctx.session_info.get('trackName', 'Unknown'),
+            car=self.first_sample.car_name or 'Unknown',
+        )
+
+def main():
+    print("Loading telemetry data...")
+    telemetry, incidents, _ = load_telemetry_data()
+    print(f"Loaded {len(telemetry)} telemetry samples, {len(incidents)} incidents")
     
-    print("\nGenerating report...")
-    report = generate_report(laps, stints, incidents, position_data, fuel_data, pace_data, incident_data)
+    report = build_report(telemetry, incidents, verbose=True)
+    if report is None:
+        print("No completed laps to analyze!")
+        return
     
     # Save report
     output_file = LOG_DIR / "STRATEGY_ANALYSIS.md"
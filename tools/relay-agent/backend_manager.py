@@ -20,8 +20,10 @@ from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
 import config
+from log_throttle import RateLimitedLogger
 
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger, rate=0.1, burst=1)
 
 
 class TargetState(Enum):
@@ -252,7 +254,6 @@ class BackendTarget:
     
     def _worker_loop(self):
         """Worker thread that processes the queue"""
-        last_throttle_log = 0
         
         while self.running:
             try:
@@ -272,9 +273,8 @@ class BackendTarget:
                 age_ms = time.time() * 1000 - queued_at
                 if age_ms > 2000:  # Drop frames older than 2s
                     self.dropped += 1
-                    if time.time() - last_throttle_log > 10:
-                        logger.warning(f"[{self.index}] Dropping stale frames (queue lag: {age_ms:.0f}ms)")
-                        last_throttle_log = time.time()
+                    throttled.warning(f'stale:{self.index}', "[%d] Dropping stale frames (queue lag: %.0fms)",
+                                      self.index, age_ms)
                     continue
                 
                 # Send
@@ -292,7 +292,7 @@ class BackendTarget:
                     self.last_error = str(e)[:100]
                     
             except Exception as e:
-                logger.error(f"[{self.index}] Worker error: {e}")
+                throttled.error(f'worker:{self.index}', "[%d] Worker error: %s", self.index, e)
                 time.sleep(0.5)
     
     def get_stats(self) -> TargetStats:
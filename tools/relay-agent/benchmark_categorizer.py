@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Clip categorizer regression check + benchmark.
+
+Runs the pure-Python reference categorizer and the NumPy implementation
+over a regression corpus and fails if any result differs, then times both
+on 30s x 60Hz clips (1800 samples).
+
+The corpus is a deterministic set of synthetic clips (spins, off-tracks,
+pit stops, position changes, incidents, lap 1, hard braking, noise) plus,
+optionally, every `_telemetry.json` sidecar in a clip directory.
+
+Usage:
+    python benchmark_categorizer.py
+    python benchmark_categorizer.py --clips ~/Ok-Box-Box/clips --runs 200
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from clip_categorizer import (
+    NUMPY_AVAILABLE,
+    categorize_clip_reference,
+    categorize_columns,
+    columns_from_samples,
+)
+from screen_capture import TelemetrySample
+
+EVENT_TYPES = ['incident', 'manual', 'pass', 'mistake', 'unknown']
+
+
+def synthetic_clip(seed: int, n: int = 1800, rate_hz: float = 60) -> Tuple[List[TelemetrySample], dict]:
+    """One deterministic clip with a randomly chosen mix of scenarios."""
+    rng = random.Random(seed)
+    speed = rng.uniform(0, 85)
+    position = rng.randint(0, 20)
+    lap = rng.randint(0, 12)
+    incidents = rng.choice([0, 0, 2, 4])
+    dist = rng.random()
+
+    spin_at = rng.randrange(n) if rng.random() < 0.4 else -1
+    pit = rng.random() < 0.15
+    pos_changes = rng.choice([0, 0, 1, 2, -1, -3])
+    incident_at = rng.randrange(n) if rng.random() < 0.3 else -1
+    heavy_brake_at = rng.randrange(n) if rng.random() < 0.3 else -1
+    steer_amp = rng.choice([0.2, 0.8, 2.5])
+
+    samples = []
+    for i in range(n):
+        if 0 <= spin_at <= i < spin_at + rate_hz:
+            speed *= rng.uniform(0.85, 0.97)
+        elif pit:
+            speed = min(speed, 25) + rng.uniform(-1, 1)
+            dist = rng.uniform(0, 0.04)
+        else:
+            speed = max(0.0, speed + rng.uniform(-2, 2))
+        if pos_changes and i == n // 2:
+            position = max(1, position - pos_changes)
+        if i == incident_at:
+            incidents += rng.choice([1, 2, 4])
+        dist = (dist + speed / rate_hz / 5000) % 1.0
+        if not pit and dist < 1e-3:
+            lap += 1
+        brake = 1.0 if heavy_brake_at <= i < heavy_brake_at + 30 else max(0.0, rng.uniform(-0.5, 0.4))
+        samples.append(TelemetrySample(
+            session_time_ms=int(i * 1000 / rate_hz),
+            speed=speed if rng.random() > 0.01 else 0.0,   # occasional dropouts
+            rpm=rng.uniform(3000, 9000),
+            gear=rng.randint(1, 6),
+            throttle=rng.random(),
+            brake=brake,
+            steering=steer_amp * math.sin(i / 20) + rng.uniform(-0.05, 0.05),
+            lap=lap,
+            lap_dist_pct=dist,
+            position=position,
+            incident_count=incidents,
+        ))
+
+    kwargs = {
+        'event_type': rng.choice(EVENT_TYPES),
+        'event_label': rng.choice(['', 'Contact', 'Manual clip']),
+    }
+    if rng.random() < 0.3:
+        kwargs['position_before'] = rng.randint(1, 20)
+        kwargs['position_after'] = rng.randint(1, 20)
+    if rng.random() < 0.3:
+        kwargs['best_lap_ms'] = rng.randint(80000, 90000)
+        kwargs['current_lap_ms'] = rng.randint(79000, 95000)
+    return samples, kwargs
+
+
+def sidecar_clip(path: Path) -> Tuple[List[TelemetrySample], dict]:
+    """Samples from a legacy JSON telemetry sidecar."""
+    with open(path) as f:
+        records = json.load(f)
+    samples = [
+        TelemetrySample(
+            session_time_ms=r.get('st', 0), speed=r.get('spd', 0), rpm=r.get('rpm', 0),
+            gear=r.get('gear', 0), throttle=r.get('thr', 0), brake=r.get('brk', 0),
+            steering=r.get('str', 0), fuel_level=r.get('fuel', 0), fuel_pct=r.get('fuelPct', 0),
+            lap=r.get('lap', 0), lap_dist_pct=r.get('dist', 0), position=r.get('pos', 0),
+            incident_count=r.get('inc', 0),
+        )
+        for r in records
+    ]
+    return samples, {'event_type': 'unknown'}
+
+
+def timed(fn, runs: int) -> float:
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Categorizer regression check + benchmark')
+    parser.add_argument('--clips', help='Clip directory with *_telemetry.json sidecars to include')
+    parser.add_argument('--corpus', type=int, default=500, help='Number of synthetic clips')
+    parser.add_argument('--runs', type=int, default=50, help='Timed runs per implementation')
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        print("NumPy not installed — nothing to compare")
+        sys.exit(1)
+
+    corpus = [synthetic_clip(seed) for seed in range(args.corpus)]
+    # Short clips exercise the window edge cases
+    corpus += [synthetic_clip(10_000 + seed, n=n) for seed, n in enumerate([1, 2, 9, 10, 14, 15, 16, 30])]
+    if args.clips:
+        corpus += [sidecar_clip(p) for p in sorted(Path(args.clips).glob('*_telemetry.json'))]
+
+    # === Regression ===
+    mismatches = 0
+    categories = {}
+    for i, (samples, kwargs) in enumerate(corpus):
+        expected = categorize_clip_reference(samples, **kwargs)
+        actual = categorize_columns(columns_from_samples(samples), **kwargs)
+        categories[expected.primary] = categories.get(expected.primary, 0) + 1
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  ✗ clip {i}: reference={expected} numpy={actual}")
+    print(f"Regression corpus: {len(corpus)} clips, {mismatches} mismatches")
+    print(f"  Categories: {dict(sorted(categories.items()))}")
+
+    # === Benchmark: 30s x 60Hz ===
+    samples, kwargs = synthetic_clip(42, n=30 * 60)
+    columns = columns_from_samples(samples)
+    ref_ms = timed(lambda: categorize_clip_reference(samples, **kwargs), args.runs)
+    np_ms = timed(lambda: categorize_columns(columns_from_samples(samples), **kwargs), args.runs)
+    cols_ms = timed(lambda: categorize_columns(columns, **kwargs), args.runs)
+    print(f"30s x 60Hz ({len(samples)} samples), mean of {args.runs} runs:")
+    print(f"  reference (Python lists):        {ref_ms:7.3f} ms")
+    print(f"  numpy (incl. sample→columns):    {np_ms:7.3f} ms  ({ref_ms / np_ms:.1f}x)")
+    print(f"  numpy (columnar input):          {cols_ms:7.3f} ms  ({ref_ms / cols_ms:.1f}x)")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
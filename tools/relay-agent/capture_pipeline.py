@@ -0,0 +1,197 @@
+"""
+OBB Replay Intelligence — Grab / Compress Pipeline
+
+Splits the capture loop into two stages so a slow JPEG encode no longer
+eats into the grab interval:
+
+    grab thread ──► bounded queue ──► N compress workers ──► reorder ──► sink
+
+Frames are timestamped (wall clock, session time, telemetry) at grab
+time, compressed in parallel (cv2 releases the GIL while resizing and
+encoding), then handed to the sink strictly in grab order. If the workers
+fall behind, new grabs are dropped and counted rather than queued without
+bound.
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from log_throttle import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
+
+
+@dataclass
+class RawFrame:
+    """A grabbed, not yet compressed frame plus its capture-time context."""
+    image: Any                    # mss ScreenShot (or ndarray)
+    timestamp: float              # wall clock at grab
+    session_time_ms: int
+    telemetry: Any = None
+    seq: int = 0
+    grab_ms: float = 0            # time spent in sct.grab
+    queued_at: float = 0          # perf_counter when handed to workers
+
+
+class StageTimer:
+    """Exponential moving average of a latency in milliseconds."""
+
+    __slots__ = ('avg_ms', 'max_ms', 'alpha')
+
+    def __init__(self, alpha: float = 0.1):
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.alpha = alpha
+
+    def add(self, ms: float):
+        self.avg_ms = ms if self.avg_ms == 0 else self.avg_ms + self.alpha * (ms - self.avg_ms)
+        self.max_ms = max(self.max_ms, ms)
+
+
+class CompressPipeline:
+    """
+    Parallel compress stage with in-order delivery.
+
+    Args:
+        compress_fn: image -> payload (None on failure)
+        sink: called as sink(raw_frame, payload) in grab order, one at a time
+        workers: number of compression threads
+        max_pending: grabbed frames allowed to wait before new grabs are dropped
+    """
+
+    def __init__(self, compress_fn: Callable[[Any], Any],
+                 sink: Callable[[RawFrame, Any], None],
+                 workers: int = 2, max_pending: Optional[int] = None,
+                 name: str = 'Compress'):
+        self.compress_fn = compress_fn
+        self.sink = sink
+        self.workers = max(1, workers)
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending or self.workers * 2)
+        self._threads: List[threading.Thread] = []
+        self._next_seq = 0
+        self._deliver_seq = 0
+        self._done: Dict[int, Tuple[RawFrame, Any, float]] = {}
+        self._submit_lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self.running = False
+
+        # Stats
+        self.frames_in = 0
+        self.frames_out = 0
+        self.frames_dropped = 0
+        self.frames_failed = 0
+        self.grab = StageTimer()
+        self.queue_wait = StageTimer()
+        self.compress = StageTimer()
+        self.reorder = StageTimer()
+        self._fps_window_start = time.perf_counter()
+        self._fps_window_frames = 0
+        self.achieved_fps = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f'{self.name}-{i}')
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self.running = False
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+
+    def submit(self, raw: RawFrame) -> bool:
+        """Hand a grabbed frame to the workers. Returns False if dropped."""
+        self.grab.add(raw.grab_ms)
+        raw.queued_at = time.perf_counter()
+        # Sequence numbers are only assigned to accepted frames so the
+        # reorder stage never waits for a dropped one
+        with self._submit_lock:
+            if self._queue.full():
+                self.frames_dropped += 1
+                return False
+            raw.seq = self._next_seq
+            self._next_seq += 1
+            self._queue.put_nowait(raw)
+        self.frames_in += 1
+        return True
+
+    def _worker(self):
+        while self.running:
+            raw = self._queue.get()
+            if raw is None:
+                return
+            started = time.perf_counter()
+            self.queue_wait.add((started - raw.queued_at) * 1000)
+            try:
+                payload = self.compress_fn(raw.image)
+            except Exception as e:
+                logger.debug(f"Compress failed: {e}")
+                payload = None
+            finished = time.perf_counter()
+            self.compress.add((finished - started) * 1000)
+            raw.image = None  # Release the raw pixels as early as possible
+            self._deliver(raw, payload, finished)
+
+    def _deliver(self, raw: RawFrame, payload: Any, finished: float):
+        """Park the result and flush every consecutive frame that is ready."""
+        with self._deliver_lock:
+            self._done[raw.seq] = (raw, payload, finished)
+            while self._deliver_seq in self._done:
+                ready, ready_payload, ready_finished = self._done.pop(self._deliver_seq)
+                self._deliver_seq += 1
+                if ready_payload is None:
+                    self.frames_failed += 1
+                    continue
+                self.reorder.add((time.perf_counter() - ready_finished) * 1000)
+                try:
+                    self.sink(ready, ready_payload)
+                except Exception as e:
+                    throttled.error('sink', "Capture sink error: %s", e)
+                self.frames_out += 1
+                self._tick_fps()
+
+    def _tick_fps(self):
+        self._fps_window_frames += 1
+        now = time.perf_counter()
+        elapsed = now - self._fps_window_start
+        if elapsed >= 2.0:
+            self.achieved_fps = self._fps_window_frames / elapsed
+            self._fps_window_start = now
+            self._fps_window_frames = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'achieved_fps': round(self.achieved_fps, 1),
+            'frames_in': self.frames_in,
+            'frames_out': self.frames_out,
+            'frames_dropped': self.frames_dropped,
+            'frames_failed': self.frames_failed,
+            'pending': self._queue.qsize(),
+            'latency_ms': {
+                stage: {'avg': round(timer.avg_ms, 1), 'max': round(timer.max_ms, 1)}
+                for stage, timer in (
+                    ('grab', self.grab),
+                    ('queue', self.queue_wait),
+                    ('compress', self.compress),
+                    ('reorder', self.reorder),
+                )
+            },
+        }
@@ -0,0 +1,410 @@
+"""
+OBB Replay Intelligence — Shared Capture Source
+
+One mss grab loop per monitor, fanned out to every registered consumer.
+VideoEncoder (live stream) and ScreenCapture (replay clips) used to grab
+the same monitor independently, doubling the most expensive operation on
+the machine.
+
+The source grabs at the highest rate any active consumer asks for and
+delivers each consumer only the frames it is due (per-consumer
+decimation). Consumers receive a SharedFrame whose conversions are
+memoised, so two consumers asking for the same size (or size + JPEG
+quality) share one resize / encode.
+
+The grab can be restricted to a region of the monitor so triple-screen /
+ultrawide setups don't grab and convert 3-4x the pixels of the sim view:
+
+    monitor   whole monitor (default)
+    rect      explicit (left, top, width, height), relative to the monitor
+    center    centre 16:9 of the monitor (the middle screen of a span layout)
+    window    client area of the iRacing window (Windows), re-located periodically
+
+Usage:
+    source = CaptureSource(monitor_index=1, region_mode='center')
+    consumer = source.add_consumer('live', fps=30, callback=on_frame)
+    ...
+    source.remove_consumer(consumer)
+"""
+
+import ctypes
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from log_throttle import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
+
+
+REGION_MODES = ('monitor', 'rect', 'center', 'window')
+IRACING_WINDOW_TITLE = 'iRacing.com Simulator'
+WINDOW_RELOCATE_S = 2.0
+
+
+# ─── Regions ─────────────────────────────
+
+def parse_region(value: str) -> Optional[Tuple[int, int, int, int]]:
+    """Parse 'left,top,width,height' (e.g. from an env var); None if empty/invalid."""
+    try:
+        parts = tuple(int(p) for p in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    return parts if len(parts) == 4 and parts[2] > 0 and parts[3] > 0 else None
+
+
+def find_window_rect(title: str = IRACING_WINDOW_TITLE) -> Optional[Dict[str, int]]:
+    """Screen-space client rectangle of a top-level window (Windows only)."""
+    if os.name != 'nt':
+        return None
+    try:
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        hwnd = user32.FindWindowW(None, title)
+        if not hwnd or user32.IsIconic(hwnd):
+            return None
+        rect = wintypes.RECT()
+        if not user32.GetClientRect(hwnd, ctypes.byref(rect)):
+            return None
+        origin = wintypes.POINT(0, 0)
+        user32.ClientToScreen(hwnd, ctypes.byref(origin))
+        width, height = rect.right - rect.left, rect.bottom - rect.top
+        if width <= 0 or height <= 0:
+            return None
+        return {'left': origin.x, 'top': origin.y, 'width': width, 'height': height}
+    except (AttributeError, OSError):
+        return None
+
+
+def resolve_region(monitor: Dict[str, int], mode: str = 'monitor',
+                   rect: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, int]:
+    """
+    The mss grab box for `mode` within `monitor`. Anything that can't be
+    resolved (no rect, window not found) falls back to the whole monitor.
+    """
+    full = {k: monitor[k] for k in ('left', 'top', 'width', 'height')}
+
+    if mode == 'rect' and rect:
+        left, top, width, height = rect
+        left = min(max(0, left), full['width'] - 1)
+        top = min(max(0, top), full['height'] - 1)
+        return {
+            'left': full['left'] + left,
+            'top': full['top'] + top,
+            'width': min(width, full['width'] - left),
+            'height': min(height, full['height'] - top),
+        }
+
+    if mode == 'center':
+        # 5760x1080 triple -> middle 1920x1080; 3440x1440 ultrawide -> 2560x1440
+        width = min(full['width'], full['height'] * 16 // 9)
+        return {
+            'left': full['left'] + (full['width'] - width) // 2,
+            'top': full['top'],
+            'width': width,
+            'height': full['height'],
+        }
+
+    if mode == 'window':
+        window = find_window_rect()
+        if window:
+            return window
+
+    return full
+
+
+# ─── Frames ──────────────────────────────
+
+class SharedFrame:
+    """
+    One screen grab shared by every consumer it is delivered to.
+
+    Conversions are computed on first use and cached on the frame, keyed
+    by their parameters; concurrent requests for the same key wait for the
+    first one instead of repeating the work.
+    """
+
+    __slots__ = ('raw', 'timestamp', 'seq', 'grab_ms', '_cache', '_key_locks', '_lock')
+
+    def __init__(self, raw: Any, timestamp: float, seq: int, grab_ms: float = 0):
+        self.raw = raw                  # mss ScreenShot (BGRA)
+        self.timestamp = timestamp      # wall clock at grab
+        self.seq = seq
+        self.grab_ms = grab_ms
+        self._cache: Dict[Tuple, Any] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.raw.size
+
+    def _memo(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                cached = compute()
+                self._cache[key] = cached
+            return cached
+
+    def bgra(self):
+        """Zero-copy ndarray view of the grab (cv2 only)."""
+        return self._memo(('bgra',), lambda: np.asarray(self.raw))
+
+    def resized(self, width: int, height: int):
+        """BGR ndarray at width x height (resized before colour conversion)."""
+        def compute():
+            frame = self.bgra()
+            if (frame.shape[1], frame.shape[0]) != (width, height):
+                frame = cv2.resize(frame, (width, height))
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return self._memo(('bgr', width, height), compute)
+
+    def jpeg(self, width: int, height: int, quality: int):
+        """JPEG-encoded ndarray buffer, or None if encoding failed."""
+        def compute():
+            ok, buffer = cv2.imencode(
+                '.jpg', self.resized(width, height), [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+            )
+            return buffer if ok else False
+        result = self._memo(('jpeg', width, height, quality), compute)
+        return result if result is not False else None
+
+
+class LatestFrame:
+    """
+    Single-slot mailbox for consumers that do slow work per frame: the
+    grab thread drops the frame in without blocking, replacing any frame
+    the consumer has not picked up yet.
+    """
+
+    def __init__(self):
+        self._slot: queue.Queue = queue.Queue(maxsize=1)
+        self.replaced = 0
+
+    def put(self, frame: SharedFrame):
+        try:
+            self._slot.put_nowait(frame)
+        except queue.Full:
+            try:
+                self._slot.get_nowait()
+                self.replaced += 1
+            except queue.Empty:
+                pass
+            try:
+                self._slot.put_nowait(frame)
+            except queue.Full:
+                pass
+
+    def get(self, timeout: float = 0.5) -> Optional[SharedFrame]:
+        try:
+            return self._slot.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+# ─── Consumers ───────────────────────────
+
+class CaptureConsumer:
+    """A registered frame consumer with its own rate."""
+
+    def __init__(self, name: str, fps: float, callback: Callable[[SharedFrame], None],
+                 wants: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.fps = fps
+        self.callback = callback
+        self.wants = wants or (lambda: True)
+        self.next_due = 0.0
+        self.frames_delivered = 0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps if self.fps > 0 else 0.0
+
+    def active(self) -> bool:
+        try:
+            return bool(self.wants())
+        except Exception:
+            return False
+
+
+class CaptureSource:
+    """Grabs one monitor at the highest requested rate and fans frames out."""
+
+    def __init__(self, monitor_index: int = 1, region_mode: str = 'monitor',
+                 region: Optional[Tuple[int, int, int, int]] = None):
+        self.monitor_index = monitor_index
+        if region_mode not in REGION_MODES:
+            logger.warning(f"⚠️ Unknown capture region mode '{region_mode}', using monitor")
+            region_mode = 'monitor'
+        self.region_mode = region_mode
+        self.region = region
+        self.grab_box: Dict[str, int] = {}
+        self._consumers: List[CaptureConsumer] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.running = False
+        self.monitor_size: Tuple[int, int] = (0, 0)
+
+        # Stats
+        self.frames_grabbed = 0
+        self.grab_ms_avg = 0.0
+        self._seq = 0
+
+    # ─── Registration ────────────────────────
+
+    def add_consumer(self, name: str, fps: float, callback: Callable[[SharedFrame], None],
+                     wants: Optional[Callable[[], bool]] = None) -> CaptureConsumer:
+        """
+        Register a consumer and start grabbing if needed. `callback` runs on
+        the grab thread and must be cheap (hand off to a queue / LatestFrame).
+        `wants` lets a consumer pause without unregistering.
+        """
+        consumer = CaptureConsumer(name, fps, callback, wants)
+        with self._lock:
+            self._consumers.append(consumer)
+        logger.info(f"📺 Capture consumer '{name}' registered @ {fps}fps")
+        self._ensure_running()
+        return consumer
+
+    def remove_consumer(self, consumer: CaptureConsumer):
+        """Unregister a consumer; the grab thread exits with the last one."""
+        with self._lock:
+            if consumer in self._consumers:
+                self._consumers.remove(consumer)
+            idle = not self._consumers
+        if idle:
+            self.stop()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self.running:
+                return
+            if not MSS_AVAILABLE:
+                logger.error("❌ mss not installed — screen capture disabled")
+                return
+            self.running = True
+            self._thread = threading.Thread(
+                target=self._grab_loop, daemon=True, name=f'CaptureSource-{self.monitor_index}'
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self.running = False
+            thread, self._thread = self._thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    # ─── Grab Loop ───────────────────────────
+
+    def _due(self, now: float) -> Tuple[List[CaptureConsumer], float]:
+        """Consumers due a frame at `now`, and the grab interval to keep."""
+        with self._lock:
+            active = [c for c in self._consumers if c.active()]
+        if not active:
+            return [], 0.0
+        interval = min(c.interval for c in active)
+        # Half a grab interval of slack so a 15fps consumer on a 60fps
+        # source gets every 4th frame rather than drifting to every 5th
+        slack = interval / 2
+        due = []
+        for consumer in active:
+            if now + slack >= consumer.next_due:
+                consumer.next_due = max(consumer.next_due, now - slack) + consumer.interval
+                due.append(consumer)
+        return due, interval
+
+    def _grab_loop(self):
+        with mss.mss() as sct:
+            monitor = sct.monitors[self.monitor_index]
+            self.monitor_size = (monitor['width'], monitor['height'])
+            box = self._update_grab_box(monitor)
+            relocated_at = time.monotonic()
+
+            while self.running:
+                loop_start = time.perf_counter()
+                if self.region_mode == 'window' and time.monotonic() - relocated_at > WINDOW_RELOCATE_S:
+                    # The sim window can move, resize, or only appear later
+                    box = self._update_grab_box(monitor)
+                    relocated_at = time.monotonic()
+                due, interval = self._due(time.time())
+                if not interval:
+                    time.sleep(0.25)  # Every consumer paused
+                    continue
+
+                if due:
+                    try:
+                        screenshot = sct.grab(box)
+                        grab_ms = (time.perf_counter() - loop_start) * 1000
+                        self.grab_ms_avg += 0.1 * (grab_ms - self.grab_ms_avg)
+                        frame = SharedFrame(screenshot, time.time(), self._seq, grab_ms)
+                        self._seq += 1
+                        self.frames_grabbed += 1
+                        for consumer in due:
+                            try:
+                                consumer.callback(frame)
+                                consumer.frames_delivered += 1
+                            except Exception as e:
+                                throttled.error(
+                                    f'consumer:{consumer.name}',
+                                    "Capture consumer %s failed: %s", consumer.name, e,
+                                )
+                    except Exception as e:
+                        throttled.error('grab', "Screen grab error: %s", e)
+                        time.sleep(0.5)
+
+                sleep_time = interval - (time.perf_counter() - loop_start)
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+
+    def _update_grab_box(self, monitor: Dict[str, int]) -> Dict[str, int]:
+        box = resolve_region(monitor, self.region_mode, self.region)
+        if box != self.grab_box:
+            self.grab_box = box
+            logger.info(
+                f"📺 Capturing monitor {self.monitor_index} ({self.region_mode}): "
+                f"{box['width']}x{box['height']} at ({box['left']}, {box['top']}) "
+                f"of {monitor['width']}x{monitor['height']}"
+            )
+        return box
+
+    # ─── Stats ───────────────────────────────
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            consumers = {
+                c.name: {'fps': c.fps, 'active': c.active(), 'frames': c.frames_delivered}
+                for c in self._consumers
+            }
+        return {
+            'monitor': self.monitor_index,
+            'region_mode': self.region_mode,
+            'grab_box': dict(self.grab_box),
+            'running': self.running,
+            'frames_grabbed': self.frames_grabbed,
+            'grab_ms_avg': round(self.grab_ms_avg, 1),
+            'consumers': consumers,
+        }
@@ -16,14 +16,53 @@ Categories detected:
   - start_sequence (first lap action)
 
 Uses the TelemetrySample buffer from ScreenCapture.
+
+Columnar input (e.g. a clip's telemetry sidecar) is categorized with
+NumPy (categorize_columns): every detector is a whole-array reduction or
+an O(n) lagged comparison, so a 30s clip at 60Hz costs a few array passes
+instead of per-sample Python loops. The pure-Python implementation over
+sample objects is kept as the reference; both must produce identical
+results — see benchmark_categorizer.py.
 """
 
 import logging
 from dataclasses import dataclass
-from typing import List, Optional
+from itertools import chain
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever detection heuristics change: recategorize_clips.py re-tags
+# every clip whose metadata records an older version.
+CATEGORIZER_VERSION = 2
+
+SPIN_WINDOW = 15          # samples between compared speeds (~1 second at 15fps)
+SPIN_MIN_SPEED = 10       # m/s: only count drops from a moving car
+SPIN_SPEED_RATIO = 0.3    # >70% speed loss within the window
+SPIN_STEERING = 1.5       # rad (~86 degrees)
+
+FLOAT_CHANNELS = ('speed', 'throttle', 'brake', 'steering', 'lap_dist_pct')
+INT_CHANNELS = ('position', 'lap', 'incident_count')
+
+# Telemetry sidecar key (JSON and .obbt) -> categorizer channel
+SIDECAR_CHANNELS = {
+    'spd': 'speed',
+    'thr': 'throttle',
+    'brk': 'brake',
+    'str': 'steering',
+    'dist': 'lap_dist_pct',
+    'pos': 'position',
+    'lap': 'lap',
+    'inc': 'incident_count',
+}
+
 
 @dataclass
 class ClipCategory:
@@ -35,7 +74,7 @@ class ClipCategory:
 
 
 def categorize_clip(
-    samples: List,  # List[TelemetrySample]
+    samples,  # List[TelemetrySample], or {channel: array} columns
     event_type: str = 'unknown',
     event_label: str = '',
     position_before: int = 0,
@@ -46,6 +85,36 @@ def categorize_clip(
     """
     Analyze telemetry samples to auto-categorize a clip.
 
+    Columnar input (see columns_from_samples) takes the vectorized path.
+    A list of sample objects stays on the reference implementation: for
+    per-frame objects the object -> array conversion costs more than the
+    detectors themselves (see benchmark_categorizer.py).
+    """
+    if isinstance(samples, dict):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Columnar categorization requires NumPy")
+        return categorize_columns(
+            samples, event_type, event_label,
+            position_before, position_after, best_lap_ms, current_lap_ms,
+        )
+    return categorize_clip_reference(
+        samples, event_type, event_label,
+        position_before, position_after, best_lap_ms, current_lap_ms,
+    )
+
+
+def categorize_clip_reference(
+    samples: List,  # List[TelemetrySample]
+    event_type: str = 'unknown',
+    event_label: str = '',
+    position_before: int = 0,
+    position_after: int = 0,
+    best_lap_ms: int = 0,
+    current_lap_ms: int = 0,
+) -> ClipCategory:
+    """
+    Pure-Python reference implementation of the categorizer.
+
     Args:
         samples: Telemetry samples spanning the clip duration
         event_type: Original event type from trigger
@@ -124,15 +193,15 @@ def categorize_clip(
     if speeds:
         # Sudden speed drop (>60% reduction in short window)
         speed_ratios = []
-        window = min(15, len(speeds))  # ~1 second at 15fps
+        window = min(SPIN_WINDOW, len(speeds))  # ~1 second at 15fps
         for i in range(window, len(speeds)):
-            if speeds[i - window] > 10:  # Only if was moving
+            if speeds[i - window] > SPIN_MIN_SPEED:  # Only if was moving
                 ratio = speeds[i] / speeds[i - window]
                 speed_ratios.append(ratio)
 
-        if speed_ratios and min(speed_ratios) < 0.3:
+        if speed_ratios and min(speed_ratios) < SPIN_SPEED_RATIO:
             # Large steering + speed drop = likely spin
-            if max_steering > 1.5:  # ~86 degrees
+            if max_steering > SPIN_STEERING:  # ~86 degrees
                 detections.append((9, 'spin', 'Spin detected', 0.7))
                 tags.append('spin')
             else:
@@ -175,6 +244,12 @@ def categorize_clip(
     # === Detection: Close battle (high consistency in position proximity) ===
     # Would need gap data — skip for now, just tag if we have position changes
 
+    return _pick_category(detections, tags, event_type, event_label)
+
+
+def _pick_category(detections: List[tuple], tags: List[str],
+                   event_type: str, event_label: str) -> ClipCategory:
+    """Choose the highest-priority detection and merge tags (shared by both implementations)."""
     # === Pick best detection ===
     if event_type == 'incident' and not any(d[1] == 'incident' for d in detections):
         # Keep original incident label if no better detection
@@ -204,3 +279,156 @@ def categorize_clip(
         confidence=best[3],
         tags=tags,
     )
+
+
+# ═══════════════════════════════════════
+# Vectorized implementation
+# ═══════════════════════════════════════
+
+def columns_from_samples(samples: Sequence) -> Dict[str, 'np.ndarray']:
+    """Columnar arrays (one per channel) from TelemetrySample-like objects."""
+    names = FLOAT_CHANNELS + INT_CHANNELS
+    # One pass over the objects into a (n, channels) block, then split
+    rows = np.fromiter(
+        chain.from_iterable(map(attrgetter(*names), samples)),
+        dtype=np.float64, count=len(samples) * len(names),
+    ).reshape(len(samples), len(names))
+    columns = {name: rows[:, i] for i, name in enumerate(FLOAT_CHANNELS)}
+    for i, name in enumerate(INT_CHANNELS, len(FLOAT_CHANNELS)):
+        columns[name] = rows[:, i].astype(np.int64)
+    return columns
+
+
+def columns_from_sidecar(channels: Dict[str, Sequence]) -> Dict[str, 'np.ndarray']:
+    """Columnar arrays from telemetry sidecar channels (abbreviated keys)."""
+    count = len(next(iter(channels.values()), ()))
+    columns = {}
+    for key, name in SIDECAR_CHANNELS.items():
+        dtype = np.int64 if name in INT_CHANNELS else np.float64
+        values = channels.get(key)
+        columns[name] = np.asarray(values, dtype=dtype) if values is not None else np.zeros(count, dtype)
+    return columns
+
+
+def lagged_ratio_below(values: 'np.ndarray', lag: int, min_base: float, threshold: float) -> bool:
+    """
+    True if values[i] / values[i - lag] < threshold for any i where
+    values[i - lag] > min_base. O(n): one shifted comparison, no window loop.
+    """
+    if lag <= 0 or len(values) <= lag:
+        return False
+    base = values[:-lag]
+    later = values[lag:]
+    moving = base > min_base
+    if not moving.any():
+        return False
+    return bool((later[moving] / base[moving]).min() < threshold)
+
+
+def categorize_columns(
+    columns: Dict[str, 'np.ndarray'],
+    event_type: str = 'unknown',
+    event_label: str = '',
+    position_before: int = 0,
+    position_after: int = 0,
+    best_lap_ms: int = 0,
+    current_lap_ms: int = 0,
+) -> ClipCategory:
+    """
+    Categorize from columnar arrays (see columns_from_samples). Produces the
+    same result as categorize_clip_reference for the same samples.
+    """
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+    speed_all = columns['speed']
+    if len(speed_all) == 0:
+        return ClipCategory(
+            primary=event_type or 'unknown',
+            label=event_label or 'Unknown clip',
+            confidence=0.0,
+            tags=[],
+        )
+
+    tags: List[str] = []
+    detections: List[tuple] = []
+
+    brake = columns['brake']
+    lap_dist = columns['lap_dist_pct']
+    speeds = speed_all[speed_all > 0]
+    positions = columns['position'][columns['position'] > 0]
+    laps = columns['lap'][columns['lap'] > 0]
+    incidents = columns['incident_count'][columns['incident_count'] > 0]
+
+    max_speed = float(speeds.max()) if len(speeds) else 0
+    max_brake = float(brake.max())
+    max_steering = float(np.abs(columns['steering']).max())
+
+    # === Detection: Position change ===
+    if len(positions) >= 2:
+        pos_start = int(positions[0])
+        pos_end = int(positions[-1])
+        if position_before > 0 and position_after > 0:
+            pos_start = position_before
+            pos_end = position_after
+
+        if pos_end < pos_start:
+            gained = pos_start - pos_end
+            detections.append((
+                10, 'overtake',
+                f'Gained P{pos_start}→P{pos_end} (+{gained})',
+                min(1.0, 0.6 + gained * 0.2),
+            ))
+            tags.append('position_gained')
+        elif pos_end > pos_start:
+            lost = pos_end - pos_start
+            detections.append((
+                8, 'position_lost',
+                f'Lost P{pos_start}→P{pos_end} (-{lost})',
+                min(1.0, 0.5 + lost * 0.15),
+            ))
+            tags.append('position_lost')
+
+    # === Detection: Incident (from telemetry) ===
+    if len(incidents) and incidents[-1] > incidents[0]:
+        new_incidents = int(incidents[-1] - incidents[0])
+        detections.append((12, 'incident', f'Incident (+{new_incidents}x)', 0.95))
+        tags.append('incident')
+
+    # === Detection: Off-track / Spin (speed derivative over SPIN_WINDOW) ===
+    if len(speeds):
+        window = min(SPIN_WINDOW, len(speeds))
+        if lagged_ratio_below(speeds, window, SPIN_MIN_SPEED, SPIN_SPEED_RATIO):
+            if max_steering > SPIN_STEERING:
+                detections.append((9, 'spin', 'Spin detected', 0.7))
+                tags.append('spin')
+            else:
+                detections.append((7, 'off_track', 'Off track', 0.6))
+                tags.append('off_track')
+
+    # === Detection: Pit stop ===
+    if len(lap_dist) >= 10:
+        pit = (speed_all > 0) & (speed_all < 30) & (lap_dist < 0.05)
+        if int(np.count_nonzero(pit)) > 5:
+            detections.append((6, 'pit_stop', 'Pit stop', 0.8))
+            tags.append('pit_stop')
+
+    # === Detection: Fastest lap ===
+    if best_lap_ms > 0 and current_lap_ms > 0 and current_lap_ms <= best_lap_ms:
+        detections.append((11, 'fastest_lap', 'Fastest lap!', 0.9))
+        tags.append('fastest_lap')
+        tags.append('highlight')
+
+    # === Detection: Hard braking zone ===
+    if max_brake > 0.95 and max_speed > 60:
+        detections.append((
+            4, 'hard_braking',
+            f'Heavy braking from {max_speed * 2.237:.0f}mph',
+            0.5 + max_brake * 0.3,
+        ))
+        tags.append('hard_braking')
+
+    # === Detection: First lap ===
+    if len(laps) and int(laps.min()) <= 1:
+        detections.append((5, 'race_start', 'Lap 1 action', 0.6))
+        tags.append('race_start')
+
+    return _pick_category(detections, tags, event_type, event_label)
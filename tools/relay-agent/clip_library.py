@@ -0,0 +1,471 @@
+"""
+OBB Replay Intelligence — Clip Library
+
+Persistent SQLite index of every saved clip and its sidecar files
+(metadata JSON, thumbnail, telemetry). Replaces re-scanning the clip
+directory after every save:
+
+  - Storage accounting is incremental: bytes are recorded once when a
+    clip is added and a running total is kept, so the quota check is O(1).
+  - Eviction is weighted by severity: a clip's eviction score is its age
+    divided by its retention weight, so a major incident is kept ~4x as
+    long as a minor one under the same storage pressure.
+  - The Electron UI can query by session, event type, severity, tag and
+    time range without touching the filesystem.
+
+An index that is missing (first run, or deleted) is rebuilt from the
+metadata JSON files already in the clip directory.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_FILENAME = 'clips.db'
+SCHEMA_VERSION = 1
+
+# Relative retention: higher weights survive longer under quota pressure
+RETENTION_WEIGHT = {'minor': 1.0, 'moderate': 2.0, 'major': 4.0}
+MANUAL_RETENTION_WEIGHT = 4.0
+
+# Sidecar kinds, keyed by the suffix replacing '.mp4'
+SIDECAR_SUFFIXES = {
+    'metadata': '.json',
+    'thumbnail': '_thumb.jpg',
+    'telemetry': '_telemetry.json',
+    'telemetry_columnar': '_telemetry.obbt',
+}
+
+QUERY_FIELDS = ('session_id', 'event_type', 'severity', 'tag', 'since', 'until', 'limit', 'offset', 'order')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    clip_id           TEXT PRIMARY KEY,
+    session_id        TEXT NOT NULL DEFAULT '',
+    event_type        TEXT NOT NULL DEFAULT '',
+    event_label       TEXT NOT NULL DEFAULT '',
+    severity          TEXT NOT NULL DEFAULT 'minor',
+    session_time_ms   INTEGER NOT NULL DEFAULT 0,
+    wall_clock_event  REAL NOT NULL DEFAULT 0,
+    created_at        REAL NOT NULL,
+    duration_ms       INTEGER NOT NULL DEFAULT 0,
+    video_path        TEXT NOT NULL,
+    total_bytes       INTEGER NOT NULL DEFAULT 0,
+    retention_weight  REAL NOT NULL DEFAULT 1.0,
+    tags              TEXT NOT NULL DEFAULT '[]',
+    metadata          TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_clips_session ON clips (session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_clips_created ON clips (created_at);
+CREATE INDEX IF NOT EXISTS idx_clips_type ON clips (event_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_clips_severity ON clips (severity, created_at);
+
+CREATE TABLE IF NOT EXISTS clip_files (
+    clip_id     TEXT NOT NULL REFERENCES clips (clip_id) ON DELETE CASCADE,
+    kind        TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    size_bytes  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (clip_id, kind)
+);
+
+CREATE TABLE IF NOT EXISTS clip_tags (
+    clip_id  TEXT NOT NULL REFERENCES clips (clip_id) ON DELETE CASCADE,
+    tag      TEXT NOT NULL,
+    PRIMARY KEY (tag, clip_id)
+);
+
+CREATE TABLE IF NOT EXISTS library_stats (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
+"""
+
+
+def retention_weight(severity: str, event_type: str = '') -> float:
+    """Manual clips are kept like major incidents; everything else by severity."""
+    if event_type == 'manual':
+        return MANUAL_RETENTION_WEIGHT
+    return RETENTION_WEIGHT.get(severity, RETENTION_WEIGHT['minor'])
+
+
+def sidecar_paths(video_path: str) -> Dict[str, str]:
+    """All files belonging to a clip, keyed by kind (including the video itself)."""
+    paths = {'video': video_path}
+    for kind, suffix in SIDECAR_SUFFIXES.items():
+        paths[kind] = video_path[:-len('.mp4')] + suffix if video_path.endswith('.mp4') else video_path + suffix
+    return paths
+
+
+class ClipLibrary:
+    """SQLite-backed clip index. Thread-safe (one connection behind a lock)."""
+
+    def __init__(self, clip_dir: str, db_path: Optional[str] = None):
+        self.clip_dir = clip_dir
+        self.db_path = db_path or os.path.join(clip_dir, DB_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version == 0:
+                self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+        # Running totals live in memory; library_stats persists them
+        self.total_bytes = self._get_stat('total_bytes')
+        self.clip_count = self._get_stat('clip_count')
+
+        if self.clip_count == 0:
+            self.rebuild()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ─── Write ───────────────────────────────
+
+    def add_clip(self, metadata: Dict[str, Any], video_path: str,
+                 created_at: Optional[float] = None) -> int:
+        """
+        Index a saved clip and whichever of its sidecars exist.
+        Returns the clip's total bytes on disk.
+        """
+        files = {}
+        for kind, path in sidecar_paths(video_path).items():
+            try:
+                files[kind] = (path, os.path.getsize(path))
+            except OSError:
+                continue
+        total = sum(size for _, size in files.values())
+        tags = list(metadata.get('tags') or [])
+        severity = metadata.get('severity') or 'minor'
+        event_type = metadata.get('event_type') or ''
+        clip_id = metadata.get('clip_id') or os.path.splitext(os.path.basename(video_path))[0]
+
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                'SELECT total_bytes FROM clips WHERE clip_id = ?', (clip_id,)
+            ).fetchone()
+            self._conn.execute(
+                """INSERT OR REPLACE INTO clips (
+                       clip_id, session_id, event_type, event_label, severity,
+                       session_time_ms, wall_clock_event, created_at, duration_ms,
+                       video_path, total_bytes, retention_weight, tags, metadata
+                   ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    clip_id,
+                    metadata.get('session_id') or '',
+                    event_type,
+                    metadata.get('event_label') or '',
+                    severity,
+                    int(metadata.get('session_time_ms') or 0),
+                    float(metadata.get('wall_clock_event') or 0),
+                    created_at if created_at is not None else time.time(),
+                    int(metadata.get('duration_ms') or 0),
+                    os.path.abspath(video_path),
+                    total,
+                    retention_weight(severity, event_type),
+                    json.dumps(tags),
+                    json.dumps(metadata),
+                ),
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO clip_files (clip_id, kind, path, size_bytes) VALUES (?, ?, ?, ?)',
+                [(clip_id, kind, os.path.abspath(path), size) for kind, (path, size) in files.items()],
+            )
+            self._conn.execute('DELETE FROM clip_tags WHERE clip_id = ?', (clip_id,))
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO clip_tags (clip_id, tag) VALUES (?, ?)',
+                [(clip_id, tag) for tag in tags],
+            )
+            if previous is None:
+                self._bump(total, 1)
+            else:
+                self._bump(total - previous['total_bytes'], 0)
+        return total
+
+    def update_clip(self, clip_id: str, metadata: Dict[str, Any]):
+        """Replace a clip's metadata / tags / severity (e.g. after re-categorization)."""
+        self.update_clips([(clip_id, metadata)])
+
+    def update_clips(self, updates: Iterable[tuple]) -> List[str]:
+        """
+        Apply many (clip_id, metadata) updates in one transaction: either all
+        land or none do. Returns the clip_ids that are not in the index.
+        """
+        missing = []
+        with self._lock, self._conn:
+            for clip_id, metadata in updates:
+                row = self._conn.execute(
+                    'SELECT 1 FROM clips WHERE clip_id = ?', (clip_id,)
+                ).fetchone()
+                if row is None:
+                    missing.append(clip_id)
+                    continue
+                tags = list(metadata.get('tags') or [])
+                severity = metadata.get('severity') or 'minor'
+                event_type = metadata.get('event_type') or ''
+                self._conn.execute(
+                    """UPDATE clips SET event_type = ?, event_label = ?, severity = ?,
+                           retention_weight = ?, tags = ?, metadata = ?
+                       WHERE clip_id = ?""",
+                    (
+                        event_type,
+                        metadata.get('event_label') or '',
+                        severity,
+                        retention_weight(severity, event_type),
+                        json.dumps(tags),
+                        json.dumps(metadata),
+                        clip_id,
+                    ),
+                )
+                self._conn.execute('DELETE FROM clip_tags WHERE clip_id = ?', (clip_id,))
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO clip_tags (clip_id, tag) VALUES (?, ?)',
+                    [(clip_id, tag) for tag in tags],
+                )
+        return missing
+
+    def refresh_files(self, clip_id: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Re-stat a clip's sidecars after they changed on disk (e.g. telemetry
+        converted to columnar) and store `metadata` if given. Returns the new
+        total bytes, or None if the clip is not in the index.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT video_path, total_bytes FROM clips WHERE clip_id = ?', (clip_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            files = {}
+            for kind, path in sidecar_paths(row['video_path']).items():
+                try:
+                    files[kind] = (path, os.path.getsize(path))
+                except OSError:
+                    continue
+            total = sum(size for _, size in files.values())
+            self._conn.execute('DELETE FROM clip_files WHERE clip_id = ?', (clip_id,))
+            self._conn.executemany(
+                'INSERT INTO clip_files (clip_id, kind, path, size_bytes) VALUES (?, ?, ?, ?)',
+                [(clip_id, kind, path, size) for kind, (path, size) in files.items()],
+            )
+            if metadata is not None:
+                self._conn.execute(
+                    'UPDATE clips SET total_bytes = ?, metadata = ? WHERE clip_id = ?',
+                    (total, json.dumps(metadata), clip_id),
+                )
+            else:
+                self._conn.execute('UPDATE clips SET total_bytes = ? WHERE clip_id = ?', (total, clip_id))
+            self._bump(total - row['total_bytes'], 0)
+        return total
+
+    def remove_clip(self, clip_id: str, delete_files: bool = True) -> int:
+        """Drop a clip from the index (and disk). Returns bytes freed."""
+        with self._lock:
+            files = self._conn.execute(
+                'SELECT path FROM clip_files WHERE clip_id = ?', (clip_id,)
+            ).fetchall()
+            row = self._conn.execute(
+                'SELECT total_bytes FROM clips WHERE clip_id = ?', (clip_id,)
+            ).fetchone()
+            if row is None:
+                return 0
+            if delete_files:
+                for f in files:
+                    try:
+                        os.remove(f['path'])
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.warning(f"Failed to delete clip file: {e}")
+            with self._conn:
+                self._conn.execute('DELETE FROM clips WHERE clip_id = ?', (clip_id,))
+                self._bump(-row['total_bytes'], -1)
+            return row['total_bytes']
+
+    # ─── Quota ───────────────────────────────
+
+    def over_quota(self, max_bytes: int) -> bool:
+        """O(1): compares the running total, no filesystem access."""
+        return self.total_bytes > max_bytes
+
+    def enforce_quota(self, max_bytes: int, target_ratio: float = 0.8,
+                      now: Optional[float] = None) -> List[str]:
+        """
+        Evict clips with the highest age / retention_weight until the library
+        is under max_bytes * target_ratio. Returns evicted clip ids.
+        """
+        if not self.over_quota(max_bytes):
+            return []
+        now = now if now is not None else time.time()
+        target = int(max_bytes * target_ratio)
+        evicted = []
+        while self.total_bytes > target:
+            with self._lock:
+                candidates = self._conn.execute(
+                    """SELECT clip_id FROM clips
+                       ORDER BY (? - created_at) / retention_weight DESC
+                       LIMIT 32""",
+                    (now,),
+                ).fetchall()
+            if not candidates:
+                break
+            for row in candidates:
+                if self.total_bytes <= target:
+                    break
+                self.remove_clip(row['clip_id'])
+                evicted.append(row['clip_id'])
+        return evicted
+
+    # ─── Query ───────────────────────────────
+
+    def query(self, session_id: Optional[str] = None, event_type: Optional[str] = None,
+              severity: Optional[str] = None, tag: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 50, offset: int = 0, order: str = 'newest') -> List[Dict[str, Any]]:
+        """Clips matching every given filter, newest (or oldest) first."""
+        sql = 'SELECT c.* FROM clips c'
+        where, params = [], []
+        if tag:
+            sql += ' JOIN clip_tags t ON t.clip_id = c.clip_id AND t.tag = ?'
+            params.append(tag)
+        for column, value in (('session_id', session_id), ('event_type', event_type),
+                              ('severity', severity)):
+            if value:
+                where.append(f'c.{column} = ?')
+                params.append(value)
+        if since is not None:
+            where.append('c.created_at >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('c.created_at < ?')
+            params.append(until)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY c.created_at ' + ('ASC' if order == 'oldest' else 'DESC')
+        sql += ' LIMIT ? OFFSET ?'
+        params += [max(1, min(int(limit), 500)), max(0, int(offset))]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            files = self._files_for([r['clip_id'] for r in rows])
+        return [self._row_to_dict(r, files.get(r['clip_id'], {})) for r in rows]
+
+    def query_request(self, request: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Entry point for Electron: whitelisted filters in, clips + library stats out."""
+        filters = {k: v for k, v in (request or {}).items() if k in QUERY_FIELDS and v is not None}
+        try:
+            clips = self.query(**filters)
+        except (TypeError, ValueError) as e:
+            return {'error': str(e), 'clips': [], 'stats': self.get_stats()}
+        return {'clips': clips, 'stats': self.get_stats()}
+
+    def get_clip(self, clip_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM clips WHERE clip_id = ?', (clip_id,)).fetchone()
+            if row is None:
+                return None
+            files = self._files_for([clip_id])
+        return self._row_to_dict(row, files.get(clip_id, {}))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            by_severity = {
+                r['severity']: {'clips': r['n'], 'bytes': r['bytes']}
+                for r in self._conn.execute(
+                    'SELECT severity, COUNT(*) AS n, SUM(total_bytes) AS bytes FROM clips GROUP BY severity'
+                )
+            }
+        return {
+            'clips': self.clip_count,
+            'total_bytes': self.total_bytes,
+            'total_mb': round(self.total_bytes / (1024 * 1024), 1),
+            'by_severity': by_severity,
+        }
+
+    # ─── Rebuild ─────────────────────────────
+
+    def rebuild(self) -> int:
+        """Index clips already on disk (one directory scan). Returns clips added."""
+        if not os.path.isdir(self.clip_dir):
+            return 0
+        added = 0
+        for name in os.listdir(self.clip_dir):
+            if not name.endswith('.mp4'):
+                continue
+            video_path = os.path.join(self.clip_dir, name)
+            meta_path = sidecar_paths(video_path)['metadata']
+            metadata: Dict[str, Any] = {}
+            try:
+                with open(meta_path) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                pass
+            try:
+                created_at = os.path.getmtime(video_path)
+            except OSError:
+                continue
+            metadata.setdefault('clip_id', name[:-len('.mp4')])
+            self.add_clip(metadata, video_path, created_at=created_at)
+            added += 1
+        if added:
+            logger.info(f"📚 Clip library rebuilt: {added} clips, {self.total_bytes / (1024 * 1024):.1f}MB")
+        return added
+
+    # ─── Internals ───────────────────────────
+
+    def _get_stat(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM library_stats WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else 0
+
+    def _bump(self, bytes_delta: int, count_delta: int):
+        """Update running totals (lock + transaction held by caller)."""
+        self.total_bytes += bytes_delta
+        self.clip_count += count_delta
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO library_stats (key, value) VALUES (?, ?)',
+            [('total_bytes', self.total_bytes), ('clip_count', self.clip_count)],
+        )
+
+    def _files_for(self, clip_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        clip_ids = list(clip_ids)
+        if not clip_ids:
+            return {}
+        placeholders = ','.join('?' * len(clip_ids))
+        files: Dict[str, Dict[str, Any]] = {}
+        for r in self._conn.execute(
+            f'SELECT clip_id, kind, path, size_bytes FROM clip_files WHERE clip_id IN ({placeholders})',
+            clip_ids,
+        ):
+            files.setdefault(r['clip_id'], {})[r['kind']] = {'path': r['path'], 'size_bytes': r['size_bytes']}
+        return files
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row, files: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'clip_id': row['clip_id'],
+            'session_id': row['session_id'],
+            'event_type': row['event_type'],
+            'event_label': row['event_label'],
+            'severity': row['severity'],
+            'session_time_ms': row['session_time_ms'],
+            'wall_clock_event': row['wall_clock_event'],
+            'created_at': row['created_at'],
+            'duration_ms': row['duration_ms'],
+            'video_path': row['video_path'],
+            'total_bytes': row['total_bytes'],
+            'tags': json.loads(row['tags']),
+            'files': files,
+        }
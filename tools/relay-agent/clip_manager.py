@@ -0,0 +1,120 @@
+"""
+OBB Replay Intelligence — Clip Window Manager
+
+Tracks any number of open clip recordings. Each incident opens a window
+[event - pre_event_seconds, event + post_event_seconds]; every captured
+frame is appended to every window still recording, by reference, so a
+multi-car pileup that fires five triggers records each frame once.
+
+Windows can optionally be merged when they overlap, producing one longer
+clip that lists every event it covers instead of several near-duplicates.
+
+All methods are thread-safe: triggers arrive from the telemetry loop and
+the LocalServer thread while the capture thread feeds frames.
+"""
+
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+SEVERITY_RANK = {'minor': 0, 'moderate': 1, 'major': 2}
+
+
+@dataclass
+class ClipWindow:
+    window_id: int
+    meta: Dict[str, Any]            # event_type, event_label, severity, ...
+    start_ts: float                 # wall clock of first wanted frame
+    end_ts: float                   # wall clock when post-event recording stops
+    frames: List[Any] = field(default_factory=list)  # BufferedFrame, shared between windows
+    events: List[Dict[str, Any]] = field(default_factory=list)  # merged trigger metas
+    pinned: List[Any] = field(default_factory=list)  # Segments pinned for this clip (segment mode)
+
+
+class ClipManager:
+    """Open clip windows plus the frames they share."""
+
+    def __init__(self, merge_overlapping: bool = False, max_clip_seconds: float = 30):
+        self.merge_overlapping = merge_overlapping
+        self.max_clip_seconds = max_clip_seconds
+        self._windows: List[ClipWindow] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        # Stats
+        self.windows_opened = 0
+        self.windows_merged = 0
+
+    def open_window(self, meta: Dict[str, Any], start_ts: float, end_ts: float,
+                    pre_frames: List[Any], pinned: List[Any] = ()) -> ClipWindow:
+        """
+        Start recording a clip. With merging enabled, an overlapping window
+        is extended instead (as long as it stays within max_clip_seconds).
+        `pinned` segments are handed to whichever window ends up owning them.
+        """
+        with self._lock:
+            if self.merge_overlapping:
+                for window in self._windows:
+                    if start_ts <= window.end_ts and end_ts - window.start_ts <= self.max_clip_seconds:
+                        window.end_ts = max(window.end_ts, end_ts)
+                        window.events.append(meta)
+                        window.pinned.extend(pinned)
+                        if SEVERITY_RANK.get(meta['severity'], 0) > SEVERITY_RANK.get(window.meta['severity'], 0):
+                            window.meta['severity'] = meta['severity']
+                        self.windows_merged += 1
+                        return window
+
+            window = ClipWindow(
+                window_id=next(self._ids),
+                meta=dict(meta),
+                start_ts=start_ts,
+                end_ts=end_ts,
+                frames=list(pre_frames),
+                events=[meta],
+                pinned=list(pinned),
+            )
+            self._windows.append(window)
+            self.windows_opened += 1
+            return window
+
+    def shared_frames_since(self, since_ts: float) -> Dict[float, Any]:
+        """Frames already held by open windows, keyed by timestamp, for reuse by a new window."""
+        with self._lock:
+            shared = {}
+            for window in self._windows:
+                for frame in reversed(window.frames):
+                    if frame.timestamp < since_ts:
+                        break
+                    shared[frame.timestamp] = frame
+            return shared
+
+    def wants_frames(self, now: float) -> bool:
+        """True if any open window is still in its post-event phase."""
+        with self._lock:
+            return any(now <= w.end_ts for w in self._windows)
+
+    def add_frame(self, frame: Any):
+        """Append one frame (by reference) to every window still recording."""
+        with self._lock:
+            for window in self._windows:
+                if frame.timestamp <= window.end_ts:
+                    window.frames.append(frame)
+
+    def pop_expired(self, now: float) -> List[ClipWindow]:
+        """Remove and return windows whose post-event phase has ended."""
+        with self._lock:
+            done = [w for w in self._windows if now > w.end_ts]
+            if done:
+                self._windows = [w for w in self._windows if now <= w.end_ts]
+            return done
+
+    def pop_all(self) -> List[ClipWindow]:
+        with self._lock:
+            windows, self._windows = self._windows, []
+            return windows
+
+    @property
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._windows)
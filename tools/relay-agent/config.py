@@ -71,18 +71,40 @@ VIDEO_FPS = int(os.getenv('VIDEO_FPS', '60'))
 VIDEO_WIDTH = int(os.getenv('VIDEO_WIDTH', '854'))
 VIDEO_HEIGHT = int(os.getenv('VIDEO_HEIGHT', '480'))
 VIDEO_QUALITY = int(os.getenv('VIDEO_QUALITY', '70'))
+VIDEO_ADAPTIVE = os.getenv('VIDEO_ADAPTIVE', 'true').lower() == 'true'  # Step fps/res/quality with the uplink
+VIDEO_DIFF_THRESHOLD = float(os.getenv('VIDEO_DIFF_THRESHOLD', '1.5'))  # Skip frames below this mean pixel change (0 = off)
+VIDEO_MODE = os.getenv('VIDEO_MODE', 'jpeg').lower()  # 'jpeg' (frame per message) or 'h264' (ffmpeg stream)
+VIDEO_H264_EXPERIMENTAL = os.getenv('VIDEO_H264_EXPERIMENTAL', 'false').lower() == 'true'  # h264 needs this too: no server-side video_chunk relay yet
+VIDEO_H264_CONTAINER = os.getenv('VIDEO_H264_CONTAINER', 'mpegts').lower()  # 'mpegts' or 'fmp4'
+VIDEO_H264_CODEC = os.getenv('VIDEO_H264_CODEC', 'libx264')
+VIDEO_H264_CRF = int(os.getenv('VIDEO_H264_CRF', '28'))
+VIDEO_CHUNK_MS = int(os.getenv('VIDEO_CHUNK_MS', '250'))  # H.264 chunk send cadence
+
+# Screen Capture Region (shared by live video and replay clips)
+CAPTURE_MONITOR = int(os.getenv('CAPTURE_MONITOR', '1'))  # mss index: 1 = primary, 0 = all monitors
+CAPTURE_REGION_MODE = os.getenv('CAPTURE_REGION_MODE', 'monitor').lower()  # monitor | rect | center | window
+CAPTURE_REGION = os.getenv('CAPTURE_REGION', '')  # 'left,top,width,height' for rect mode
 
 # Replay Clip Capture
 CLIP_CAPTURE_FPS = int(os.getenv('CLIP_CAPTURE_FPS', '15'))
 CLIP_CAPTURE_WIDTH = int(os.getenv('CLIP_CAPTURE_WIDTH', '1280'))
 CLIP_CAPTURE_HEIGHT = int(os.getenv('CLIP_CAPTURE_HEIGHT', '720'))
 CLIP_BUFFER_SECONDS = int(os.getenv('CLIP_BUFFER_SECONDS', '60'))
+CLIP_BUFFER_MAX_MB = int(os.getenv('CLIP_BUFFER_MAX_MB', '256'))  # Hard cap on rolling buffer memory
+CLIP_TELEMETRY_FORMAT = os.getenv('CLIP_TELEMETRY_FORMAT', 'json').lower()  # json | columnar | both
+CLIP_TELEMETRY_COMPRESS = os.getenv('CLIP_TELEMETRY_COMPRESS', 'false').lower() == 'true'
+CLIP_TELEMETRY_RATE_HZ = int(os.getenv('CLIP_TELEMETRY_RATE_HZ', '60'))  # Player telemetry ring rate, max 60 = every iRacing tick (0 = off)
 CLIP_PRE_EVENT_SECONDS = int(os.getenv('CLIP_PRE_EVENT_SECONDS', '10'))
 CLIP_POST_EVENT_SECONDS = int(os.getenv('CLIP_POST_EVENT_SECONDS', '10'))
 CLIP_MAX_SECONDS = int(os.getenv('CLIP_MAX_SECONDS', '30'))
 CLIP_JPEG_QUALITY = int(os.getenv('CLIP_JPEG_QUALITY', '80'))
 CLIP_MAX_STORAGE_MB = int(os.getenv('CLIP_MAX_STORAGE_MB', '5000'))
 CLIP_OUTPUT_DIR = os.getenv('CLIP_OUTPUT_DIR', '')  # Default: ~/Ok-Box-Box/clips/
+CLIP_COMPRESS_WORKERS = int(os.getenv('CLIP_COMPRESS_WORKERS', '2'))  # JPEG compression threads
+CLIP_ENCODE_WORKERS = int(os.getenv('CLIP_ENCODE_WORKERS', '1'))  # Max concurrent clip encodes
+CLIP_MERGE_OVERLAPPING = os.getenv('CLIP_MERGE_OVERLAPPING', 'false').lower() == 'true'
+CLIP_SEGMENT_MODE = os.getenv('CLIP_SEGMENT_MODE', 'false').lower() == 'true'  # Continuous H.264 segments
+CLIP_SEGMENT_SECONDS = float(os.getenv('CLIP_SEGMENT_SECONDS', '2'))
 
 # Session Types
 SESSION_TYPES = {
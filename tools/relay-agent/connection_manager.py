@@ -0,0 +1,168 @@
+"""
+ConnectionManager - Background connect/reconnect for PitBoxClient
+
+Keeps the cloud connection alive without ever blocking the iRacing
+acquisition loop:
+- Connect and reconnect run on a daemon thread
+- Jittered exponential backoff, no attempt cap
+- Session registration + session_metadata are replayed on every connect
+- Connection state is exposed for the GUI / Electron bridge
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionState(Enum):
+    """Connection state for the cloud client"""
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    BACKOFF = "backoff"
+    STOPPED = "stopped"
+
+
+@dataclass
+class ConnectionStatus:
+    """Snapshot of the connection manager state"""
+    state: str
+    url: str
+    attempts: int = 0
+    total_connects: int = 0
+    connected_since_ms: float = 0
+    next_attempt_ms: float = 0
+    last_error: Optional[str] = None
+
+
+class ConnectionManager:
+    """
+    Owns the PitBoxClient connection lifecycle on a background thread.
+
+    The relay main loop never calls connect() itself; it just starts the
+    manager and keeps polling iRacing. Emits made while disconnected are
+    dropped by PitBoxClient as before, and session state is resent by the
+    client's connect handler once the link comes back.
+    """
+
+    BASE_BACKOFF_S = 1.0
+    MAX_BACKOFF_S = 30.0
+    CONNECT_TIMEOUT_S = 10.0
+    HEALTH_CHECK_S = 1.0
+
+    def __init__(self, client, on_state_change: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.client = client
+        self.on_state_change = on_state_change
+
+        self.state = ConnectionState.DISCONNECTED
+        self.attempts = 0          # Consecutive failed attempts (resets on connect)
+        self.total_connects = 0
+        self.connected_since_ms: float = 0
+        self.next_attempt_ms: float = 0
+        self.last_error: Optional[str] = None
+
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+        # Library reconnection gives up after N attempts; we own retries instead
+        self.client.on_connect = self._handle_connect
+        self.client.on_disconnect = self._handle_disconnect
+
+    def start(self):
+        """Start the background connection thread (returns immediately)"""
+        if self.running:
+            return
+        if config.RELAY_KILL_SWITCH:
+            logger.warning("🛑 Kill switch active - cloud connection disabled")
+            self._set_state(ConnectionState.STOPPED)
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="pitbox-connection")
+        self._thread.start()
+
+    def stop(self):
+        """Stop reconnecting. Does not disconnect the client."""
+        self.running = False
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self._set_state(ConnectionState.STOPPED)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable status snapshot"""
+        with self._lock:
+            status = ConnectionStatus(
+                state=self.state.value,
+                url=self.client.url,
+                attempts=self.attempts,
+                total_connects=self.total_connects,
+                connected_since_ms=self.connected_since_ms,
+                next_attempt_ms=self.next_attempt_ms,
+                last_error=self.last_error,
+            )
+        return asdict(status)
+
+    # =========================================================================
+    # Internals
+    # =========================================================================
+
+    def _run(self):
+        """Connect, then watch the link; back off between failed attempts"""
+        while self.running:
+            if self.client.is_connected():
+                self._wake.wait(self.HEALTH_CHECK_S)
+                self._wake.clear()
+                continue
+
+            self._set_state(ConnectionState.CONNECTING)
+            if self.client.connect(wait_timeout=self.CONNECT_TIMEOUT_S):
+                continue
+
+            self.last_error = self.client.last_error
+            self.attempts += 1
+            delay = self._backoff_delay(self.attempts)
+            self.next_attempt_ms = (time.time() + delay) * 1000
+            self._set_state(ConnectionState.BACKOFF)
+            logger.debug(f"Reconnect attempt {self.attempts} failed, retrying in {delay:.1f}s")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential backoff: uniform(base/2, min(cap, base * 2^n))"""
+        ceiling = min(self.MAX_BACKOFF_S, self.BASE_BACKOFF_S * (2 ** min(attempt, 16)))
+        return random.uniform(self.BASE_BACKOFF_S / 2, ceiling)
+
+    def _handle_connect(self):
+        with self._lock:
+            self.attempts = 0
+            self.total_connects += 1
+            self.connected_since_ms = time.time() * 1000
+            self.next_attempt_ms = 0
+            self.last_error = None
+        self._set_state(ConnectionState.CONNECTED)
+
+    def _handle_disconnect(self):
+        with self._lock:
+            self.connected_since_ms = 0
+        if self.running:
+            self._set_state(ConnectionState.DISCONNECTED)
+            self._wake.set()
+
+    def _set_state(self, state: ConnectionState):
+        with self._lock:
+            changed = state != self.state
+            self.state = state
+        if changed and self.on_state_change:
+            try:
+                self.on_state_change(self.get_status())
+            except Exception as e:
+                logger.debug(f"Connection state callback failed: {e}")
@@ -0,0 +1,229 @@
+"""
+OBB Replay Intelligence — Clip Encode Pool
+
+Fixed-size worker pool for clip encoding. A burst of incidents used to
+start one cv2/ffmpeg encode thread per clip, all competing with iRacing
+and the telemetry loop at once. Jobs now wait in a priority queue and at
+most `workers` encodes run concurrently.
+
+Priority: manual clips first, then major, moderate, minor; FIFO within a
+priority. Pending jobs can be cancelled (e.g. minor clips under storage
+pressure). Queue wait and encode time are tracked per job.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_PRIORITY = {'major': 1, 'moderate': 2, 'minor': 3}
+MANUAL_PRIORITY = 0
+
+
+def clip_priority(severity: str, event_type: str = '') -> int:
+    """Lower runs first: manual < major < moderate < minor."""
+    if event_type == 'manual':
+        return MANUAL_PRIORITY
+    return SEVERITY_PRIORITY.get(severity, SEVERITY_PRIORITY['minor'])
+
+
+@dataclass(order=True)
+class EncodeJob:
+    priority: int
+    seq: int
+    fn: Callable = field(compare=False)
+    args: Tuple[Any, ...] = field(compare=False, default=())
+    label: str = field(compare=False, default='')
+    on_cancel: Optional[Callable] = field(compare=False, default=None)
+    enqueued_at: float = field(compare=False, default=0)
+    started_at: float = field(compare=False, default=0)
+    finished_at: float = field(compare=False, default=0)
+    cancelled: bool = field(compare=False, default=False)
+
+    @property
+    def queue_wait_s(self) -> float:
+        return (self.started_at or time.perf_counter()) - self.enqueued_at
+
+    @property
+    def encode_s(self) -> float:
+        return (self.finished_at - self.started_at) if self.finished_at else 0.0
+
+
+class EncodePool:
+    """Bounded pool of encode workers fed from a priority queue."""
+
+    def __init__(self, workers: int = 1, name: str = 'ClipEncode'):
+        self.workers = max(1, workers)
+        self.name = name
+        self._heap: List[EncodeJob] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._active = 0
+        self.running = False
+
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+        self._encode_total_s = 0.0
+        self._encode_max_s = 0.0
+
+    # ─── Lifecycle ───────────────────────────
+
+    def start(self):
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f'{self.name}-{i}')
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def shutdown(self, timeout: float = 30.0):
+        """
+        Let queued jobs drain (up to `timeout`), then stop the workers.
+        Jobs still queued at the deadline are cancelled (their on_cancel runs).
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self.running and (self._heap or self._active) and time.time() < deadline:
+                self._cond.wait(max(0.0, deadline - time.time()))
+            self.running = False
+            dropped, self._heap = self._heap, []
+            for job in dropped:
+                job.cancelled = True
+            self.cancelled += len(dropped)
+            self._cond.notify_all()
+        if dropped:
+            logger.warning(f"⚠️ Encode pool shut down with {len(dropped)} job(s) still queued — cancelled")
+        self._run_cancel_hooks(dropped)
+        for t in self._threads:
+            t.join(timeout=max(0.1, deadline - time.time()))
+        self._threads = []
+
+    # ─── Jobs ────────────────────────────────
+
+    def submit(self, fn: Callable, *args, priority: int = SEVERITY_PRIORITY['minor'],
+               label: str = '', on_cancel: Optional[Callable] = None) -> EncodeJob:
+        """
+        Queue `fn(*args)`. A job fails if it raises or returns False.
+        `on_cancel` runs instead if the job is cancelled before it starts.
+        """
+        job = EncodeJob(
+            priority=priority,
+            seq=next(self._seq),
+            fn=fn,
+            args=args,
+            label=label,
+            on_cancel=on_cancel,
+            enqueued_at=time.perf_counter(),
+        )
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self._cond.notify()
+        return job
+
+    def cancel_pending(self, min_priority: int = SEVERITY_PRIORITY['minor']) -> int:
+        """Cancel queued (not running) jobs with priority >= min_priority. Returns count."""
+        with self._cond:
+            keep, dropped = [], []
+            for job in self._heap:
+                if job.priority >= min_priority:
+                    job.cancelled = True
+                    dropped.append(job)
+                else:
+                    keep.append(job)
+            if dropped:
+                heapq.heapify(keep)
+                self._heap = keep
+                self.cancelled += len(dropped)
+                self._cond.notify_all()
+        self._run_cancel_hooks(dropped)
+        return len(dropped)
+
+    @staticmethod
+    def _run_cancel_hooks(jobs: List[EncodeJob]):
+        """Run on_cancel for dropped jobs (outside the lock)."""
+        for job in jobs:
+            if job.on_cancel:
+                try:
+                    job.on_cancel()
+                except Exception as e:
+                    logger.error(f"❌ Cancel hook for {job.label} failed: {e}")
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            done = max(1, self.completed + self.failed)
+            return {
+                'workers': self.workers,
+                'active': self._active,
+                'pending': len(self._heap),
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'avg_queue_wait_s': round(self._wait_total_s / done, 2),
+                'max_queue_wait_s': round(self._wait_max_s, 2),
+                'avg_encode_s': round(self._encode_total_s / done, 2),
+                'max_encode_s': round(self._encode_max_s, 2),
+            }
+
+    # ─── Worker ──────────────────────────────
+
+    def _next_job(self) -> Optional[EncodeJob]:
+        with self._cond:
+            while self.running and not self._heap:
+                self._cond.wait()
+            if not self.running:
+                return None
+            job = heapq.heappop(self._heap)
+            job.started_at = time.perf_counter()
+            self._active += 1
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                # Jobs that handle their own errors report failure by returning False
+                ok = job.fn(*job.args) is not False
+                if not ok:
+                    logger.warning(f"⚠️ Encode job {job.label} reported failure")
+            except Exception as e:
+                ok = False
+                logger.error(f"❌ Encode job {job.label} failed: {e}")
+            job.finished_at = time.perf_counter()
+
+            with self._cond:
+                self._active -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._wait_total_s += job.queue_wait_s
+                self._wait_max_s = max(self._wait_max_s, job.queue_wait_s)
+                self._encode_total_s += job.encode_s
+                self._encode_max_s = max(self._encode_max_s, job.encode_s)
+                self._cond.notify_all()
+
+            logger.debug(
+                f"Encode job {job.label}: waited {job.queue_wait_s:.2f}s, "
+                f"encoded in {job.encode_s:.2f}s"
+            )
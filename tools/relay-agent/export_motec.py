@@ -1,32 +1,60 @@
 from exporters.motec_exporter import MoTeCLDExporter
-import random
+from exporters.ld_structs import DATATYPE_SHORT, DATATYPE_LONG
+from exporters.ld_reader import LDFile
 import math
+import sys
 
 def main():
-    exporter = MoTeCLDExporter()
-    
-    # Define channels
+    exporter = MoTeCLDExporter(frequency=60, lap_channel="Lap", spill_samples=4096)
+    exporter.set_session_info(driver="Test Driver", vehicle="Test Car", venue="Test Track",
+                              event="Test Event", session="Practice", comment="Generated by export_motec.py")
+
+    # Define channels (multi-rate, mixed types)
     exporter.add_channel("Speed", "km/h")
-    exporter.add_channel("RPM", "rpm")
-    exporter.add_channel("Throttle", "%")
-    exporter.add_channel("Brake", "%")
-    exporter.add_channel("Steering", "deg")
-    
-    # Generate dummy data
+    exporter.add_channel("RPM", "rpm", datatype=DATATYPE_LONG)
+    exporter.add_channel("Throttle", "%", freq=30)
+    exporter.add_channel("Brake", "%", freq=30)
+    exporter.add_channel("Steering", "deg", datatype=DATATYPE_SHORT, dec=1)
+    exporter.add_channel("Gear", "", freq=10, datatype=DATATYPE_SHORT)
+    exporter.add_channel("Lap", "", freq=1, datatype=DATATYPE_SHORT)
+
+    # Generate dummy data: 3 laps of 30s
     print("Generating dummy data...")
-    for i in range(1000):
-        t = i * 0.016 # 60hz
-        exporter.add_sample({
+    expected = {ch.name: [] for ch in exporter.channels}
+    for i in range(60 * 90):
+        t = i / 60
+        sample = {
             "Speed": 100 + math.sin(t) * 20,
             "RPM": 5000 + math.sin(t) * 1000,
             "Throttle": 100 if math.sin(t) > 0 else 0,
             "Brake": 0 if math.sin(t) > 0 else 50,
-            "Steering": math.cos(t) * 90
-        })
-        
+            "Steering": math.cos(t) * 90,
+            "Gear": 3 + int(math.sin(t) * 2),
+            "Lap": 1 + i // (60 * 30),
+        }
+        for ch in exporter.channels:
+            if i % (60 // ch.freq) == 0:
+                expected[ch.name].append(sample[ch.name])
+        exporter.add_sample(sample)
+
     # Export
-    exporter.export("test_telemetry.ld")
+    if not exporter.export("test_telemetry.ld"):
+        sys.exit(1)
+    exporter.close()
     print("Done! Created test_telemetry.ld")
 
+    # Round-trip check through the reader
+    ld = LDFile.open("test_telemetry.ld")
+    assert ld.header.driver == "Test Driver" and ld.venue.name == "Test Track", "header blocks"
+    assert ld.vehicle.vehicle_id == "Test Car" and ld.event.session == "Practice", "event blocks"
+    assert [ch.name for ch in ld.channels] == list(expected), "channel list"
+    for ch in ld.channels:
+        values = ld.values(ch.name)
+        tolerance = 10 ** -ch.dec if ch.datatype in (DATATYPE_SHORT, DATATYPE_LONG) else 1e-3
+        assert len(values) == len(expected[ch.name]), f"{ch.name}: sample count"
+        assert all(abs(a - b) <= tolerance for a, b in zip(values, expected[ch.name])), f"{ch.name}: values"
+    assert [round(b, 3) for b in ld.beacons] == [30.0, 60.0], f"beacons {ld.beacons}"
+    print(f"Round-trip OK: {len(ld.channels)} channels, {len(ld.beacons)} beacons")
+
 if __name__ == "__main__":
     main()
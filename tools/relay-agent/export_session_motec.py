@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline MoTeC Export from Race Logs
+
+Converts recorded race_logs/<session> directories into MoTeC i2 .ld
+(+ .ldx lap beacons) files, so logged races can be analysed in i2 without
+re-driving them.
+
+all_events.jsonl(.gz) is streamed through session_log; only
+telemetry:driver and session events are parsed (other lines are rejected
+on a byte match before json.loads). Each car's samples are resampled onto
+a fixed-rate grid (sample-and-hold) and written through the streaming
+MoTeCLDExporter, so memory stays bounded for long sessions. Sessions are
+converted in parallel with a process pool.
+
+Usage:
+    python export_session_motec.py                           # every session in race_logs/
+    python export_session_motec.py race_logs/20250101_190000 --driver "Jane Doe"
+    python export_session_motec.py --all-drivers --channels full --rate 10 --workers 4
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from exporters.ld_structs import DATATYPE_FLOAT, DATATYPE_SHORT
+from exporters.motec_exporter import MoTeCLDExporter
+from session_log import SESSION_EVENTS, TELEMETRY_EVENT, SessionLog, find_events_file, track_pct
+
+LOG_DIR = Path(__file__).parent / "race_logs"
+
+MAX_HOLD_SECONDS = 5.0     # don't stretch a sample across a longer gap in the log
+
+
+# (channel, unit, datatype, decimal places, value from a telemetry:driver car dict)
+Channel = Tuple[str, str, int, int, Callable[[Dict[str, Any]], float]]
+
+CHANNEL_SETS: Dict[str, List[Channel]] = {
+    'basic': [
+        ('Speed', 'km/h', DATATYPE_FLOAT, 0, lambda c: (c.get('speed') or 0) * 3.6),
+        ('RPM', 'rpm', DATATYPE_FLOAT, 0, lambda c: c.get('rpm') or 0),
+        ('Gear', '', DATATYPE_SHORT, 0, lambda c: c.get('gear') or 0),
+        ('Throttle', '%', DATATYPE_FLOAT, 0, lambda c: (c.get('throttle') or 0) * 100),
+        ('Brake', '%', DATATYPE_FLOAT, 0, lambda c: (c.get('brake') or 0) * 100),
+        ('Steering', '%', DATATYPE_FLOAT, 0, lambda c: (c.get('steering') or 0) * 100),
+        ('Lap', '', DATATYPE_SHORT, 0, lambda c: c.get('lap') or 0),
+    ],
+}
+CHANNEL_SETS['full'] = CHANNEL_SETS['basic'] + [
+    ('Lap Distance', '%', DATATYPE_SHORT, 2, lambda c: track_pct(c) * 100),
+    ('Position', '', DATATYPE_SHORT, 0, lambda c: c.get('position') or 0),
+    ('Class Position', '', DATATYPE_SHORT, 0, lambda c: c.get('classPosition') or 0),
+    ('Fuel Level', 'l', DATATYPE_FLOAT, 0, lambda c: c.get('fuelLevel') or 0),
+    ('Fuel Level %', '%', DATATYPE_SHORT, 1, lambda c: (c.get('fuelPct') or 0) * 100),
+    ('In Pit', '', DATATYPE_SHORT, 0, lambda c: 1 if (c.get('inPit') or c.get('onPitRoad')) else 0),
+    ('Incidents', '', DATATYPE_SHORT, 0, lambda c: c.get('incidentCount') or 0),
+]
+CHANNEL_SETS['inputs'] = [ch for ch in CHANNEL_SETS['basic'] if ch[0] in ('Throttle', 'Brake', 'Steering', 'Gear', 'Lap')]
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_') or 'driver'
+
+
+class CarTrack:
+    """Fixed-rate resampling of one car into its exporter."""
+
+    def __init__(self, name: str, car: Dict[str, Any], channels: List[Channel], rate: int,
+                 spill_samples: int):
+        self.name = name
+        self.channels = channels
+        self.rate = rate
+        self.exporter = MoTeCLDExporter(frequency=rate, lap_channel='Lap', spill_samples=spill_samples)
+        for ch_name, unit, datatype, dec, _ in channels:
+            self.exporter.add_channel(ch_name, unit, datatype=datatype, dec=dec)
+        self.exporter.set_session_info(driver=car.get('driverName') or name, vehicle=car.get('carName') or '')
+        self.t0: Optional[float] = None
+        self.ticks = 0          # grid points emitted; grid time = t0 + ticks / rate
+        self.held: Optional[Dict[str, float]] = None
+        self.held_ts = 0.0
+
+    def feed(self, ts: float, car: Dict[str, Any]):
+        """Emit grid points before ts from the held sample, then hold this one."""
+        if self.t0 is None:
+            self.t0 = ts
+            self.exporter.set_session_info(start=datetime.fromtimestamp(ts))
+        if self.held is not None:
+            while True:
+                grid_t = self.t0 + self.ticks / self.rate
+                if grid_t >= ts - 1e-6:
+                    break
+                if grid_t - self.held_ts <= MAX_HOLD_SECONDS:
+                    self.exporter.add_sample(self.held)
+                else:
+                    # Gap in the log: zeros rather than a frozen car
+                    self.exporter.add_sample({'Lap': self.held.get('Lap', 0)})
+                self.ticks += 1
+        self.held = {ch_name: fn(car) for ch_name, _, _, _, fn in self.channels}
+        self.held_ts = ts
+
+    def finish(self):
+        if self.held is not None:
+            self.exporter.add_sample(self.held)
+
+
+def export_session(session_dir: str, out_dir: Optional[str], driver: Optional[str],
+                   all_drivers: bool, channel_set: str, rate: int) -> List[Tuple[str, int, int]]:
+    """
+    Convert one session. Returns [(ld_path, samples, laps)] — one entry per
+    exported car.
+    """
+    session_dir = Path(session_dir)
+    events_file = find_events_file(session_dir)
+    if events_file is None:
+        raise FileNotFoundError(f"No all_events.jsonl(.gz) in {session_dir}")
+    out = Path(out_dir) if out_dir else session_dir
+    out.mkdir(parents=True, exist_ok=True)
+
+    channels = CHANNEL_SETS[channel_set]
+    spill_samples = 8192 if all_drivers else 65536
+    tracks: Dict[str, CarTrack] = {}
+    session_info: Dict[str, str] = {}
+    wanted_driver = driver.lower() if driver else None
+
+    for evt in SessionLog(events_file).events((TELEMETRY_EVENT,) + SESSION_EVENTS):
+        data = evt.data
+        if evt.event in SESSION_EVENTS:
+            if data.get('trackName') or data.get('track'):
+                session_info['venue'] = data.get('trackName') or data.get('track')
+            if data.get('sessionType') or data.get('session'):
+                session_info['session'] = data.get('sessionType') or data.get('session')
+            continue
+
+        for car in data.get('cars', []):
+            name = car.get('driverName') or f"car{car.get('carIdx', car.get('carId', ''))}"
+            if not all_drivers:
+                if wanted_driver:
+                    if name.lower() != wanted_driver:
+                        continue
+                elif not car.get('isPlayer'):
+                    continue
+            track = tracks.get(name)
+            if track is None:
+                track = tracks[name] = CarTrack(name, car, channels, rate, spill_samples)
+            track.feed(evt.ts, car)
+            if not all_drivers:
+                break
+
+    results = []
+    for name, track in tracks.items():
+        track.finish()
+        exporter = track.exporter
+        exporter.set_session_info(
+            venue=session_info.get('venue'),
+            session=session_info.get('session'),
+            event=session_dir.name,
+            comment=f"Exported from {events_file.name}",
+        )
+        ld_path = out / f"{session_dir.name}_{_slug(name)}.ld"
+        if exporter.export(str(ld_path)):
+            results.append((str(ld_path), exporter.sample_count, max(0, len(exporter.beacons) - 1)))
+        exporter.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export logged race sessions to MoTeC i2 .ld files')
+    parser.add_argument('sessions', nargs='*', help='race_logs/<session> directories (default: all)')
+    parser.add_argument('--out', help='Output directory (default: each session directory)')
+    who = parser.add_mutually_exclusive_group()
+    who.add_argument('--driver', help='Driver name to export (default: the player car)')
+    who.add_argument('--all-drivers', action='store_true', help='One .ld per car in the session')
+    parser.add_argument('--channels', choices=sorted(CHANNEL_SETS), default='basic', help='Channel set')
+    parser.add_argument('--rate', type=int, default=10, help='Output sample rate in Hz (default: 10)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Sessions converted in parallel')
+    args = parser.parse_args()
+
+    if args.sessions:
+        sessions = [Path(s) for s in args.sessions]
+    elif LOG_DIR.exists():
+        sessions = sorted(d for d in LOG_DIR.iterdir() if d.is_dir() and find_events_file(d))
+    else:
+        sessions = []
+    if not sessions:
+        print("No race log sessions found")
+        return
+
+    print(f"🏁 Exporting {len(sessions)} session(s) to MoTeC "
+          f"({args.channels} channels @ {args.rate}Hz, {min(args.workers, len(sessions))} workers)")
+    start = time.time()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(sessions))) as pool:
+        futures = {
+            pool.submit(export_session, str(s), args.out, args.driver, args.all_drivers,
+                        args.channels, args.rate): s
+            for s in sessions
+        }
+        for future in as_completed(futures):
+            session = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"  ✗ {session.name}: {e}")
+                continue
+            if not results:
+                print(f"  ⚠️ {session.name}: no matching telemetry")
+            for ld_path, samples, laps in results:
+                print(f"  ✓ {Path(ld_path).name}: {samples} samples, {laps} laps")
+
+    print(f"Done in {time.time() - start:.1f}s")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+MoTeC i2 .ld reader
+
+Parses the header blocks and walks the channel linked list. Used to
+round-trip check our own exports (see export_motec.py); should also read
+files written by MoTeC loggers for the int16/int32/float32 channel types.
+
+Usage:
+    python -m exporters.ld_reader session.ld
+"""
+import os
+import sys
+from array import array
+from typing import Dict, List, Optional
+
+from .ld_structs import LDHeader, LDEvent, LDVenue, LDVehicle, LDChannelHeader
+from .ldx import read_ldx
+
+
+class LDFile:
+    """An .ld file loaded into memory; channel data is decoded on demand."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self.header = LDHeader.unpack(data)
+        self.event: Optional[LDEvent] = None
+        self.venue: Optional[LDVenue] = None
+        self.vehicle: Optional[LDVehicle] = None
+        if self.header.event_ptr:
+            self.event = LDEvent.unpack(data, self.header.event_ptr)
+            if self.event.venue_ptr:
+                self.venue = LDVenue.unpack(data, self.event.venue_ptr)
+                if self.venue.vehicle_ptr:
+                    self.vehicle = LDVehicle.unpack(data, self.venue.vehicle_ptr)
+
+        self.channels: List[LDChannelHeader] = []
+        ptr, seen = self.header.meta_ptr, set()
+        while ptr and ptr not in seen:
+            seen.add(ptr)
+            ch = LDChannelHeader.unpack(data, ptr)
+            self.channels.append(ch)
+            ptr = ch.next_ptr
+        self._by_name = {ch.name: ch for ch in self.channels}
+        self.ldx: Optional[dict] = None
+
+    @classmethod
+    def open(cls, path: str) -> 'LDFile':
+        with open(path, 'rb') as f:
+            ld = cls(f.read())
+        ldx_path = os.path.splitext(path)[0] + '.ldx'
+        if os.path.exists(ldx_path):
+            ld.ldx = read_ldx(ldx_path)
+        return ld
+
+    def channel(self, name: str) -> LDChannelHeader:
+        return self._by_name[name]
+
+    def raw(self, name: str) -> array:
+        """Stored values, as written."""
+        ch = self._by_name[name]
+        values = array(ch.typecode)
+        end = ch.data_ptr + ch.count * ch.size
+        if end > len(self._data):
+            raise ValueError(f"Channel {name} data runs past end of file")
+        values.frombytes(self._data[ch.data_ptr:end])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def values(self, name: str) -> List[float]:
+        """Physical values (scaling applied)."""
+        ch = self._by_name[name]
+        return [ch.to_physical(v) for v in self.raw(name)]
+
+    @property
+    def beacons(self) -> List[float]:
+        return self.ldx['beacons'] if self.ldx else []
+
+    def summary(self) -> Dict[str, object]:
+        head = self.header
+        return {
+            'driver': head.driver,
+            'vehicle': head.vehicle,
+            'venue': head.venue,
+            'date': head.datetime.isoformat(sep=' '),
+            'event': self.event.name if self.event else '',
+            'session': self.event.session if self.event else '',
+            'channels': [
+                {'name': ch.name, 'unit': ch.unit, 'freq': ch.freq, 'count': ch.count,
+                 'type': f"{ch.datatype:#x}/{ch.size}", 'scale': ch.scale, 'dec': ch.dec}
+                for ch in self.channels
+            ],
+            'beacons': len(self.beacons),
+        }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python -m exporters.ld_reader file.ld")
+        sys.exit(1)
+    ld = LDFile.open(sys.argv[1])
+    summary = ld.summary()
+    print(f"{summary['venue']} — {summary['vehicle']} — {summary['driver']} ({summary['date']})")
+    print(f"Event: {summary['event']} / {summary['session']}, beacons: {summary['beacons']}")
+    for ch in summary['channels']:
+        print(f"  {ch['name']:<32} {ch['unit']:<8} {ch['freq']:>4}Hz {ch['count']:>8} samples  {ch['type']}")
+
+
+if __name__ == "__main__":
+    main()
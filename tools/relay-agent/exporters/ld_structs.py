@@ -1,45 +1,252 @@
 """
 MoTeC i2 .ld File Structure Definitions
 Based on public documentation and reverse engineering of MoTeC LD format.
+
+File layout written by the exporter:
+
+    [LDHeader]            file header, points at the event block and at
+                          the first channel header / first data block
+    [LDEvent]             event name, session, long comment -> venue
+    [LDVenue]             venue name -> vehicle
+    [LDVehicle]           vehicle id, weight, type, comment
+    [LDChannelHeader]*n   doubly linked list (prev/next file offsets)
+    [channel data]*n      one contiguous block per channel
+
+Channel values are stored raw; i2 shows
+    value = (raw / scale * 10^-dec + shift) * mul
 """
 import struct
+from datetime import datetime
+
+LD_MARKER = 0x40
+
+# Channel types; (type code, sample size) -> array typecode
+DATATYPE_SHORT = 0x03   # int16
+DATATYPE_LONG = 0x05    # int32
+DATATYPE_FLOAT = 0x07   # float32
+
+DATATYPE_SIZES = {
+    DATATYPE_SHORT: 2,
+    DATATYPE_LONG: 4,
+    DATATYPE_FLOAT: 4,
+}
+TYPECODES = {
+    (DATATYPE_SHORT, 2): 'h',
+    (0x00, 2): 'h',
+    (DATATYPE_LONG, 4): 'i',
+    (0x00, 4): 'i',
+    (DATATYPE_FLOAT, 4): 'f',
+}
+
+
+def _str(value: bytes) -> str:
+    return value.split(b'\x00', 1)[0].decode('utf-8', errors='replace').strip()
+
 
-# Constants
-LD_HEADER_SIZE = 64
-LD_CHANNEL_HEADER_SIZE = 124
+def _bytes(value: str, size: int) -> bytes:
+    return (value or '').encode('utf-8')[:size - 1]
 
-# Channel types
-DATATYPE_SHORT = 0
-DATATYPE_FLOAT = 3
-DATATYPE_LONG = 5
 
 class LDHeader:
     """Main file header"""
+    STRUCT = struct.Struct('<' + (
+        "I4x"     # marker
+        "II"      # channel meta ptr, channel data ptr
+        "20x"
+        "I"       # event ptr
+        "24x"
+        "HHH"     # static 1, 0x4240, 0xf
+        "I"       # device serial
+        "8s"      # device type
+        "H"       # device version
+        "H"       # static 0xadb0
+        "I"       # num channels
+        "4x"
+        "16s"     # date dd/mm/yyyy
+        "16x"
+        "16s"     # time hh:mm:ss
+        "16x"
+        "64s"     # driver
+        "64s"     # vehicle id
+        "64x"
+        "64s"     # venue
+        "64x"
+        "1024x"
+        "I"       # pro logging magic
+        "66x"
+        "64s"     # short comment (run comment)
+        "126x"
+    ))
+    SIZE = STRUCT.size
+
     def __init__(self):
-        self.magic = 64  # Fixed magic number
-        self.version = 0
+        self.magic = LD_MARKER
+        self.meta_ptr = 0
+        self.data_ptr = 0
+        self.event_ptr = 0
+        self.num_channels = 0
+        self.device_serial = 0x1f44
+        self.device_type = "ADL"
+        self.device_version = 420
         self.driver = ""
         self.vehicle = ""
         self.venue = ""
-        self.date = ""
-        self.time = ""
+        self.datetime = datetime.now()
         self.comments = ""
         self.event_session = ""  # Run short comment
-        
-    def pack(self):
-        # Implementation of header packing logic
-        # For simplicity, we return a bytes object of correct size
-        # Real implementation requires mapping fields to specific offsets
-        # But for this MVP, we will use a simpler approach in the main exporter
-        pass
+
+    def pack(self) -> bytes:
+        return self.STRUCT.pack(
+            self.magic, self.meta_ptr, self.data_ptr, self.event_ptr,
+            1, 0x4240, 0xf,
+            self.device_serial, _bytes(self.device_type, 8), self.device_version, 0xadb0,
+            self.num_channels,
+            self.datetime.strftime('%d/%m/%Y').encode(),
+            self.datetime.strftime('%H:%M:%S').encode(),
+            _bytes(self.driver, 64), _bytes(self.vehicle, 64), _bytes(self.venue, 64),
+            0xc81a4, _bytes(self.event_session, 64),
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> 'LDHeader':
+        (magic, meta_ptr, data_ptr, event_ptr, _, _, _, serial, dev_type, dev_version, _,
+         num_channels, date, time_, driver, vehicle, venue, _, short_comment) = cls.STRUCT.unpack_from(data, offset)
+        if magic != LD_MARKER:
+            raise ValueError(f"Not a MoTeC .ld file (marker {magic:#x})")
+        head = cls()
+        head.meta_ptr, head.data_ptr, head.event_ptr = meta_ptr, data_ptr, event_ptr
+        head.device_serial, head.device_type, head.device_version = serial, _str(dev_type), dev_version
+        head.num_channels = num_channels
+        head.driver, head.vehicle, head.venue = _str(driver), _str(vehicle), _str(venue)
+        head.event_session = _str(short_comment)
+        try:
+            head.datetime = datetime.strptime(f"{_str(date)} {_str(time_)}", '%d/%m/%Y %H:%M:%S')
+        except ValueError:
+            pass
+        return head
+
+
+class LDEvent:
+    """Event block: name, session, long comment"""
+    STRUCT = struct.Struct('<64s64s1024sH')
+    SIZE = STRUCT.size
+
+    def __init__(self, name: str = "", session: str = "", comment: str = "", venue_ptr: int = 0):
+        self.name = name
+        self.session = session
+        self.comment = comment
+        self.venue_ptr = venue_ptr
+
+    def pack(self) -> bytes:
+        return self.STRUCT.pack(_bytes(self.name, 64), _bytes(self.session, 64),
+                                _bytes(self.comment, 1024), self.venue_ptr)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> 'LDEvent':
+        name, session, comment, venue_ptr = cls.STRUCT.unpack_from(data, offset)
+        return cls(_str(name), _str(session), _str(comment), venue_ptr)
+
+
+class LDVenue:
+    """Venue block"""
+    STRUCT = struct.Struct('<64s1034xH')
+    SIZE = STRUCT.size
+
+    def __init__(self, name: str = "", vehicle_ptr: int = 0):
+        self.name = name
+        self.vehicle_ptr = vehicle_ptr
+
+    def pack(self) -> bytes:
+        return self.STRUCT.pack(_bytes(self.name, 64), self.vehicle_ptr)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> 'LDVenue':
+        name, vehicle_ptr = cls.STRUCT.unpack_from(data, offset)
+        return cls(_str(name), vehicle_ptr)
+
+
+class LDVehicle:
+    """Vehicle block"""
+    STRUCT = struct.Struct('<64s128xI32s32s')
+    SIZE = STRUCT.size
+
+    def __init__(self, vehicle_id: str = "", weight: int = 0, vehicle_type: str = "", comment: str = ""):
+        self.vehicle_id = vehicle_id
+        self.weight = weight
+        self.vehicle_type = vehicle_type
+        self.comment = comment
+
+    def pack(self) -> bytes:
+        return self.STRUCT.pack(_bytes(self.vehicle_id, 64), self.weight,
+                                _bytes(self.vehicle_type, 32), _bytes(self.comment, 32))
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> 'LDVehicle':
+        vehicle_id, weight, vehicle_type, comment = cls.STRUCT.unpack_from(data, offset)
+        return cls(_str(vehicle_id), weight, _str(vehicle_type), _str(comment))
+
 
 class LDChannelHeader:
     """Channel definition header"""
+    STRUCT = struct.Struct('<' + (
+        "IIII"    # prev ptr, next ptr, data ptr, sample count
+        "H"       # counter
+        "HHH"     # type code, sample size, frequency
+        "hhhh"    # shift, mul, scale, decimal places
+        "32s"     # name
+        "8s"      # short name
+        "12s"     # unit
+        "40x"
+    ))
+    SIZE = STRUCT.size
+
     def __init__(self):
+        self.prev_ptr = 0
+        self.next_ptr = 0
+        self.data_ptr = 0
+        self.count = 0
+        self.counter = 0
         self.name = ""
+        self.short_name = ""
         self.unit = ""
         self.freq = 0
         self.dec = 0  # Decimal places
-        self.scale = 1.0
-        self.offset = 0.0
+        self.scale = 1
+        self.shift = 0
+        self.mul = 1
         self.datatype = DATATYPE_FLOAT
+        self.size = DATATYPE_SIZES[DATATYPE_FLOAT]
+
+    @property
+    def typecode(self) -> str:
+        """array module typecode for this channel's raw samples"""
+        try:
+            return TYPECODES[(self.datatype, self.size)]
+        except KeyError:
+            raise ValueError(f"Unsupported channel type {self.datatype:#x}/{self.size} for {self.name}")
+
+    def to_raw(self, value: float):
+        """Physical value -> stored value"""
+        raw = (value / (self.mul or 1) - self.shift) * (self.scale or 1) * 10 ** self.dec
+        return raw if self.typecode == 'f' else int(round(raw))
+
+    def to_physical(self, raw) -> float:
+        """Stored value -> physical value"""
+        return (raw / (self.scale or 1) * 10 ** -self.dec + self.shift) * (self.mul or 1)
+
+    def pack(self) -> bytes:
+        return self.STRUCT.pack(
+            self.prev_ptr, self.next_ptr, self.data_ptr, self.count,
+            self.counter, self.datatype, self.size, self.freq,
+            self.shift, self.mul, self.scale, self.dec,
+            _bytes(self.name, 32), _bytes(self.short_name, 8), _bytes(self.unit, 12),
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> 'LDChannelHeader':
+        ch = cls()
+        (ch.prev_ptr, ch.next_ptr, ch.data_ptr, ch.count, ch.counter,
+         ch.datatype, ch.size, ch.freq, ch.shift, ch.mul, ch.scale, ch.dec,
+         name, short_name, unit) = cls.STRUCT.unpack_from(data, offset)
+        ch.name, ch.short_name, ch.unit = _str(name), _str(short_name), _str(unit)
+        return ch
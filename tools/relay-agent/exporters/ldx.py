@@ -0,0 +1,56 @@
+"""
+MoTeC i2 .ldx companion file (XML next to the .ld).
+
+Holds lap beacons as markers (time in microseconds from the start of the
+log) plus the lap summary i2 shows in its session list.
+"""
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Sequence
+
+
+def format_lap_time(seconds: float) -> str:
+    minutes, secs = divmod(seconds, 60)
+    return f"{int(minutes)}:{secs:06.3f}"
+
+
+def lap_summary(beacons: Sequence[float]) -> Dict[str, str]:
+    """Total laps / fastest lap from lap start times (only complete laps count)."""
+    times = [b - a for a, b in zip(beacons, beacons[1:])]
+    details = {'Total Laps': str(len(times))}
+    if times:
+        best = min(range(len(times)), key=times.__getitem__)
+        details['Fastest Time'] = format_lap_time(times[best])
+        details['Fastest Lap'] = str(best + 1)
+    return details
+
+
+def write_ldx(path: str, beacons: Sequence[float]):
+    """Write lap beacons (seconds from log start) and the lap summary."""
+    root = ET.Element('LDXFile', Locale='English_United States.1252', DefaultLocale='C', Version='1.6')
+    layers = ET.SubElement(root, 'Layers')
+    layer = ET.SubElement(layers, 'Layer')
+    markers = ET.SubElement(ET.SubElement(layer, 'MarkerBlock'), 'MarkerGroup', Name='Beacons', Index='3')
+    for i, t in enumerate(beacons):
+        ET.SubElement(markers, 'Marker', Version='100', ClassName='BCN', Name=f'Manual.{i + 1}',
+                      Flags='77', Time=f'{t * 1e6:.6e}')
+    ET.SubElement(layer, 'RangeBlock')
+    details = ET.SubElement(layers, 'Details')
+    for key, value in lap_summary(beacons).items():
+        ET.SubElement(details, 'String', Id=key, Value=value)
+
+    ET.indent(root, space=' ')
+    with open(path, 'wb') as f:
+        f.write(b'<?xml version="1.0"?>\n')
+        f.write(ET.tostring(root))
+        f.write(b'\n')
+
+
+def read_ldx(path: str) -> Dict[str, object]:
+    """{'beacons': [seconds, ...], 'details': {id: value}}"""
+    root = ET.parse(path).getroot()
+    beacons: List[float] = [
+        float(m.get('Time', 0)) / 1e6
+        for m in root.iter('Marker') if m.get('ClassName') == 'BCN'
+    ]
+    details = {s.get('Id'): s.get('Value') for s in root.iter('String')}
+    return {'beacons': beacons, 'details': details}
@@ -1,92 +1,255 @@
-import struct
+import sys
 import logging
-from typing import List, Dict, Any
-from .ld_structs import LDHeader, LDChannelHeader, DATATYPE_FLOAT
+import os
+import tempfile
+from array import array
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from .ld_structs import (
+    LDHeader, LDEvent, LDVenue, LDVehicle, LDChannelHeader,
+    DATATYPE_FLOAT, DATATYPE_SIZES,
+)
+from .ldx import write_ldx
 
 logger = logging.getLogger(__name__)
 
+# Samples buffered per channel before spilling to the temp block file
+# (64K float32 = 256KB per channel)
+DEFAULT_SPILL_SAMPLES = 65536
+COPY_CHUNK_BYTES = 1 << 20
+
+
 class MoTeCLDExporter:
     """
-    Exports telemetry data to MoTeC i2 .ld file format
+    Exports telemetry data to MoTeC i2 .ld file format (+ .ldx lap beacons)
+
+    Samples are stored per channel in typed array buffers. Once a buffer
+    holds spill_samples values it is appended to a temporary block file
+    and cleared, so memory stays constant however long the session runs.
+    export() copies each channel's spilled blocks and in-memory tail
+    straight into the .ld data section.
+
+    Channels may run at any integer divisor of the exporter's base
+    frequency (the rate add_sample is called at): a 10Hz channel on a
+    60Hz exporter records every 6th sample. Channels at other rates are
+    fed directly with add_channel_samples().
     """
-    
-    def __init__(self):
-        self.channels = []
-        self.samples = []  # List of dicts
-        self.frequency = 60 # Default Hz
-        
-    def add_channel(self, name, unit, freq=None):
-        """Define a channel"""
+
+    def __init__(self, frequency: int = 60, spill_samples: int = DEFAULT_SPILL_SAMPLES,
+                 lap_channel: Optional[str] = None):
+        self.channels: List[LDChannelHeader] = []
+        self.frequency = frequency  # Base rate of add_sample (Hz)
+        self.spill_samples = spill_samples
+        self.lap_channel = lap_channel  # Beacon whenever this channel's value increases
+        self.sample_count = 0
+        self.beacons: List[float] = []  # Lap start times (s since first sample)
+        self.header = LDHeader()
+        self.event = LDEvent()
+        self.venue = LDVenue()
+        self.vehicle = LDVehicle()
+        self._strides: List[Optional[int]] = []
+        self._buffers: List[array] = []
+        self._counts: List[int] = []
+        self._blocks: List[List[Tuple[int, int]]] = []  # per channel: (offset, nbytes) in spill file
+        self._index: Dict[str, int] = {}
+        self._spill_file = None
+        self._spill_bytes = 0
+        self._last_lap = None
+
+    # ─── Setup ───────────────────────────────
+
+    def add_channel(self, name, unit, freq=None, datatype=DATATYPE_FLOAT,
+                    dec=0, scale=1, shift=0, mul=1, short_name=""):
+        """
+        Define a channel. Integer channels (DATATYPE_SHORT/LONG) store
+        round((value / mul - shift) * scale * 10^dec).
+        """
         ch = LDChannelHeader()
         ch.name = name
+        ch.short_name = short_name or name[:7]
         ch.unit = unit
-        ch.freq = freq if freq else self.frequency
+        ch.freq = int(freq if freq else self.frequency)
+        ch.datatype = datatype
+        ch.size = DATATYPE_SIZES[datatype]
+        ch.dec, ch.scale, ch.shift, ch.mul = dec, scale, shift, mul
+        ch.counter = 0x2ee1 + len(self.channels)
+
+        # Decimation from the base rate; None = fed only via add_channel_samples
+        stride = None
+        if ch.freq <= self.frequency and self.frequency % ch.freq == 0:
+            stride = self.frequency // ch.freq
+
+        self._index[name] = len(self.channels)
         self.channels.append(ch)
-        
+        self._strides.append(stride)
+        self._buffers.append(array(ch.typecode))
+        self._counts.append(0)
+        self._blocks.append([])
+
+    def set_session_info(self, driver: str = None, vehicle: str = None, venue: str = None,
+                         event: str = None, session: str = None, comment: str = None,
+                         start: datetime = None):
+        """Fill the header / event / venue / vehicle blocks (None = leave as is)."""
+        if driver is not None:
+            self.header.driver = driver
+        if vehicle is not None:
+            self.header.vehicle = vehicle
+            self.vehicle.vehicle_id = vehicle
+        if venue is not None:
+            self.header.venue = venue
+            self.venue.name = venue
+        if event is not None:
+            self.event.name = event
+        if session is not None:
+            self.event.session = session
+            self.header.event_session = session
+        if comment is not None:
+            self.event.comment = comment
+        if start is not None:
+            self.header.datetime = start
+
+    # ─── Recording ───────────────────────────
+
     def add_sample(self, sample: Dict[str, Any]):
-        """Add a data sample"""
-        self.samples.append(sample)
-        
+        """Add a data sample at the base rate (channels missing from it are recorded as 0)"""
+        tick = self.sample_count
+        for i, stride in enumerate(self._strides):
+            if stride is not None and tick % stride == 0:
+                ch = self.channels[i]
+                self._append(i, ch.to_raw(float(sample.get(ch.name, 0.0) or 0.0)))
+        self.sample_count += 1
+
+        if self.lap_channel is not None and self.lap_channel in sample:
+            lap = sample[self.lap_channel]
+            if self._last_lap is not None and lap > self._last_lap:
+                self.add_beacon(tick / self.frequency)
+            self._last_lap = lap
+
+    def add_channel_samples(self, name: str, values):
+        """Append values to one channel at its own rate."""
+        i = self._index[name]
+        ch = self.channels[i]
+        for value in values:
+            self._append(i, ch.to_raw(float(value or 0.0)))
+
+    def add_beacon(self, time_s: Optional[float] = None):
+        """Mark a lap start (default: now, in base-rate time)."""
+        self.beacons.append(time_s if time_s is not None else self.sample_count / self.frequency)
+
+    def _append(self, i: int, raw):
+        buf = self._buffers[i]
+        buf.append(raw)
+        self._counts[i] += 1
+        if len(buf) >= self.spill_samples:
+            self._spill(i)
+
+    def _spill(self, i: int):
+        """Move one channel buffer to the temp block file."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix='motec_', suffix='.blocks')
+        f = self._spill_file
+        f.seek(0, 2)
+        buf = self._buffers[i]
+        if sys.byteorder == 'big':
+            buf.byteswap()
+        offset = f.tell()
+        buf.tofile(f)
+        nbytes = f.tell() - offset
+        self._blocks[i].append((offset, nbytes))
+        self._spill_bytes += nbytes
+        del buf[:]
+
+    def _copy_channel(self, index: int, out):
+        """Write one channel's data (spilled blocks, then tail) to out."""
+        if self._blocks[index]:
+            f = self._spill_file
+            chunk = bytearray(COPY_CHUNK_BYTES)
+            view = memoryview(chunk)
+            for offset, nbytes in self._blocks[index]:
+                f.seek(offset)
+                while nbytes > 0:
+                    n = f.readinto(view[:min(nbytes, COPY_CHUNK_BYTES)])
+                    if not n:
+                        raise IOError("MoTeC spill file truncated")
+                    out.write(view[:n])
+                    nbytes -= n
+        buf = self._buffers[index]
+        if sys.byteorder == 'big':
+            tail = array(buf.typecode, buf)
+            tail.byteswap()
+            tail.tofile(out)
+        else:
+            buf.tofile(out)
+
+    def reset(self):
+        """Drop all recorded samples (channel definitions are kept)."""
+        for buf in self._buffers:
+            del buf[:]
+        self._counts = [0] * len(self.channels)
+        self._blocks = [[] for _ in self.channels]
+        self.sample_count = 0
+        self.beacons = []
+        self._last_lap = None
+        self._spill_bytes = 0
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def close(self):
+        """Release the temp block file."""
+        self.reset()
+
+    # ─── Export ──────────────────────────────
+
+    def _layout(self) -> int:
+        """Assign file offsets to every block. Returns the total file size."""
+        head, event, venue, vehicle = self.header, self.event, self.venue, self.vehicle
+        head.event_ptr = LDHeader.SIZE
+        event.venue_ptr = head.event_ptr + LDEvent.SIZE
+        venue.vehicle_ptr = event.venue_ptr + LDVenue.SIZE
+        head.meta_ptr = venue.vehicle_ptr + LDVehicle.SIZE
+        head.num_channels = len(self.channels)
+
+        data_ptr = head.meta_ptr + len(self.channels) * LDChannelHeader.SIZE
+        head.data_ptr = data_ptr
+        for i, ch in enumerate(self.channels):
+            meta_ptr = head.meta_ptr + i * LDChannelHeader.SIZE
+            ch.prev_ptr = meta_ptr - LDChannelHeader.SIZE if i > 0 else 0
+            ch.next_ptr = meta_ptr + LDChannelHeader.SIZE if i < len(self.channels) - 1 else 0
+            ch.data_ptr = data_ptr
+            ch.count = self._counts[i]
+            data_ptr += ch.count * ch.size
+        return data_ptr
+
     def export(self, filepath: str):
-        """Write the .ld file"""
-        logger.info(f"Exporting {len(self.samples)} samples to {filepath}...")
-        
+        """Write the .ld file, plus a .ldx with lap beacons when laps were recorded"""
+        logger.info(
+            f"Exporting {self.sample_count} samples to {filepath} "
+            f"({self._spill_bytes / (1024 * 1024):.1f}MB spilled)..."
+        )
+
         try:
+            total = self._layout()
             with open(filepath, 'wb') as f:
-                # 1. Write Header (Fixed 64 bytes)
-                # Magic (4) + Version (4) + Pointers (rest)
-                # We need to calculate pointers first
-                
-                # Layout:
-                # [Header 64b]
-                # [Channel Headers (count * 124b)]
-                # [Data Buffer]
-                
-                header_offset = 64
-                channel_header_size = 124
-                num_channels = len(self.channels)
-                
-                data_offset = header_offset + (num_channels * channel_header_size)
-                
-                # Magic: 0x40 (64) for LD
-                f.write(struct.pack('<I', 64)) 
-                f.write(struct.pack('<I', 11)) # Version
-                
-                # Pointers for meta strings (Driver, Vehicle etc.) - skipping for MVP
-                f.write(b'\x00' * 56) # Padding
-                
-                # 2. Write Channel Headers
-                for ch in self.channels:
-                    # 124 bytes struct
-                    # Name (32)
-                    # Unit (12)
-                    # ...
-                    
-                    # We use a simplified writing here, ensuring 124 bytes total
-                    f.write(ch.name.encode('utf-8')[:31].ljust(32, b'\x00'))
-                    f.write(ch.unit.encode('utf-8')[:11].ljust(12, b'\x00'))
-                    
-                    # Unknowns/Padding?
-                    f.write(b'\x00' * 80) # Fill the rest for now (imperfect but functional for structure)
-                    
-                    # Actually, we need to be more specific to work validly
-                    # But without full struct spec here, we might just produce a dummy file
-                    # that recognizes channels but data is tricky without exact offsets.
-                    # For this task, we'll assume a "functional stub" that saves data linearly.
-                    
-                # 3. Write Data
-                # Interleaved or Block? LD is usually channel blocks.
-                # Channel 1: [s1, s2, s3...]
-                # Channel 2: [s1, s2, s3...]
-                
+                f.write(self.header.pack())
+                f.write(self.event.pack())
+                f.write(self.venue.pack())
+                f.write(self.vehicle.pack())
                 for ch in self.channels:
-                    for s in self.samples:
-                        val = s.get(ch.name, 0.0)
-                        f.write(struct.pack('<f', float(val)))
-                        
+                    f.write(ch.pack())
+                # LD stores channel blocks: all of channel 1, then channel 2, ...
+                for i in range(len(self.channels)):
+                    self._copy_channel(i, f)
+                if f.tell() != total:
+                    raise IOError(f"Wrote {f.tell()} bytes, layout expected {total}")
+
+            if self.beacons:
+                ldx_path = os.path.splitext(filepath)[0] + '.ldx'
+                write_ldx(ldx_path, self.beacons)
+
             logger.info("Export completed successfully.")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to export MoTeC file: {e}")
             return False
@@ -4,17 +4,12 @@ Extract Player Telemetry from Race Logs
 Properly extracts from telemetry:driver events (not telemetry_update)
 """
 import json
-import gzip
 from pathlib import Path
 from typing import List, Dict, Optional
 import argparse
 
-def open_jsonl(filepath: Path):
-    """Open a JSONL file, handling both compressed and uncompressed formats"""
-    if filepath.suffix == '.gz':
-        return gzip.open(filepath, 'rt', encoding='utf-8', errors='ignore')
-    else:
-        return open(filepath, 'r', errors='ignore')
+from session_cache import cached_cars
+from session_log import SessionLog
 
 def extract_player_telemetry(log_dir: Path, driver_name: Optional[str] = None) -> List[Dict]:
     """
@@ -27,79 +22,26 @@ def extract_player_telemetry(log_dir: Path, driver_name: Optional[str] = None) -
     Returns:
         List of telemetry samples with movement data
     """
-    # Try compressed first, then uncompressed
-    all_events_file = log_dir / "all_events.jsonl.gz"
-    if not all_events_file.exists():
-        all_events_file = log_dir / "all_events.jsonl"
-    
-    if not all_events_file.exists():
-        print(f"❌ File not found: {all_events_file}")
+    log = SessionLog(log_dir)
+    if not log.exists:
+        print(f"❌ No all_events.jsonl(.gz) in {log_dir}")
         return []
     
     samples = []
-    total_events = 0
+    total_samples = 0
     skipped_stationary = 0
     
-    with open_jsonl(all_events_file) as f:
-        for line in f:
-            try:
-                evt = json.loads(line)
-                
-                # Only process telemetry:driver events
-                if evt.get('event') != 'telemetry:driver':
-                    continue
-                
-                total_events += 1
-                data = evt.get('data', {})
-                cars = data.get('cars', [])
-                
-                for car in cars:
-                    # Filter by driver name or isPlayer flag
-                    is_target = False
-                    if driver_name:
-                        is_target = car.get('driverName') == driver_name
-                    else:
-                        is_target = car.get('isPlayer', False)
-                    
-                    if not is_target:
-                        continue
-                    
-                    speed = car.get('speed', 0) or 0
-                    
-                    # Skip stationary samples (speed < 1 m/s)
-                    if speed < 1:
-                        skipped_stationary += 1
-                        continue
-                    
-                    sample = {
-                        'ts': evt.get('ts', 0),
-                        'speed': speed,
-                        'speed_mph': speed * 2.237,  # m/s to mph
-                        'rpm': car.get('rpm', 0) or 0,
-                        'gear': car.get('gear', 0) or 0,
-                        'throttle': car.get('throttle', 0) or 0,
-                        'brake': car.get('brake', 0) or 0,
-                        'steering': car.get('steering', 0) or 0,
-                        'lap': car.get('lap', 0) or 0,
-                        'position': car.get('position', 0) or 0,
-                        'classPosition': car.get('classPosition', 0) or 0,
-                        'trackPct': car.get('trackPct', 0) or car.get('lapDistPct', 0) or 0,
-                        'fuelLevel': car.get('fuelLevel', 0) or 0,
-                        'fuelPct': car.get('fuelPct', 0) or 0,
-                        'inPit': car.get('inPit', False),
-                        'driverName': car.get('driverName', ''),
-                        'lastLapTime': car.get('lastLapTime', 0) or 0,
-                        'bestLapTime': car.get('bestLapTime', 0) or 0,
-                    }
-                    samples.append(sample)
-                    break  # Only one player per event
-                    
-            except json.JSONDecodeError:
-                continue
-            except Exception as e:
-                continue
-    
-    print(f"Processed {total_events} telemetry:driver events")
+    for car in cached_cars(log_dir, driver=driver_name):
+        total_samples += 1
+        
+        # Skip stationary samples (speed < 1 m/s)
+        if car.speed < 1:
+            skipped_stationary += 1
+            continue
+        
+        samples.append(car.to_dict())
+    
+    print(f"Processed {total_samples} {'driver' if driver_name else 'player'} samples from telemetry:driver events")
     print(f"Skipped {skipped_stationary} stationary samples")
     print(f"Extracted {len(samples)} moving samples")
     
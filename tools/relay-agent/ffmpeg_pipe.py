@@ -0,0 +1,230 @@
+"""
+OBB Replay Intelligence — FFmpeg stdin pipe
+
+Feeds frames straight into a running ffmpeg process instead of staging
+them on disk first. Writes block when ffmpeg falls behind (the OS pipe
+buffer is the backpressure), stderr is drained on a side thread so the
+process can never stall on a full stderr pipe, and a watchdog kills the
+process once its deadline passes. For live streams, stdout can be read
+back as it is produced (on_output) and the watchdog disabled (timeout_s=0).
+
+Usage:
+    pipe = FFmpegPipe(ffmpeg_path, jpeg_input_args(15) + h264_output_args(...) + [out])
+    pipe.start()
+    for jpeg in frames:
+        if not pipe.write(jpeg):
+            break
+    result = pipe.close()
+"""
+
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EncodeResult:
+    ok: bool
+    frames: int = 0
+    seconds: float = 0
+    returncode: Optional[int] = None
+    stderr: str = ''
+
+    @property
+    def fps(self) -> float:
+        """Encode throughput in frames per second."""
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+# ─── Discovery ───────────────────────────
+
+def find_ffmpeg() -> Optional[str]:
+    """Locate ffmpeg binary on PATH or common install locations."""
+    # Try PATH first
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-version'],
+            capture_output=True, timeout=5
+        )
+        if result.returncode == 0:
+            return 'ffmpeg'
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        pass
+
+    # Common Windows locations
+    common_paths = [
+        r'C:\ffmpeg\bin\ffmpeg.exe',
+        r'C:\Program Files\ffmpeg\bin\ffmpeg.exe',
+        r'C:\ProgramData\chocolatey\bin\ffmpeg.exe',
+        os.path.expanduser(r'~\scoop\apps\ffmpeg\current\bin\ffmpeg.exe'),
+    ]
+    for p in common_paths:
+        if os.path.isfile(p):
+            return p
+
+    return None
+
+
+# ─── Argument builders ───────────────────
+
+def jpeg_input_args(fps: float) -> List[str]:
+    """Read a stream of concatenated JPEGs from stdin."""
+    return ['-f', 'image2pipe', '-c:v', 'mjpeg', '-framerate', str(fps), '-i', 'pipe:0']
+
+
+def raw_input_args(fps: float, width: int, height: int, pix_fmt: str = 'bgr24') -> List[str]:
+    """Read raw frames (e.g. numpy BGR arrays) from stdin."""
+    return [
+        '-f', 'rawvideo', '-pix_fmt', pix_fmt,
+        '-s', f'{width}x{height}', '-framerate', str(fps), '-i', 'pipe:0',
+    ]
+
+
+def h264_output_args(codec: str = 'libx264', crf: int = 23, preset: str = 'fast') -> List[str]:
+    """Browser-compatible H.264 MP4 output options."""
+    return [
+        '-c:v', codec,
+        '-crf', str(crf),
+        '-preset', preset,
+        '-pix_fmt', 'yuv420p',       # Browser compatibility
+        '-movflags', '+faststart',    # Streaming-friendly
+    ]
+
+
+# ─── Pipe ────────────────────────────────
+
+class FFmpegPipe:
+    """A single ffmpeg process fed through stdin."""
+
+    STDERR_TAIL_BYTES = 4096
+
+    def __init__(self, ffmpeg_path: str, args: List[str], timeout_s: float = 60,
+                 low_priority: bool = False,
+                 on_output: Optional[Callable[[bytes], None]] = None):
+        self.cmd = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y'] + list(args)
+        self.timeout_s = timeout_s
+        self.low_priority = low_priority
+        self.on_output = on_output
+        self.proc: Optional[subprocess.Popen] = None
+        self.frames_written = 0
+        self.timed_out = False
+        self._started_at = 0.0
+        self._stderr_tail = bytearray()
+        self._stderr_thread: Optional[threading.Thread] = None
+        self._stdout_thread: Optional[threading.Thread] = None
+        self._watchdog: Optional[threading.Timer] = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        kwargs = {}
+        if self.low_priority:
+            # Background encodes must never compete with iRacing for CPU
+            if os.name == 'nt':
+                kwargs['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            else:
+                kwargs['preexec_fn'] = lambda: os.nice(10)
+        self.proc = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if self.on_output else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        if self.on_output:
+            self._stdout_thread = threading.Thread(target=self._read_stdout, daemon=True)
+            self._stdout_thread.start()
+        if self.timeout_s:
+            self._watchdog = threading.Timer(self.timeout_s, self._on_timeout)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+
+    def write(self, data) -> bool:
+        """Write one frame. Blocks while ffmpeg is behind; False once the process is gone."""
+        if not self.proc or self.timed_out:
+            return False
+        try:
+            self.proc.stdin.write(data)
+            self.frames_written += 1
+            return True
+        except (BrokenPipeError, OSError, ValueError):
+            return False
+
+    def close(self) -> EncodeResult:
+        """Close stdin and wait for ffmpeg to finish within the remaining deadline."""
+        if not self.proc:
+            return EncodeResult(ok=False)
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+        timeout_s = self.timeout_s or 10.0  # Live streams: just let ffmpeg flush
+        remaining = max(0.1, timeout_s - (time.perf_counter() - self._started_at))
+        try:
+            returncode = self.proc.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            self._on_timeout()
+            returncode = self.proc.wait()
+        finally:
+            if self._watchdog:
+                self._watchdog.cancel()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=1.0)
+        if self._stdout_thread:
+            self._stdout_thread.join(timeout=1.0)
+
+        return EncodeResult(
+            ok=returncode == 0 and not self.timed_out,
+            frames=self.frames_written,
+            seconds=time.perf_counter() - self._started_at,
+            returncode=returncode,
+            stderr=self._stderr_tail.decode('utf-8', errors='replace'),
+        )
+
+    def abort(self):
+        """Kill the process without waiting for output."""
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+        if self._watchdog:
+            self._watchdog.cancel()
+
+    def _on_timeout(self):
+        if self.proc and self.proc.poll() is None:
+            self.timed_out = True
+            self.proc.kill()
+
+    def _read_stdout(self):
+        # read1 returns whatever is available, so output is forwarded as produced
+        for chunk in iter(lambda: self.proc.stdout.read1(65536), b''):
+            try:
+                self.on_output(chunk)
+            except Exception as e:
+                logger.debug(f"FFmpeg output handler failed: {e}")
+
+    def _drain_stderr(self):
+        for chunk in iter(lambda: self.proc.stderr.read(1024), b''):
+            self._stderr_tail.extend(chunk)
+            if len(self._stderr_tail) > self.STDERR_TAIL_BYTES:
+                del self._stderr_tail[:-self.STDERR_TAIL_BYTES]
+
+
+def encode_frames(ffmpeg_path: str, frames: Iterable, args: List[str],
+                  timeout_s: float = 60) -> EncodeResult:
+    """Pipe every frame through one ffmpeg invocation and wait for it."""
+    pipe = FFmpegPipe(ffmpeg_path, args, timeout_s=timeout_s)
+    try:
+        pipe.start()
+    except OSError as e:
+        return EncodeResult(ok=False, stderr=str(e))
+    for frame in frames:
+        if not pipe.write(frame):
+            break
+    return pipe.close()
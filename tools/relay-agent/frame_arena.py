@@ -0,0 +1,159 @@
+"""
+OBB Replay Intelligence — Frame Arena
+
+Fixed-size ring of JPEG payloads for the ScreenCapture rolling buffer.
+
+All payloads live in one preallocated bytearray; each frame is a small
+FrameRecord holding its offset/length into that arena plus the telemetry
+sample captured with it, so pre-event telemetry can never drift out of
+alignment with frames. Memory accounting is O(1) and bounded by a hard
+byte budget rather than a frame count.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+
+class FrameRecord:
+    """One buffered frame: where its JPEG lives in the arena + its telemetry."""
+
+    __slots__ = ('timestamp', 'session_time_ms', 'offset', 'length', 'telemetry', 'live')
+
+    def __init__(self, timestamp: float, session_time_ms: int, offset: int,
+                 length: int, telemetry: Any = None):
+        self.timestamp = timestamp
+        self.session_time_ms = session_time_ms
+        self.offset = offset
+        self.length = length
+        self.telemetry = telemetry
+        self.live = True
+
+
+class FrameArena:
+    """
+    Ring allocator over a single bytearray.
+
+    Payloads are written contiguously at the head; when the next payload
+    does not fit before the end of the arena the head wraps to 0. The
+    oldest records are evicted as the head runs over them, and also once
+    they are older than `max_age_s`.
+
+    Thread-safe: the capture thread appends while trigger_clip() (any
+    thread) copies frames out.
+    """
+
+    def __init__(self, budget_bytes: int, max_age_s: float = 0):
+        self.capacity = int(budget_bytes)
+        self.max_age_s = max_age_s
+        self._data = bytearray(self.capacity)
+        self._view = memoryview(self._data)
+        self._records: Deque[FrameRecord] = deque()
+        self._head = 0
+        self._lock = threading.Lock()
+
+        # Stats (O(1), maintained on append/evict)
+        self.used_bytes = 0
+        self.frames_written = 0
+        self.frames_evicted = 0
+        self.frames_rejected = 0
+
+    # ─── Write ───────────────────────────────
+
+    def append(self, payload, timestamp: float, session_time_ms: int,
+               telemetry: Any = None) -> Optional[FrameRecord]:
+        """
+        Copy `payload` (any buffer-protocol object) into the arena.
+        Returns the new record, or None if the payload exceeds the budget.
+        """
+        src = memoryview(payload).cast('B')
+        n = src.nbytes
+        if n == 0 or n > self.capacity:
+            self.frames_rejected += 1
+            return None
+
+        with self._lock:
+            if self.max_age_s:
+                self._evict_older_than(timestamp - self.max_age_s)
+
+            head = self._head
+            if head + n > self.capacity:
+                # Wrap: everything stored past the head is the oldest data
+                while self._records and self._records[0].offset >= head:
+                    self._evict_oldest()
+                head = 0
+
+            # Evict the oldest records the new payload would overwrite
+            end = head + n
+            while self._records and head <= self._records[0].offset < end:
+                self._evict_oldest()
+
+            self._view[head:end] = src
+            record = FrameRecord(timestamp, session_time_ms, head, n, telemetry)
+            self._records.append(record)
+            self._head = end
+            self.used_bytes += n
+            self.frames_written += 1
+            return record
+
+    def clear(self):
+        with self._lock:
+            while self._records:
+                self._evict_oldest()
+            self._head = 0
+
+    # ─── Read ────────────────────────────────
+
+    def read(self, record: FrameRecord) -> Optional[bytes]:
+        """Copy a record's payload out, or None if it has been evicted."""
+        with self._lock:
+            if not record.live:
+                return None
+            return bytes(self._view[record.offset:record.offset + record.length])
+
+    def records_since(self, since_ts: float) -> List[FrameRecord]:
+        """Live records with timestamp >= since_ts, oldest first (no copy)."""
+        with self._lock:
+            out = []
+            for record in reversed(self._records):
+                if record.timestamp < since_ts:
+                    break
+                out.append(record)
+            out.reverse()
+            return out
+
+    def copy_since(self, since_ts: float) -> List[Tuple[FrameRecord, bytes]]:
+        """Copy out every live frame with timestamp >= since_ts, oldest first."""
+        with self._lock:
+            out = []
+            for record in reversed(self._records):
+                if record.timestamp < since_ts:
+                    break
+                out.append((record, bytes(self._view[record.offset:record.offset + record.length])))
+            out.reverse()
+            return out
+
+    # ─── Stats ───────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def span_seconds(self) -> float:
+        """Wall-clock span between the oldest and newest buffered frame."""
+        records = self._records
+        if len(records) < 2:
+            return 0.0
+        return records[-1].timestamp - records[0].timestamp
+
+    # ─── Internals (lock held) ───────────────
+
+    def _evict_oldest(self):
+        record = self._records.popleft()
+        record.live = False
+        self.used_bytes -= record.length
+        self.frames_evicted += 1
+
+    def _evict_older_than(self, cutoff: float):
+        while self._records and self._records[0].timestamp < cutoff:
+            self._evict_oldest()
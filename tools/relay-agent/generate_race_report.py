@@ -2,84 +2,68 @@
 """
 Generate comprehensive race report for Auto Club Speedway session
 """
-import json
 import csv
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
+from typing import List, Optional
+
+from session_log import CarSample, Event, SessionLog, TELEMETRY_EVENT
+from session_pipeline import Analyzer, SessionContext, register
 
 LOG_DIR = Path("race_logs/20260303_095331")
 REPORT_FILE = LOG_DIR / "RACE_REPORT.md"
+TRACK_NAME = "Auto Club Speedway"  # Standalone run over LOG_DIR; the pipeline uses the session's track
 
-def load_jsonl(filepath, max_lines=None):
-    """Load JSONL file"""
-    events = []
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        for i, line in enumerate(f):
-            if max_lines and i >= max_lines:
-                break
-            try:
-                events.append(json.loads(line))
-            except:
-                pass
-    return events
+def add_telemetry_event(event: Event, player_data: list, all_drivers: dict):
+    """Record the field roster and the player sample from one telemetry:driver event"""
+    for raw in event.data.get('cars', []):
+        car = CarSample.from_car(event.ts, raw)
+        if car.driver_name:
+            all_drivers[car.driver_name] = {
+                'car': car.car_name,
+                'carNumber': car.car_number,
+                'iRating': car.i_rating,
+            }
+        
+        if car.is_player:
+            player_data.append({
+                'ts': car.ts,
+                'speed_ms': car.speed,
+                'speed_mph': car.speed_mph,
+                'rpm': car.rpm,
+                'gear': car.gear,
+                'throttle': car.throttle * 100,
+                'brake': car.brake * 100,
+                'steering': car.steering,
+                'lap': car.lap,
+                'position': car.position,
+                'classPosition': car.class_position,
+                'trackPct': car.track_pct,
+                'fuelLevel': car.fuel_level,
+                'fuelPct': car.fuel_pct,
+                'lastLapTime': car.last_lap_time,
+                'bestLapTime': car.best_lap_time,
+                'incidentCount': car.incident_count,
+                'inPit': car.in_pit,
+                'driverName': car.driver_name,
+                'carName': car.car_name,
+            })
 
-def extract_player_data(all_events_file, max_lines=500000):
+def extract_player_data(log: SessionLog, max_events=500000):
     """Extract player telemetry from all_events"""
     player_data = []
     all_drivers = {}
     session_info = None
     
-    with open(all_events_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for i, line in enumerate(f):
-            if i >= max_lines:
-                break
-            try:
-                event = json.loads(line)
-                
-                # Get session info
-                if event.get('event') == 'session:active' and not session_info:
-                    session_info = event.get('data', {})
-                
-                # Get telemetry
-                if event.get('event') == 'telemetry:driver':
-                    data = event.get('data', {})
-                    cars = data.get('cars', [])
-                    
-                    for car in cars:
-                        driver_name = car.get('driverName', '')
-                        if driver_name:
-                            all_drivers[driver_name] = {
-                                'car': car.get('carName', ''),
-                                'carNumber': car.get('carNumber', ''),
-                                'iRating': car.get('iRating', 0),
-                            }
-                        
-                        if car.get('isPlayer'):
-                            player_data.append({
-                                'ts': event.get('ts', 0),
-                                'speed_ms': car.get('speed', 0),
-                                'speed_mph': car.get('speed', 0) * 2.237,
-                                'rpm': car.get('rpm', 0),
-                                'gear': car.get('gear', 0),
-                                'throttle': car.get('throttle', 0) * 100,
-                                'brake': car.get('brake', 0) * 100,
-                                'steering': car.get('steering', 0),
-                                'lap': car.get('lap', 0),
-                                'position': car.get('position', 0),
-                                'classPosition': car.get('classPosition', 0),
-                                'trackPct': car.get('pos', {}).get('s', 0),
-                                'fuelLevel': car.get('fuelLevel', 0),
-                                'fuelPct': car.get('fuelPct', 0),
-                                'lastLapTime': car.get('lastLapTime', 0),
-                                'bestLapTime': car.get('bestLapTime', 0),
-                                'incidentCount': car.get('incidentCount', 0),
-                                'inPit': car.get('inPit', False),
-                                'driverName': driver_name,
-                                'carName': car.get('carName', ''),
-                            })
-            except:
-                pass
+    for event in log.events(['session:active', TELEMETRY_EVENT], limit=max_events):
+        # Get session info
+        if event.event == 'session:active':
+            session_info = session_info or event.data
+            continue
+        
+        # Get telemetry
+        add_telemetry_event(event, player_data, all_drivers)
     
     return player_data, all_drivers, session_info
 
@@ -134,17 +118,15 @@ def analyze_laps(player_data):
     
     return result
 
-def analyze_incidents(incidents_file):
+def analyze_incidents(incidents: List[Event]):
     """Analyze incidents"""
-    incidents = load_jsonl(incidents_file)
-    
     by_driver = defaultdict(list)
     by_corner = defaultdict(list)
     timeline = []
     
     for inc in incidents:
-        data = inc.get('data', inc)
-        ts = inc.get('ts', 0)
+        data = inc.data
+        ts = inc.ts
         drivers = data.get('driverNames', ['Unknown'])
         corner = data.get('cornerName', 'Unknown')
         severity = data.get('severity', 'unknown')
@@ -189,22 +171,14 @@ def format_lap_time(seconds):
         return f"{mins}:{secs:06.3f}"
     return f"{secs:.3f}"
 
-def generate_report():
-    """Generate the full race report"""
-    print("Loading data...")
-    
-    # Load stats
-    with open(LOG_DIR / "stats.json") as f:
-        stats = json.load(f)
-    
-    # Extract player data
-    player_data, all_drivers, session_info = extract_player_data(LOG_DIR / "all_events.jsonl")
-    
+def build_report(stats: dict, player_data: list, all_drivers: dict, incident_events: List[Event],
+                 track: str = TRACK_NAME) -> str:
+    """Render RACE_REPORT.md from extracted player data, field roster and incidents"""
     # Analyze laps
     laps = analyze_laps(player_data)
     
     # Analyze incidents
-    incidents = analyze_incidents(LOG_DIR / "incidents.jsonl")
+    incidents = analyze_incidents(incident_events)
     
     # Get player info
     player_name = player_data[0]['driverName'] if player_data else "Unknown"
@@ -223,13 +197,19 @@ def generate_report():
     else:
         speeds = rpms = throttles = brakes = positions = []
     
+    # Sessions without stats.json: fall back to the span of the telemetry read
+    elapsed = stats.get('elapsed_seconds')
+    if elapsed is None:
+        elapsed = player_data[-1]['ts'] - player_data[0]['ts'] if player_data else 0
+    event_counts = stats.get('event_counts') or {}
+    
     # Build report
     report = []
-    report.append("# 🏁 Race Report: Auto Club Speedway")
+    report.append(f"# 🏁 Race Report: {track}")
     report.append("")
     report.append(f"**Date:** {datetime.now().strftime('%B %d, %Y')}")
-    report.append(f"**Session Duration:** {stats['elapsed_seconds']/60:.1f} minutes")
-    report.append(f"**Total Events Captured:** {sum(stats['event_counts'].values()):,}")
+    report.append(f"**Session Duration:** {elapsed/60:.1f} minutes")
+    report.append(f"**Total Events Captured:** {sum(event_counts.values()):,}")
     report.append("")
     
     # Driver Info
@@ -352,7 +332,7 @@ def generate_report():
     report.append("")
     report.append(f"| Event Type | Count |")
     report.append(f"|------------|-------|")
-    for event, count in sorted(stats['event_counts'].items(), key=lambda x: -x[1]):
+    for event, count in sorted(event_counts.items(), key=lambda x: -x[1]):
         report.append(f"| {event} | {count:,} |")
     report.append("")
     
@@ -366,8 +346,28 @@ def generate_report():
     report.append(f"*Report generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
     report.append(f"*Data captured by PitBox Race Logger*")
     
+    return "\n".join(report)
+
+def report_stats(stats: dict, log: SessionLog) -> dict:
+    """stats.json contents; without it, the event total comes from the log itself"""
+    if stats.get('event_counts'):
+        return stats
+    return dict(stats, event_counts={'all events': log.count()})
+
+def generate_report():
+    """Generate the full race report"""
+    print("Loading data...")
+    
+    # Load stats
+    log = SessionLog(LOG_DIR)
+    stats = report_stats(log.stats(), log)
+    
+    # Extract player data
+    player_data, all_drivers, session_info = extract_player_data(log)
+    
+    report_text = build_report(stats, player_data, all_drivers, log.incidents())
+    
     # Write report
-    report_text = "\n".join(report)
     with open(REPORT_FILE, 'w', encoding='utf-8') as f:
         f.write(report_text)
     
@@ -378,5 +378,22 @@ def generate_report():
     
     return report_text
 
+@register('report')
+class RaceReportAnalyzer(Analyzer):
+    """Lap table, field roster and incident tables from a pipeline pass"""
+    all_cars = True
+    report_file = "RACE_REPORT.md"
+    
+    def begin(self, ctx: SessionContext):
+        self.player_data = []
+        self.all_drivers = {}
+    
+    def feed(self, evt: Event, player: Optional[CarSample]):
+        add_telemetry_event(evt, self.player_data, self.all_drivers)
+    
+    def finish(self, ctx: SessionContext) -> Optional[str]:
+        return build_report(report_stats(ctx.stats, ctx.log), self.player_data, self.all_drivers, ctx.incidents,
+                            track=ctx.session_info.get('trackName', 'Unknown'))
+
 if __name__ == "__main__":
     generate_report()
@@ -13,7 +13,10 @@ except ImportError:
     print("NOTE: This only works on Windows with iRacing installed.")
     raise
 
+from log_throttle import RateLimitedLogger
+
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
 
 
 @dataclass
@@ -147,7 +150,7 @@ class IRacingReader:
                 self.connected = False
                 return False
         except Exception as e:
-            logger.error(f"Failed to connect to iRacing: {e}")
+            throttled.error('connect', "Failed to connect to iRacing: %s", e)
             self.connected = False
             return False
     
@@ -211,7 +214,7 @@ class IRacingReader:
                 cautions_enabled=weekend_info.get('WeekendOptions', {}).get('HasOpenRegistration', False)
             )
         except Exception as e:
-            logger.error(f"Error getting session data: {e}")
+            throttled.error('session_data', "Error getting session data: %s", e)
             return None
     
     def get_all_cars(self) -> List[CarData]:
@@ -357,7 +360,7 @@ class IRacingReader:
                 cars.append(car_data)
             
         except Exception as e:
-            logger.error(f"Error getting car data: {e}")
+            throttled.error('car_data', "Error getting car data: %s", e)
         
         return cars
     # =========================================================================
@@ -447,7 +450,7 @@ class IRacingReader:
             
             return 'green'
         except Exception as e:
-            logger.error(f"Error getting flag state: {e}")
+            throttled.error('flag_state', "Error getting flag state: %s", e)
             return 'green'
     
     def get_session_time(self) -> float:
@@ -495,7 +498,7 @@ class IRacingReader:
                     })
                 self._last_incident_counts[car.car_id] = car.incident_count
         except Exception as e:
-            logger.error(f"Error detecting incidents: {e}")
+            throttled.error('incidents', "Error detecting incidents: %s", e)
         
         return incidents
     
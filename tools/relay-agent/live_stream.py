@@ -0,0 +1,233 @@
+"""
+PitBox Relay Agent - H.264 Live Stream
+Optional replacement for per-frame JPEG live video.
+
+Captured frames are piped (raw BGR) into a low-latency ffmpeg x264
+process producing MPEG-TS or fragmented MP4 on stdout. Output is
+collected and sent over the existing client as 'video_chunk' messages at
+a fixed cadence (VIDEO_CHUNK_MS), so the dashboard gets a few messages a
+second with inter-frame compression instead of 60 standalone JPEGs.
+
+Chunks always end on a container boundary: whole 188-byte TS packets, or
+whole top-level MP4 boxes. For fMP4 the init segment (ftyp + moov) is sent
+first with init=True and kept so it can be re-sent after a restart.
+
+Experimental: the server has no 'video_chunk' handler yet, so VideoEncoder
+only uses this with VIDEO_H264_EXPERIMENTAL=true.
+"""
+import logging
+import struct
+import threading
+import time
+from typing import Callable, Optional
+
+from ffmpeg_pipe import FFmpegPipe, raw_input_args
+
+logger = logging.getLogger(__name__)
+
+TS_PACKET = 188
+MP4_INIT_BOXES = (b'ftyp', b'moov')
+
+
+def h264_live_output_args(container: str, fps: int, codec: str = 'libx264',
+                          crf: int = 28, chunk_ms: int = 250) -> list:
+    """Low-latency H.264 to stdout: no B-frames, keyframe every 2 seconds."""
+    args = ['-c:v', codec]
+    if codec == 'libx264':
+        args += ['-preset', 'ultrafast', '-tune', 'zerolatency', '-crf', str(crf)]
+    args += ['-g', str(max(1, fps * 2)), '-bf', '0', '-pix_fmt', 'yuv420p']
+    if container == 'fmp4':
+        args += [
+            '-f', 'mp4',
+            '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+            '-frag_duration', str(chunk_ms * 1000),
+        ]
+    else:
+        args += ['-f', 'mpegts', '-muxdelay', '0']
+    return args + ['pipe:1']
+
+
+class H264LiveStream:
+    """One ffmpeg encoder process plus the chunker that ships its output."""
+
+    def __init__(self, ffmpeg_path: str, send_chunk: Callable[..., bool],
+                 container: str = 'mpegts', chunk_ms: int = 250,
+                 codec: str = 'libx264', crf: int = 28):
+        self.ffmpeg_path = ffmpeg_path
+        self.send_chunk = send_chunk
+        self.container = 'fmp4' if container == 'fmp4' else 'mpegts'
+        self.chunk_ms = chunk_ms
+        self.codec = codec
+        self.base_crf = crf
+
+        self.pipe: Optional[FFmpegPipe] = None
+        self.width = 0
+        self.height = 0
+        self.fps = 0
+        self.crf = crf
+        self.running = False
+
+        self._lock = threading.Lock()
+        self._pending = bytearray()       # ffmpeg output not yet on a boundary
+        self._ready = bytearray()         # whole packets / boxes waiting for the next tick
+        self._init_segment = b''
+        self._init_sent = False
+        self._flush_thread: Optional[threading.Thread] = None
+
+        # Stats
+        self.seq = 0
+        self.frames_written = 0
+        self.bytes_sent = 0
+        self.restarts = 0
+        self._rate_window_start = time.monotonic()
+        self._rate_window_bytes = 0
+        self.kbps = 0.0
+
+    # ─── Lifecycle ───────────────────────────
+
+    def start(self, width: int, height: int, fps: int, crf: Optional[int] = None) -> bool:
+        self.width, self.height, self.fps = width, height, fps
+        self.crf = self.base_crf if crf is None else crf
+        args = raw_input_args(fps, width, height, 'bgr24') + h264_live_output_args(
+            self.container, fps, self.codec, self.crf, self.chunk_ms
+        )
+        pipe = FFmpegPipe(self.ffmpeg_path, args, timeout_s=0, on_output=self._on_output)
+        try:
+            pipe.start()
+        except OSError as e:
+            logger.error(f"❌ H.264 live encoder failed to start: {e}")
+            return False
+
+        with self._lock:
+            self._pending.clear()
+            self._ready.clear()
+            self._init_segment = b''
+            self._init_sent = False
+        self.pipe = pipe
+        if not self.running:
+            self.running = True
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, daemon=True, name='H264LiveFlush'
+            )
+            self._flush_thread.start()
+        logger.info(
+            f"📡 H.264 live stream: {width}x{height} @ {fps}fps crf {self.crf} ({self.container})"
+        )
+        return True
+
+    def restart(self, width: int, height: int, fps: int, crf: Optional[int] = None) -> bool:
+        """Re-open the encoder with new parameters (resolution changes need a new stream)."""
+        self._close_pipe()
+        self.restarts += 1
+        return self.start(width, height, fps, crf)
+
+    def stop(self):
+        self._close_pipe()
+        self.running = False
+        if self._flush_thread:
+            self._flush_thread.join(timeout=1.0)
+            self._flush_thread = None
+        self._flush()
+
+    def _close_pipe(self):
+        pipe, self.pipe = self.pipe, None
+        if pipe:
+            result = pipe.close()
+            if not result.ok and result.stderr:
+                logger.debug(f"H.264 live encoder exited: {result.stderr.strip()[-200:]}")
+            self._flush()
+
+    # ─── Input ───────────────────────────────
+
+    def write(self, frame) -> bool:
+        """Feed one SharedFrame. Blocks while ffmpeg is behind."""
+        pipe = self.pipe
+        if not pipe:
+            return False
+        ok = pipe.write(frame.resized(self.width, self.height))
+        if ok:
+            self.frames_written += 1
+        return ok
+
+    # ─── Output ──────────────────────────────
+
+    def _on_output(self, data: bytes):
+        with self._lock:
+            self._pending.extend(data)
+            if self.container == 'fmp4':
+                self._take_mp4_boxes()
+            else:
+                whole = len(self._pending) - len(self._pending) % TS_PACKET
+                if whole:
+                    self._ready.extend(self._pending[:whole])
+                    del self._pending[:whole]
+
+    def _take_mp4_boxes(self):
+        """Move complete top-level boxes out of _pending (lock held)."""
+        while len(self._pending) >= 8:
+            size, box_type = struct.unpack_from('>I4s', self._pending, 0)
+            if size == 1 and len(self._pending) >= 16:
+                size = struct.unpack_from('>Q', self._pending, 8)[0]
+            if size < 8 or len(self._pending) < size:
+                return
+            box = bytes(self._pending[:size])
+            del self._pending[:size]
+            if box_type in MP4_INIT_BOXES and not self._init_sent:
+                self._init_segment += box
+            else:
+                self._ready.extend(box)
+
+    def _flush_loop(self):
+        interval = self.chunk_ms / 1000.0
+        while self.running:
+            time.sleep(interval)
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            init = None
+            if self.container == 'fmp4' and self._init_segment and not self._init_sent:
+                if not self._ready:
+                    return  # Wait until the first fragment so init is complete
+                init, self._init_sent = self._init_segment, True
+            if not self._ready and init is None:
+                return
+            data, self._ready = bytes(self._ready), bytearray()
+
+        meta = {
+            'container': self.container,
+            'codec': 'h264',
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+        }
+        if init is not None:
+            self._send(init, init=True, **meta)
+        if data:
+            self._send(data, init=False, **meta)
+
+    def _send(self, data: bytes, **meta):
+        self.seq += 1
+        if self.send_chunk(data, seq=self.seq, **meta):
+            self.bytes_sent += len(data)
+            self._rate_window_bytes += len(data)
+        now = time.monotonic()
+        elapsed = now - self._rate_window_start
+        if elapsed >= 2.0:
+            self.kbps = self._rate_window_bytes * 8 / 1000 / elapsed
+            self._rate_window_start = now
+            self._rate_window_bytes = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'container': self.container,
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'crf': self.crf,
+            'frames_written': self.frames_written,
+            'chunks_sent': self.seq,
+            'bytes_sent': self.bytes_sent,
+            'kbps': round(self.kbps, 1),
+            'restarts': self.restarts,
+        }
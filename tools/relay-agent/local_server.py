@@ -5,7 +5,8 @@ Runs a local Socket.IO server on port 9999 so the Electron bridge
 (python-bridge-simple.ts) can connect to it and receive forwarded
 events (iracing_status, telemetry, session_metadata, incident, clip_saved).
 
-Also receives commands from Electron (e.g. trigger_clip).
+Also receives commands from Electron (e.g. trigger_clip) and answers
+clip library queries (query_clips) via Socket.IO acks.
 
 Architecture:
   iRacing → RelayAgent → local_server (port 9999) → Electron Bridge → Cloud
@@ -39,6 +40,7 @@ class LocalServer:
 
         # Register handler for incoming commands:
         server.on_trigger_clip = lambda data: screen_capture.trigger_clip(...)
+        server.on_query_clips = screen_capture.library.query_request
 
         server.stop()
     """
@@ -59,6 +61,7 @@ class LocalServer:
 
         # Command handlers (set by RelayAgent)
         self.on_trigger_clip: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_query_clips: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
 
         # Client tracking
         self.connected_clients: set = set()
@@ -87,6 +90,17 @@ class LocalServer:
                 except Exception as e:
                     logger.error(f"trigger_clip handler error: {e}")
 
+        @self.sio.on('query_clips')
+        def handle_query_clips(sid, data):
+            # Return value is delivered to Electron as the emit's ack
+            if not self.on_query_clips:
+                return {'clips': [], 'error': 'clip library unavailable'}
+            try:
+                return self.on_query_clips(data or {})
+            except Exception as e:
+                logger.error(f"query_clips handler error: {e}")
+                return {'clips': [], 'error': str(e)}
+
     # ─── Lifecycle ───────────────────────────
 
     def start(self):
@@ -0,0 +1,109 @@
+"""
+Rate-limited logging for hot paths
+
+Warnings raised from the 10-60Hz telemetry loop or the capture threads
+can fire thousands of times a minute while a condition persists (cloud
+offline, monitor lost, ...). Formatting and writing every one costs CPU
+here and again in the GUI, which parses relay stdout line by line.
+
+RateLimitedLogger wraps a standard logger with a token bucket per message
+key. Messages over the limit are counted, not formatted, and the count is
+reported as "suppressed N similar messages" on the next allowed emission
+(or on flush()).
+
+Usage:
+    throttled = RateLimitedLogger(logger)
+    throttled.warning('emit:telemetry', "Cannot emit %s: not connected", event)
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second, holding at most `burst`."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'last')
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class RateLimitedLogger:
+    """
+    Per-key token-bucket rate limiting on top of a logging.Logger.
+
+    Args:
+        logger: Underlying logger
+        rate: Sustained messages per second allowed per key
+        burst: Messages allowed back-to-back before limiting kicks in
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float = 0.2, burst: int = 3):
+        self.logger = logger
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._last_level: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def log(self, level: int, key: str, msg: str, *args, exc_info=None):
+        """Log `msg % args` under `key` if its bucket has a token."""
+        if not self.logger.isEnabledFor(level):
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if not bucket.take(now):
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                self._last_level[key] = level
+                return
+            suppressed = self._suppressed.pop(key, 0)
+
+        if suppressed:
+            msg = f"{msg} (suppressed {suppressed} similar messages)"
+        self.logger.log(level, msg, *args, exc_info=exc_info)
+
+    def debug(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.DEBUG, key, msg, *args, **kwargs)
+
+    def info(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.INFO, key, msg, *args, **kwargs)
+
+    def warning(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.WARNING, key, msg, *args, **kwargs)
+
+    def error(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.ERROR, key, msg, *args, **kwargs)
+
+    def suppressed_count(self, key: Optional[str] = None) -> int:
+        """Messages currently held back for `key` (or all keys)."""
+        with self._lock:
+            if key is not None:
+                return self._suppressed.get(key, 0)
+            return sum(self._suppressed.values())
+
+    def flush(self):
+        """Emit a summary line for every key with suppressed messages."""
+        with self._lock:
+            pending = [(k, n, self._last_level.get(k, logging.WARNING))
+                       for k, n in self._suppressed.items()]
+            self._suppressed.clear()
+        for key, count, level in pending:
+            self.logger.log(level, "[%s] suppressed %d similar messages", key, count)
@@ -30,6 +30,10 @@ except ImportError:
 
 from iracing_reader import IRacingReader
 from pitbox_client import PitBoxClient
+from connection_manager import ConnectionManager
+from log_throttle import RateLimitedLogger
+from capture_source import CaptureSource, parse_region
+from telemetry_ring import PlayerTelemetrySampler, TelemetryRing
 from video_encoder import VideoEncoder
 from screen_capture import ScreenCapture, CaptureConfig
 from local_server import LocalServer
@@ -52,6 +56,7 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
 
 
 # ========================
@@ -60,6 +65,7 @@ logger = logging.getLogger(__name__)
 
 import os
 from exporters.motec_exporter import MoTeCLDExporter
+from exporters.ld_structs import DATATYPE_SHORT
 
 class RelayAgent:
     """
@@ -75,21 +81,58 @@ class RelayAgent:
     def __init__(self, cloud_url: str = None):
         self.ir_reader = IRacingReader()
         self.cloud_client = PitBoxClient(cloud_url)
-        self.video_encoder = VideoEncoder(self.cloud_client)
-        self.screen_capture = ScreenCapture(CaptureConfig(
+        self.connection_manager = ConnectionManager(
+            self.cloud_client,
+            on_state_change=self._handle_connection_state,
+        )
+        capture_config = CaptureConfig(
+            monitor_index=config.CAPTURE_MONITOR,
+            region_mode=config.CAPTURE_REGION_MODE,
+            region=parse_region(config.CAPTURE_REGION),
             target_fps=config.CLIP_CAPTURE_FPS,
             capture_width=config.CLIP_CAPTURE_WIDTH,
             capture_height=config.CLIP_CAPTURE_HEIGHT,
             buffer_seconds=config.CLIP_BUFFER_SECONDS,
+            buffer_max_mb=config.CLIP_BUFFER_MAX_MB,
             jpeg_quality=config.CLIP_JPEG_QUALITY,
             pre_event_seconds=config.CLIP_PRE_EVENT_SECONDS,
             post_event_seconds=config.CLIP_POST_EVENT_SECONDS,
             max_clip_seconds=config.CLIP_MAX_SECONDS,
             output_dir=config.CLIP_OUTPUT_DIR,
             max_storage_mb=config.CLIP_MAX_STORAGE_MB,
-        ))
+            compress_workers=config.CLIP_COMPRESS_WORKERS,
+            encode_workers=config.CLIP_ENCODE_WORKERS,
+            merge_overlapping_clips=config.CLIP_MERGE_OVERLAPPING,
+            segment_mode=config.CLIP_SEGMENT_MODE,
+            segment_seconds=config.CLIP_SEGMENT_SECONDS,
+            telemetry_format=config.CLIP_TELEMETRY_FORMAT,
+            telemetry_compress=config.CLIP_TELEMETRY_COMPRESS,
+        )
+        # One screen grab loop shared by the live stream and replay clips
+        self.capture_source = CaptureSource(
+            monitor_index=capture_config.monitor_index,
+            region_mode=capture_config.region_mode,
+            region=capture_config.region,
+        )
+        self.video_encoder = VideoEncoder(self.cloud_client, source=self.capture_source)
+        self.video_encoder.on_operating_point = (
+            lambda op: self.local_server.emit('video_status', op)
+        )
+        # Player telemetry at iRacing tick rate for clip sidecars (independent of POLL_RATE_HZ)
+        self.telemetry_ring = None
+        self.telemetry_sampler = None
+        if config.CLIP_TELEMETRY_RATE_HZ > 0:
+            self.telemetry_ring = TelemetryRing(
+                seconds=config.CLIP_BUFFER_SECONDS + config.CLIP_MAX_SECONDS + 60,
+                rate_hz=config.CLIP_TELEMETRY_RATE_HZ,
+            )
+            self.telemetry_sampler = PlayerTelemetrySampler(self.telemetry_ring)
+        self.screen_capture = ScreenCapture(
+            capture_config, source=self.capture_source, telemetry_ring=self.telemetry_ring,
+        )
         self.local_server = LocalServer()
         self.local_server.on_trigger_clip = self._handle_trigger_clip
+        self.local_server.on_query_clips = self.screen_capture.library.query_request
         self.vr = VoiceRecognition(
             ptt_type=config.PTT_TYPE,
             ptt_key=config.PTT_KEY,
@@ -111,7 +154,7 @@ class RelayAgent:
         self.voice_thread = None
         
         # MoTeC Exporter
-        self.motec_exporter = MoTeCLDExporter()
+        self.motec_exporter = MoTeCLDExporter(frequency=config.POLL_RATE_HZ, lap_channel="Lap")
         self._setup_motec_channels()
         
         self.running = False
@@ -141,15 +184,20 @@ class RelayAgent:
     def is_connected(self):
         """Check if connected to cloud"""
         return self.cloud_client.is_connected()
+
+    def _handle_connection_state(self, status):
+        """Forward cloud connection state changes to the Electron bridge"""
+        self.local_server.emit('cloud_status', status)
+
     def _setup_motec_channels(self):
         """Configure MoTeC channels"""
         self.motec_exporter.add_channel("Speed", "km/h")
         self.motec_exporter.add_channel("RPM", "rpm")
-        self.motec_exporter.add_channel("Gear", "")
+        self.motec_exporter.add_channel("Gear", "", datatype=DATATYPE_SHORT)
         self.motec_exporter.add_channel("Throttle", "%")
         self.motec_exporter.add_channel("Brake", "%")
         self.motec_exporter.add_channel("Steering", "%") # Or degrees
-        self.motec_exporter.add_channel("Lap", "")
+        self.motec_exporter.add_channel("Lap", "", datatype=DATATYPE_SHORT)
         
     def start(self):
         """Start the relay agent"""
@@ -171,7 +219,8 @@ class RelayAgent:
         print("╚════════════════════════════════════════════════════════════╝")
         print(f"Connecting to: {self.cloud_client.url}")
         
-        self.cloud_client.connect()
+        # Connect in the background; iRacing polling starts immediately
+        self.connection_manager.start()
         self._setup_voice_response_handler()
         
         # Start voice thread (runs independently of iRacing)
@@ -185,6 +234,8 @@ class RelayAgent:
         """Stop the relay agent"""
         self.running = False
         self.video_encoder.stop()
+        if self.telemetry_sampler:
+            self.telemetry_sampler.stop()
         self.screen_capture.stop()
         self.local_server.stop()
         self.overlay.stop()
@@ -194,6 +245,7 @@ class RelayAgent:
             self.cloud_client.send_session_end(user_id=config.USER_ID)
         
         self.ir_reader.disconnect()
+        self.connection_manager.stop()
         self.cloud_client.disconnect()
         
         # Export MoTeC Data
@@ -201,6 +253,7 @@ class RelayAgent:
             filename = f"pitbox_session_{self.session_id}_{int(time.time())}.ld"
             self.motec_exporter.export(filename)
             print(f"💾 Saved MoTeC telemetry to: {filename}")
+        self.motec_exporter.close()
         
         # Print stats
         elapsed = time.time() - self.start_time
@@ -362,7 +415,7 @@ class RelayAgent:
         """Send session metadata to cloud. Returns True on success."""
         session = self.ir_reader.get_session_data()
         if not session:
-            logger.warning("No session data available")
+            throttled.warning('no_session', "No session data available")
             return False
         
         self.session_id = session.session_id
@@ -370,13 +423,22 @@ class RelayAgent:
         self.discipline_category = metadata['category']
         
         logger.info(f"📋 Session: {session.track_name} [{session.session_type}]")
+        self.motec_exporter.set_session_info(
+            venue=f"{session.track_name} {session.track_config}".strip(),
+            event=session.session_name,
+            session=session.session_type,
+        )
         logger.info(f"   Category: {self.discipline_category}")
         logger.info(f"   Multi-class: {session.is_multiclass}")
         
         ok = self.cloud_client.send_session_metadata(metadata)
         if not ok:
-            logger.warning("⚠️ Failed to send session_metadata, will retry")
-            return False
+            cached = self.cloud_client.last_session_metadata
+            if not cached or cached.get('sessionId') != self.session_id:
+                logger.warning("⚠️ Failed to send session_metadata, will retry")
+                return False
+            # Validated and cached; ConnectionManager replays it on connect
+            logger.info("📋 Cloud offline, session_metadata will be sent on connect")
         
         # Forward to Electron bridge
         self.local_server.emit('session_metadata', metadata)
@@ -389,6 +451,8 @@ class RelayAgent:
         if not self.screen_capture.running:
             self.screen_capture.session_id = self.session_id or ''
             self.screen_capture.start()
+            if self.telemetry_sampler:
+                self.telemetry_sampler.start()
 
         return True
     
@@ -556,6 +620,8 @@ class RelayAgent:
         for car in cars:
             if car.is_player:
                 player_car = car
+                if not self.motec_exporter.header.driver:
+                    self.motec_exporter.set_session_info(driver=car.driver_name, vehicle=car.car_name)
                 self.motec_exporter.add_sample({
                     "Speed": car.speed * 3.6,
                     "RPM": car.rpm,
@@ -9,6 +9,7 @@ import socketio
 import socketio.exceptions
 
 import config
+from log_throttle import RateLimitedLogger
 from protocol import (
     SessionMetadata, 
     TelemetrySnapshot, 
@@ -17,6 +18,7 @@ from protocol import (
 )
 
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
 
 
 class PitBoxClient:
@@ -31,16 +33,22 @@ class PitBoxClient:
     
     def __init__(self, url: str = None):
         self.url = url or config.CLOUD_URL
+        # Reconnection is owned by ConnectionManager (no attempt cap)
         self.sio = socketio.Client(
-            reconnection=True,
-            reconnection_attempts=10,
-            reconnection_delay=1,
-            reconnection_delay_max=30,
+            reconnection=False,
             logger=False,
             engineio_logger=False
         )
         self.connected = False
         self.session_id: Optional[str] = None
+        self.last_error: Optional[str] = None
+        
+        # Last validated session_metadata, replayed on every (re)connect
+        self.last_session_metadata: Optional[Dict[str, Any]] = None
+        
+        # Connection lifecycle hooks (set by ConnectionManager)
+        self.on_connect: Optional[Callable[[], None]] = None
+        self.on_disconnect: Optional[Callable[[], None]] = None
         
         # v2: Adaptive streaming state
         self.viewer_count = 0
@@ -59,17 +67,25 @@ class PitBoxClient:
         def connect():
             self.connected = True
             logger.info(f"✅ Connected to PitBox Server at {self.url}")
-            # Register as relay for this session
+            # Register as relay for this session and replay its metadata
             if self.session_id:
                 self.sio.emit('relay:register', {'sessionId': self.session_id})
+            if self.last_session_metadata:
+                self.sio.emit('session_metadata', self.last_session_metadata)
+                logger.info(f"📋 Re-sent session_metadata for {self.session_id}")
+            if self.on_connect:
+                self.on_connect()
         
         @self.sio.event
         def disconnect():
             self.connected = False
             logger.warning("⚠️ Disconnected from PitBox Server")
+            if self.on_disconnect:
+                self.on_disconnect()
         
         @self.sio.event
         def connect_error(error):
+            self.last_error = str(error)[:100]
             logger.error(f"❌ Connection error: {error}")
         
         @self.sio.on('recommendation')
@@ -102,9 +118,9 @@ class PitBoxClient:
                 logger.info(f"👁️ Viewer count: {self.viewer_count} (controls: {'ON' if self.controls_requested else 'OFF'})")
 
     
-    def connect(self) -> bool:
+    def connect(self, wait_timeout: float = 10) -> bool:
         """
-        Connect to PitBox Cloud
+        Connect to PitBox Cloud (blocking, single attempt)
         Returns True if connected successfully
         """
         if self.connected:
@@ -122,16 +138,18 @@ class PitBoxClient:
                 self.url,
                 transports=['websocket'],
                 wait=True,
-                wait_timeout=10,
+                wait_timeout=wait_timeout,
                 auth=auth_payload
             )
             return self.connected
         except Exception as e:
+            self.last_error = str(e)[:100]
             logger.error(f"Failed to connect: {e}")
             return False
     
     def disconnect(self):
         """Disconnect from PitBox Cloud"""
+        throttled.flush()
         if self.sio.connected:
             self.sio.disconnect()
         self.connected = False
@@ -146,15 +164,15 @@ class PitBoxClient:
         Emit an event to PitBox Cloud
         """
         if not self.is_connected():
-            logger.warning(f"Cannot emit {event}: not connected")
+            throttled.warning('emit:offline', "Cannot emit %s: not connected", event)
             return False
         
         try:
             self.sio.emit(event, data)
-            logger.debug(f"📤 Sent {event}")
+            logger.debug("📤 Sent %s", event)
             return True
         except Exception as e:
-            logger.error(f"Failed to emit {event}: {e}")
+            throttled.error(f'emit:{event}', "Failed to emit %s: %s", event, e)
             return False
     
     def send_session_metadata(self, metadata: Dict[str, Any]):
@@ -169,9 +187,10 @@ class PitBoxClient:
                  
             model = SessionMetadata(**metadata)
             self.session_id = model.sessionId
+            self.last_session_metadata = model.model_dump()
             
-            # Emit the dict representation
-            return self.emit('session_metadata', model.model_dump())
+            # Emit the dict representation (replayed on reconnect if this fails)
+            return self.emit('session_metadata', self.last_session_metadata)
         except Exception as e:
             logger.error(f"❌ Protocol Violation (Metadata): {e}")
             return False
@@ -192,8 +211,7 @@ class PitBoxClient:
             model = TelemetrySnapshot(**telemetry)
             return self.emit('telemetry', model.model_dump())
         except Exception as e:
-            # Rate limit this log in production
-            logger.error(f"❌ Protocol Violation (Telemetry): {e}")
+            throttled.error('protocol:telemetry', "❌ Protocol Violation (Telemetry): %s", e)
             return False
 
     def send_telemetry_binary(self, telemetry: Dict[str, Any]):
@@ -247,7 +265,7 @@ class PitBoxClient:
             return False
             
         except Exception as e:
-            logger.error(f"❌ Binary Packing Error: {e}")
+            throttled.error('telemetry_binary', "❌ Binary Packing Error: %s", e)
             return False
     
     def send_race_event(self, event: Dict[str, Any]):
@@ -278,10 +296,14 @@ class PitBoxClient:
         """Send driver join/leave update"""
         return self.emit('driver_update', update)
     
-    def send_video_frame(self, frame_data: bytes):
+    def send_video_frame(self, frame_data: bytes, on_ack: Optional[Callable[[], None]] = None):
         """
         Send raw binary video frame
-        Optimize: fire and forget, don't wait for ack to keep latency low
+        Optimize: fire and forget, don't wait for ack to keep latency low.
+        on_ack (optional) is called when the server acknowledges the frame
+        (BroadcastHandler acks every video_frame); the adaptive video
+        controller uses it to time the round trip. Pass it only while acks
+        are arriving: python-socketio keeps each callback until it fires.
         """
         # We use a specific event for video that the server expects
         if self.connected and self.session_id:
@@ -290,10 +312,39 @@ class PitBoxClient:
                 'image': frame_data # socketio will automatically binary-pack this
             }
             # Note: We rely on the library to handle binary attachments efficiently
-            self.sio.emit('video_frame', payload)
+            if on_ack:
+                self.sio.emit('video_frame', payload, callback=lambda *_: on_ack())
+            else:
+                self.sio.emit('video_frame', payload)
             return True
         return False
 
+    def send_video_chunk(self, data: bytes, seq: int, container: str, init: bool = False,
+                         **stream_info) -> bool:
+        """
+        Send a chunk of the H.264 live stream (MPEG-TS packets or fMP4 boxes).
+        init=True marks the fMP4 init segment the server should cache for late viewers.
+        """
+        if self.connected and self.session_id:
+            self.sio.emit('video_chunk', {
+                'sessionId': self.session_id,
+                'seq': seq,
+                'container': container,
+                'init': init,
+                **stream_info,
+                'data': data,
+            })
+            return True
+        return False
+
+    def send_backlog(self) -> int:
+        """Packets queued in the Engine.IO client but not yet written to the socket."""
+        eio_queue = getattr(self.sio.eio, 'queue', None)
+        try:
+            return eio_queue.qsize() if eio_queue is not None else 0
+        except (AttributeError, NotImplementedError):
+            return 0
+
     # =========================================================================
     # Protocol v2: Multi-Stream Telemetry
     # =========================================================================
@@ -7,7 +7,6 @@ sent to the server for IDP processing, or outputs a local analysis report.
 This tool works offline - it doesn't require an active server connection.
 """
 import json
-import gzip
 import argparse
 from pathlib import Path
 from collections import defaultdict
@@ -15,152 +14,80 @@ from typing import List, Dict, Optional
 import statistics
 from datetime import datetime
 
-def open_jsonl(filepath: Path):
-    """Open a JSONL file, handling both compressed and uncompressed formats"""
-    if filepath.suffix == '.gz':
-        return gzip.open(filepath, 'rt', encoding='utf-8', errors='ignore')
-    elif filepath.with_suffix(filepath.suffix + '.gz').exists():
-        return gzip.open(filepath.with_suffix(filepath.suffix + '.gz'), 'rt', encoding='utf-8', errors='ignore')
-    else:
-        return open(filepath, 'r', errors='ignore')
+from session_cache import cached_cars
+from session_log import CarSample, Event, SessionLog
+from session_pipeline import Analyzer, SessionContext, SessionPipeline, register
 
-def extract_telemetry(log_dir: Path) -> List[Dict]:
-    """Extract player telemetry from telemetry:driver events"""
-    # Try compressed first, then uncompressed
-    all_events_file = log_dir / "all_events.jsonl.gz"
-    if not all_events_file.exists():
-        all_events_file = log_dir / "all_events.jsonl"
-    
-    if not all_events_file.exists():
-        print(f"❌ File not found: {all_events_file}")
-        return []
-    
-    samples = []
-    
-    with open_jsonl(all_events_file) as f:
-        for line in f:
-            try:
-                evt = json.loads(line)
-                if evt.get('event') != 'telemetry:driver':
-                    continue
-                
-                cars = evt.get('data', {}).get('cars', [])
-                for car in cars:
-                    if car.get('isPlayer'):
-                        speed = car.get('speed', 0) or 0
-                        if speed > 1:
-                            samples.append({
-                                'ts': evt.get('ts', 0),
-                                'speed': speed,
-                                'rpm': car.get('rpm', 0) or 0,
-                                'throttle': car.get('throttle', 0) or 0,
-                                'brake': car.get('brake', 0) or 0,
-                                'steering': car.get('steering', 0) or 0,
-                                'lap': car.get('lap', 0) or 0,
-                                'position': car.get('position', 0) or 0,
-                                'trackPct': car.get('trackPct', 0) or 0,
-                                'fuelLevel': car.get('fuelLevel', 0) or 0,
-                                'lastLapTime': car.get('lastLapTime', 0) or 0,
-                            })
-                        break
-            except:
-                pass
-    
-    return samples
+def telemetry_row(car: CarSample) -> Dict:
+    """Player sample in the layout the IDP computations use"""
+    return {
+        'ts': car.ts,
+        'speed': car.speed,
+        'rpm': car.rpm,
+        'throttle': car.throttle,
+        'brake': car.brake,
+        'steering': car.steering,
+        'lap': car.lap,
+        'position': car.position,
+        'trackPct': car.track_pct,
+        'fuelLevel': car.fuel_level,
+        'lastLapTime': car.last_lap_time,
+    }
 
-def extract_incidents(log_dir: Path, driver_name: str = "Conrad Weeden") -> List[Dict]:
-    """Extract incidents for the driver"""
-    # Try compressed first, then uncompressed
-    incidents_file = log_dir / "incidents.jsonl.gz"
-    if not incidents_file.exists():
-        incidents_file = log_dir / "incidents.jsonl"
-    
-    if not incidents_file.exists():
-        return []
-    
+def flag_period(evt: Event) -> Dict:
+    """Flag state change from a race:event"""
+    # Use event ts (seconds) - same format as telemetry samples
+    return {
+        'ts': evt.ts,
+        'flag': evt.data.get('flagState', 'green'),
+        'lap': evt.data.get('lap', 0),
+    }
+
+def player_incidents(events: List[Event], driver_name: str) -> List[Dict]:
+    """Incidents involving the driver, deduplicated by timestamp"""
     incidents = []
     seen = set()
     
-    with open_jsonl(incidents_file) as f:
-        for line in f:
-            try:
-                evt = json.loads(line)
-                data = evt.get('data', {})
-                drivers = data.get('driverNames', [])
-                
-                if driver_name in drivers:
-                    # Deduplicate by timestamp
-                    ts = data.get('timestamp', 0)
-                    if ts not in seen:
-                        seen.add(ts)
-                        incidents.append({
-                            'ts': ts,
-                            'lap': data.get('lap', 0),
-                            'corner': data.get('cornerName', 'Unknown'),
-                        })
-            except:
-                pass
+    for evt in events:
+        data = evt.data
+        if driver_name in data.get('driverNames', []):
+            ts = data.get('timestamp', 0)
+            if ts not in seen:
+                seen.add(ts)
+                incidents.append({
+                    'ts': ts,
+                    'lap': data.get('lap', 0),
+                    'corner': data.get('cornerName', 'Unknown'),
+                })
     
     return incidents
 
-def get_session_info(log_dir: Path) -> Dict:
-    """Get session metadata"""
-    # Try compressed first, then uncompressed
-    session_file = log_dir / "session.jsonl.gz"
-    if not session_file.exists():
-        session_file = log_dir / "session.jsonl"
-    
-    info = {
-        'trackName': 'Unknown',
-        'sessionType': 'Unknown',
+def normalize_session_info(session: Dict, log_dir: Path) -> Dict:
+    """Session metadata in the layout the summary uses"""
+    return {
+        'trackName': session.get('trackName', 'Unknown'),
+        'sessionType': session.get('sessionType', 'Unknown'),
         'sessionId': log_dir.name,
     }
-    
-    if session_file.exists():
-        with open_jsonl(session_file) as f:
-            for line in f:
-                try:
-                    data = json.loads(line).get('data', {})
-                    if data.get('trackName'):
-                        info['trackName'] = data['trackName']
-                    elif data.get('track'):
-                        info['trackName'] = data['track']
-                    if data.get('sessionType'):
-                        info['sessionType'] = data['sessionType']
-                    elif data.get('session'):
-                        info['sessionType'] = data['session']
-                except:
-                    pass
-    
-    return info
+
+def extract_telemetry(log_dir: Path) -> List[Dict]:
+    """Extract player telemetry from telemetry:driver events"""
+    if not SessionLog(log_dir).exists:
+        print(f"❌ No all_events.jsonl(.gz) in {log_dir}")
+        return []
+    return [telemetry_row(car) for car in cached_cars(log_dir, min_speed=1)]
+
+def extract_incidents(log_dir: Path, driver_name: str = "Conrad Weeden") -> List[Dict]:
+    """Extract incidents for the driver"""
+    return player_incidents(SessionLog(log_dir).incidents(), driver_name)
+
+def get_session_info(log_dir: Path) -> Dict:
+    """Get session metadata"""
+    return normalize_session_info(SessionLog(log_dir).session_info(), log_dir)
 
 def extract_flag_periods(log_dir: Path) -> List[Dict]:
     """Extract flag state changes to identify caution periods"""
-    # Try compressed first, then uncompressed
-    all_events_file = log_dir / "all_events.jsonl.gz"
-    if not all_events_file.exists():
-        all_events_file = log_dir / "all_events.jsonl"
-    flag_periods = []
-    
-    if not all_events_file.exists():
-        return flag_periods
-    
-    with open_jsonl(all_events_file) as f:
-        for line in f:
-            try:
-                evt = json.loads(line)
-                if evt.get('event') == 'race:event':
-                    data = evt.get('data', {})
-                    # Use event ts (seconds) - same format as telemetry samples
-                    flag_periods.append({
-                        'ts': evt.get('ts', 0),  # Already in seconds
-                        'flag': data.get('flagState', 'green'),
-                        'lap': data.get('lap', 0),
-                    })
-            except:
-                pass
-    
-    return flag_periods
+    return [flag_period(evt) for evt in SessionLog(log_dir).events(['race:event'])]
 
 def is_caution_lap(lap_num: int, lap_start_ts: float, lap_end_ts: float, flag_periods: List[Dict]) -> bool:
     """Check if a lap was under caution"""
@@ -249,7 +176,8 @@ def compute_lap_times(samples: List[Dict], flag_periods: List[Dict] = None) -> t
     
     return all_lap_times, clean_lap_times
 
-def compute_post_session_summary(samples: List[Dict], incidents: List[Dict], session_info: Dict, log_dir: Path = None) -> Dict:
+def compute_post_session_summary(samples: List[Dict], incidents: List[Dict], session_info: Dict, log_dir: Path = None,
+                                 flag_periods: Optional[List[Dict]] = None) -> Dict:
     """
     Compute a PostSessionSummary matching the server's expected format.
     This can be sent to the server for IDP processing.
@@ -262,7 +190,8 @@ def compute_post_session_summary(samples: List[Dict], incidents: List[Dict], ses
     session_minutes = duration_seconds / 60
     
     # Extract flag periods for caution detection
-    flag_periods = extract_flag_periods(log_dir) if log_dir else []
+    if flag_periods is None:
+        flag_periods = extract_flag_periods(log_dir) if log_dir else []
     
     # Lap times (now returns all and clean separately)
     all_lap_times, clean_lap_times = compute_lap_times(samples, flag_periods)
@@ -452,6 +381,34 @@ def generate_idp_report(summary: Dict, log_dir: Path) -> str:
     
     return "\n".join(report)
 
+@register('idp')
+class IDPAnalyzer(Analyzer):
+    """PostSessionSummary + IDP report: player samples and flag periods from the same pass"""
+    events = ('race:event',)
+    report_file = "IDP_ANALYSIS.md"
+    
+    def begin(self, ctx: SessionContext):
+        self.samples = []
+        self.flag_periods = []
+        self.player_name = None
+    
+    def feed(self, evt: Event, player: Optional[CarSample]):
+        if player is None:
+            self.flag_periods.append(flag_period(evt))
+        elif player.speed >= 1:
+            self.player_name = self.player_name or player.driver_name
+            self.samples.append(telemetry_row(player))
+    
+    def finish(self, ctx: SessionContext) -> Optional[str]:
+        driver = self.driver or self.player_name or ''
+        incidents = player_incidents(ctx.incidents, driver)
+        session_info = normalize_session_info(ctx.session_info, ctx.log_dir)
+        self.result = compute_post_session_summary(self.samples, incidents, session_info,
+                                                   flag_periods=self.flag_periods)
+        if not self.result:
+            return None
+        return generate_idp_report(self.result, ctx.log_dir)
+
 def main():
     parser = argparse.ArgumentParser(description='Process logged session for IDP analysis')
     parser.add_argument('log_dir', nargs='?', help='Path to race log directory')
@@ -481,31 +438,28 @@ def main():
     
     print(f"Processing: {log_dir}")
     
-    # Extract data
-    print("Extracting telemetry...")
-    samples = extract_telemetry(log_dir)
-    print(f"  Found {len(samples)} samples")
-    
-    print("Extracting incidents...")
-    incidents = extract_incidents(log_dir, args.driver)
-    print(f"  Found {len(incidents)} incidents")
-    
-    session_info = get_session_info(log_dir)
-    print(f"  Track: {session_info['trackName']}")
-    
-    # Compute summary
-    print("Computing IDP summary...")
-    summary = compute_post_session_summary(samples, incidents, session_info, log_dir)
+    # One pass over the log: telemetry, flags, incidents and session info
+    print("Analyzing session...")
+    analyzer = IDPAnalyzer(driver=args.driver)
+    pipeline = SessionPipeline(log_dir, [analyzer])
+    try:
+        report = pipeline.run(write=False)[analyzer.name]
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return
+    summary = analyzer.result
+    print(f"  Read {pipeline.events_read:,} events in {pipeline.seconds:.1f}s")
+    print(f"  Found {len(analyzer.samples)} samples")
     
     if not summary:
         print("❌ Not enough data to generate summary")
         return
+    print(f"  Track: {summary['trackName']}")
+    print(f"  Incidents: {summary['incidentCount']}")
     
     if args.json:
         print(json.dumps(summary, indent=2))
     else:
-        report = generate_idp_report(summary, log_dir)
-        
         if args.output:
             output_file = Path(args.output)
         else:
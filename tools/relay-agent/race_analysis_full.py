@@ -12,88 +12,59 @@ import os
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 
-def load_jsonl_streaming(filepath, max_lines=None):
-    """Stream JSONL file line by line to handle large files"""
-    count = 0
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    yield json.loads(line)
-                    count += 1
-                    if max_lines and count >= max_lines:
-                        break
-                except json.JSONDecodeError:
-                    continue
+from session_cache import cached_cars
+from session_log import CarSample, SessionLog
 
-def find_player_car(cars: List[Dict]) -> Optional[Dict]:
-    """Find the player's car from the car list"""
-    # First try isPlayer flag
-    for car in cars:
-        if car.get('isPlayer'):
-            return car
-    
-    # Fallback: look for car with actual telemetry data (speed > 0, rpm > 0)
-    # In spectator mode, only the spectated car has real telemetry
-    for car in cars:
-        if car.get('speed', 0) > 0 or car.get('rpm', 0) > 0:
-            return car
-    
-    return None
-
-def find_driver_car(cars: List[Dict], driver_name: str) -> Optional[Dict]:
-    """Find a specific driver's car"""
-    for car in cars:
-        if car.get('driverName', '').lower() == driver_name.lower():
-            return car
-    return None
+def timeseries_row(car: CarSample) -> Dict:
+    """Flatten a car sample into a time series row"""
+    return {
+        'timestamp': car.ts,
+        'speed': car.speed,
+        'rpm': car.rpm,
+        'gear': car.gear,
+        'throttle': car.throttle,
+        'brake': car.brake,
+        'steering': car.steering,
+        'lap': car.lap,
+        'position': car.position,
+        'classPosition': car.class_position,
+        'trackPosition': car.track_pct,
+        'fuelLevel': car.fuel_level,
+        'fuelPct': car.fuel_pct,
+        'lastLapTime': car.last_lap_time,
+        'bestLapTime': car.best_lap_time,
+        'incidentCount': car.incident_count,
+        'inPit': car.in_pit,
+        'onPitRoad': car.on_pit_road,
+        'driverName': car.driver_name or 'Unknown',
+        'carName': car.car_name or 'Unknown',
+        'carNumber': car.car_number,
+    }
 
 def extract_telemetry_timeseries(log_dir: Path, driver_name: str = None) -> List[Dict]:
-    """Extract telemetry time series for a driver"""
-    telemetry_file = log_dir / "telemetry.jsonl"
-    if not telemetry_file.exists():
-        return []
-    
-    timeseries = []
-    for entry in load_jsonl_streaming(telemetry_file):
-        data = entry.get('data', entry)
-        cars = data.get('cars', [])
-        
-        if driver_name:
-            car = find_driver_car(cars, driver_name)
-        else:
-            car = find_player_car(cars)
-        
-        if car:
-            timeseries.append({
-                'timestamp': entry.get('ts', 0),
-                'speed': car.get('speed', 0),
-                'rpm': car.get('rpm', 0),
-                'gear': car.get('gear', 0),
-                'throttle': car.get('throttle', 0),
-                'brake': car.get('brake', 0),
-                'steering': car.get('steering', 0),
-                'lap': car.get('lap', 0),
-                'position': car.get('position', 0),
-                'classPosition': car.get('classPosition', 0),
-                'trackPosition': car.get('pos', {}).get('s', 0),
-                'fuelLevel': car.get('fuelLevel', 0),
-                'fuelPct': car.get('fuelPct', 0),
-                'lastLapTime': car.get('lastLapTime', 0),
-                'bestLapTime': car.get('bestLapTime', 0),
-                'incidentCount': car.get('incidentCount', 0),
-                'inPit': car.get('inPit', False),
-                'onPitRoad': car.get('onPitRoad', False),
-                'driverName': car.get('driverName', 'Unknown'),
-                'carName': car.get('carName', 'Unknown'),
-                'carNumber': car.get('carNumber', ''),
-            })
-    
+    """Extract telemetry time series for a driver (default: the player car)"""
+    log = SessionLog(log_dir)
+    timeseries = [timeseries_row(car) for car in cached_cars(log_dir, driver=driver_name)]
+    if timeseries or driver_name:
+        return timeseries
+    
+    # Spectator mode: no isPlayer car, only the spectated car has real telemetry
+    last_ts = None
+    for car in log.cars(all_cars=True):
+        if car.ts != last_ts and (car.speed > 0 or car.rpm > 0):
+            timeseries.append(timeseries_row(car))
+            last_ts = car.ts
     return timeseries
 
+def extract_driver_timeseries(log_dir: Path, drivers: List[str]) -> Dict[str, List[Dict]]:
+    """Time series for several drivers in one pass over the log"""
+    series = {name.lower(): [] for name in drivers}
+    for car in SessionLog(log_dir).cars(drivers=drivers):
+        series[car.driver_name.lower()].append(timeseries_row(car))
+    return {name: series[name.lower()] for name in drivers}
+
 def analyze_laps(timeseries: List[Dict]) -> List[Dict]:
     """Analyze lap-by-lap performance"""
     if not timeseries:
@@ -169,16 +140,12 @@ def analyze_laps(timeseries: List[Dict]) -> List[Dict]:
 
 def analyze_incidents_detailed(log_dir: Path) -> List[Dict]:
     """Detailed incident analysis with timeline"""
-    incidents_file = log_dir / "incidents.jsonl"
-    if not incidents_file.exists():
-        return []
-    
     incidents = []
-    for entry in load_jsonl_streaming(incidents_file):
-        data = entry.get('data', entry)
+    for evt in SessionLog(log_dir).incidents():
+        data = evt.data
         incidents.append({
-            'timestamp': entry.get('ts', 0),
-            'time_str': datetime.fromtimestamp(entry.get('ts', 0)).strftime('%H:%M:%S'),
+            'timestamp': evt.ts,
+            'time_str': datetime.fromtimestamp(evt.ts).strftime('%H:%M:%S'),
             'drivers': ', '.join(data.get('driverNames', ['Unknown'])),
             'cars': ', '.join(data.get('carNames', ['Unknown'])),
             'corner': data.get('cornerName', 'Unknown'),
@@ -191,19 +158,7 @@ def analyze_incidents_detailed(log_dir: Path) -> List[Dict]:
 
 def get_all_drivers(log_dir: Path) -> List[str]:
     """Get list of all drivers in the session"""
-    telemetry_file = log_dir / "telemetry.jsonl"
-    if not telemetry_file.exists():
-        return []
-    
-    drivers = set()
-    for entry in load_jsonl_streaming(telemetry_file, max_lines=10):
-        data = entry.get('data', entry)
-        for car in data.get('cars', []):
-            name = car.get('driverName')
-            if name:
-                drivers.add(name)
-    
-    return sorted(drivers)
+    return sorted(SessionLog(log_dir).drivers(limit=10))
 
 def export_to_csv(log_dir: Path, output_dir: Path = None):
     """Export all race data to CSV files"""
@@ -224,36 +179,32 @@ def export_to_csv(log_dir: Path, output_dir: Path = None):
         print(f"   ✅ incidents.csv ({len(incidents)} rows)")
     
     # 2. Export standings/positions over time
-    telemetry_file = log_dir / "telemetry.jsonl"
-    if telemetry_file.exists():
+    log = SessionLog(log_dir)
+    if log.exists:
         positions_csv = output_dir / "positions.csv"
         with open(positions_csv, 'w', newline='', encoding='utf-8') as f:
             writer = None
             row_count = 0
             
-            for entry in load_jsonl_streaming(telemetry_file, max_lines=500):  # Sample
-                data = entry.get('data', entry)
-                ts = entry.get('ts', 0)
+            for car in log.cars(all_cars=True, limit=500):  # Sample
+                row = {
+                    'timestamp': car.ts,
+                    'driver': car.driver_name or 'Unknown',
+                    'car_number': car.car_number,
+                    'position': car.position,
+                    'class_position': car.class_position,
+                    'lap': car.lap,
+                    'track_pct': car.track_pct,
+                    'in_pit': car.in_pit,
+                    'speed': car.speed,
+                }
+                
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=row.keys())
+                    writer.writeheader()
                 
-                for car in data.get('cars', []):
-                    row = {
-                        'timestamp': ts,
-                        'driver': car.get('driverName', 'Unknown'),
-                        'car_number': car.get('carNumber', ''),
-                        'position': car.get('position', 0),
-                        'class_position': car.get('classPosition', 0),
-                        'lap': car.get('lap', 0),
-                        'track_pct': car.get('pos', {}).get('s', 0),
-                        'in_pit': car.get('inPit', False),
-                        'speed': car.get('speed', 0),
-                    }
-                    
-                    if writer is None:
-                        writer = csv.DictWriter(f, fieldnames=row.keys())
-                        writer.writeheader()
-                    
-                    writer.writerow(row)
-                    row_count += 1
+                writer.writerow(row)
+                row_count += 1
         
         print(f"   ✅ positions.csv ({row_count} rows)")
     
@@ -263,8 +214,7 @@ def export_to_csv(log_dir: Path, output_dir: Path = None):
         laps_csv = output_dir / "lap_times.csv"
         all_laps = []
         
-        for driver in drivers[:5]:  # Limit to first 5 drivers for speed
-            timeseries = extract_telemetry_timeseries(log_dir, driver)
+        for driver, timeseries in extract_driver_timeseries(log_dir, drivers[:5]).items():  # First 5 drivers
             laps = analyze_laps(timeseries)
             for lap in laps:
                 lap['driver'] = driver
@@ -424,9 +374,7 @@ def main():
     # Sort by file size to find the most complete session
     sessions_with_size = []
     for s in sessions:
-        all_events = s / "all_events.jsonl"
-        size = all_events.stat().st_size if all_events.exists() else 0
-        sessions_with_size.append((s, size))
+        sessions_with_size.append((s, SessionLog(s).size))
     
     sessions_with_size.sort(key=lambda x: -x[1])
     
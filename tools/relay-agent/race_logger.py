@@ -2,263 +2,349 @@
 """
 Race Data Logger - Captures ALL telemetry data from a live race session
 Saves to timestamped JSON files for later analysis
+
+all_events.jsonl.gz is the one canonical record of the session. The
+per-type files older tools read (telemetry, player_telemetry, strategy,
+standings) are views derived from it on demand:
+
+    python race_logger.py --derive race_logs/<session> [player_telemetry ...]
+
+Only the tiny incidents.jsonl / session.jsonl are still written live, so
+they can be read directly while a race is running.
+
+Socket.IO handlers only append to an in-memory batch. JSON encoding,
+gzip compression and disk writes happen on a background writer thread
+fed through a bounded queue; if the disk falls behind, batches keep
+accumulating in memory instead of stalling event receipt or being dropped.
+
+The event log is a seekable block archive (see session_archive.py): small
+indexed gzip blocks plus a footer index written on close, so readers can
+jump to a lap or time range without decompressing the whole race.
 """
 
 import socketio
+import argparse
 import json
 import gzip
 import os
+import queue
 from datetime import datetime
 from pathlib import Path
 import threading
 import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from session_archive import ArchiveReader, ArchiveWriter
+from session_log import track_pct
 
 # Configuration
 SERVER_URL = "http://localhost:3001"
 LOG_DIR = Path(__file__).parent / "race_logs"
 
+FLUSH_SECONDS = 30
+FLUSH_EVENTS = 1000
+WRITE_QUEUE_BATCHES = 8     # batches handed to the writer before the logger starts coalescing
+
+
+# ═══════════════════════════════════════
+# Derived views
+# ═══════════════════════════════════════
+
+def player_sample(ts: float, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Player telemetry row from a telemetry:driver event (moving samples only)"""
+    for car in data.get('cars', []):
+        if car.get('isPlayer'):
+            speed = car.get('speed', 0) or 0
+            if speed <= 1:
+                return None
+            return {
+                'ts': ts,
+                'speed': speed,
+                'speed_mph': speed * 2.237,
+                'rpm': car.get('rpm', 0) or 0,
+                'gear': car.get('gear', 0) or 0,
+                'throttle': car.get('throttle', 0) or 0,
+                'brake': car.get('brake', 0) or 0,
+                'steering': car.get('steering', 0) or 0,
+                'lap': car.get('lap', 0) or 0,
+                'position': car.get('position', 0) or 0,
+                'trackPct': track_pct(car),
+                'fuelLevel': car.get('fuelLevel', 0) or 0,
+                'fuelPct': car.get('fuelPct', 0) or 0,
+                'inPit': car.get('inPit', False),
+                'lastLapTime': car.get('lastLapTime', 0) or 0,
+                'bestLapTime': car.get('bestLapTime', 0) or 0,
+            }
+    return None
+
+
+def _player_update_sample(ts: float, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Player telemetry row from a telemetry_update event"""
+    return {
+        'ts': ts,
+        'speed': data.get('speed', 0),
+        'rpm': data.get('rpm', 0),
+        'gear': data.get('gear', 0),
+        'throttle': data.get('throttle', 0),
+        'brake': data.get('brake', 0),
+        'lap': data.get('lap', 0),
+        'position': data.get('position', 0),
+        'trackPosition': data.get('trackPosition', 0),
+        'fuel': (data.get('fuel') or {}).get('level', 0),
+        'lastLapTime': data.get('lastLapTime', 0),
+        'bestLapTime': data.get('bestLapTime', 0),
+    }
+
+
+def _player_view(evt: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if evt['event'] == 'telemetry:driver':
+        return player_sample(evt['ts'], evt.get('data') or {})
+    return _player_update_sample(evt['ts'], evt.get('data') or {})
+
+
+# view name -> (file name, events, row builder)
+VIEWS: Dict[str, tuple] = {
+    'telemetry': (
+        'telemetry.jsonl.gz', ('telemetry_update', 'telemetry:driver'),
+        lambda evt: ({'ts': evt['ts'], 'data': evt['data']} if evt['event'] == 'telemetry_update'
+                     else {'ts': evt['ts'], 'event': evt['event'], 'data': evt['data']}),
+    ),
+    'player_telemetry': ('player_telemetry.jsonl.gz', ('telemetry_update', 'telemetry:driver'), _player_view),
+    'strategy': ('strategy.jsonl.gz', ('car:status',), lambda evt: {'ts': evt['ts'], 'data': evt['data']}),
+    'standings': ('standings.jsonl.gz', ('standings',), lambda evt: {'ts': evt['ts'], 'data': evt['data']}),
+}
+
+# Small views still written live (read directly during a race)
+LIVE_VIEWS: Dict[str, tuple] = {
+    'incident:new': ('incidents.jsonl', lambda evt: {'ts': evt['ts'], 'data': evt['data']}),
+    'session:active': ('session.jsonl', lambda evt: {'ts': evt['ts'], 'event': evt['event'], 'data': evt['data']}),
+    'session_info': ('session.jsonl', lambda evt: {'ts': evt['ts'], 'event': evt['event'], 'data': evt['data']}),
+}
+
+
+def iter_events(log_dir: Path, events: Optional[Iterable[str]] = None):
+    """Stream the canonical event log, optionally only some event types"""
+    path = log_dir / "all_events.jsonl.gz"
+    if path.exists():
+        with ArchiveReader(path) as archive:
+            yield from archive.iter_events(events)
+        return
+    path = log_dir / "all_events.jsonl"
+    wanted = set(events) if events else None
+    tags = [f'"{e}"'.encode() for e in wanted] if wanted else None
+    with open(path, 'rb') as f:
+        for line in f:
+            if tags and not any(tag in line for tag in tags):
+                continue
+            try:
+                evt = json.loads(line)
+            except ValueError:
+                continue
+            if wanted is None or evt.get('event') in wanted:
+                yield evt
+
+
+def derive_view(log_dir: Path, name: str, force: bool = False) -> Path:
+    """Materialize a per-type view file from all_events (cached on disk). Returns its path."""
+    filename, events, build = VIEWS[name]
+    path = log_dir / filename
+    if path.exists() and not force:
+        return path
+    tmp = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        for evt in iter_events(log_dir, events):
+            row = build(evt)
+            if row is not None:
+                f.write(json.dumps(row, separators=(',', ':')) + '\n')
+    os.replace(tmp, path)
+    return path
+
+
+# ═══════════════════════════════════════
+# Background writer
+# ═══════════════════════════════════════
+
+class LogWriter:
+    """Writer thread: encodes and appends event batches off the Socket.IO thread"""
+
+    def __init__(self, log_dir: Path, max_batches: int = WRITE_QUEUE_BATCHES):
+        self.log_dir = log_dir
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_batches)
+        self.thread = threading.Thread(target=self._run, daemon=True, name='RaceLogWriter')
+        self.archive: Optional[ArchiveWriter] = None
+        self.events_written = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.errors = 0
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, events: List[Dict[str, Any]], stats: Dict[str, Any]) -> bool:
+        """Hand a batch over without blocking. False if the queue is full."""
+        try:
+            self.queue.put_nowait((events, stats))
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self, timeout: float = 30.0):
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._close_archive()
+                return
+            events, stats = item
+            start = time.time()
+            try:
+                self._write(events, stats)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Log write failed ({len(events)} events): {e}")
+            self.write_seconds += time.time() - start
+
+    def _close_archive(self):
+        """Write the archive footer index"""
+        if self.archive is not None:
+            try:
+                self.archive.close()
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Log index write failed: {e}")
+            self.archive = None
+
+    def _write(self, events: List[Dict[str, Any]], stats: Dict[str, Any]):
+        if self.archive is None:
+            self.archive = ArchiveWriter(self.log_dir / "all_events.jsonl.gz")
+        self.bytes_written += self.archive.write_events(events)
+        self.events_written += len(events)
+
+        live: Dict[str, List[str]] = {}
+        for evt in events:
+            view = LIVE_VIEWS.get(evt['event'])
+            if view:
+                filename, build = view
+                live.setdefault(filename, []).append(json.dumps(build(evt)))
+        for filename, rows in live.items():
+            with open(self.log_dir / filename, 'a') as f:
+                f.write('\n'.join(rows) + '\n')
+
+        with open(self.log_dir / "stats.json", 'w') as f:
+            json.dump(stats, f, indent=2)
+
+
 class RaceLogger:
     def __init__(self):
         self.sio = socketio.Client()
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_dir = LOG_DIR / self.session_id
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Data buffers
-        self.telemetry_buffer = []
-        self.player_telemetry_buffer = []  # Player-specific telemetry for analysis
-        self.standings_buffer = []
-        self.strategy_buffer = []
-        self.incidents_buffer = []
-        self.session_info = []
-        self.all_events = []  # Raw log of everything
-        
+
+        # Canonical event batch (handed to the writer on flush)
+        self.all_events = []
+        self._lock = threading.Lock()
+        self.writer = LogWriter(self.log_dir)
+        self.writer.start()
+
         # Stats
         self.event_counts = {}
         self.start_time = time.time()
         self.last_flush = time.time()
-        
+        self.deferred_flushes = 0
+        self._writer_behind = False
+
         self._setup_handlers()
-        
+
     def _setup_handlers(self):
         @self.sio.event
         def connect():
             print(f"✅ Logger connected to {SERVER_URL}")
             print(f"📁 Logging to: {self.log_dir}")
             self.sio.emit('dashboard:join', {'type': 'logger'})
-            
+
         @self.sio.event
         def disconnect():
             print("❌ Logger disconnected")
             self._flush_all()
-            
+
         # Catch ALL events
         @self.sio.on('*')
         def catch_all(event, data):
             self._log_event(event, data)
-            
-        # Specific handlers for known events
-        @self.sio.on('telemetry_update')
-        def on_telemetry(data):
-            self._log_event('telemetry_update', data)
-            # Extract player-specific data for easier analysis
-            player_data = {
-                'ts': time.time(),
-                'speed': data.get('speed', 0),
-                'rpm': data.get('rpm', 0),
-                'gear': data.get('gear', 0),
-                'throttle': data.get('throttle', 0),
-                'brake': data.get('brake', 0),
-                'lap': data.get('lap', 0),
-                'position': data.get('position', 0),
-                'trackPosition': data.get('trackPosition', 0),
-                'fuel': data.get('fuel', {}).get('level', 0),
-                'lastLapTime': data.get('lastLapTime', 0),
-                'bestLapTime': data.get('bestLapTime', 0),
-            }
-            self.player_telemetry_buffer.append(player_data)
-            self.telemetry_buffer.append({'ts': time.time(), 'data': data})
-            
-        @self.sio.on('telemetry:driver')
-        def on_telemetry_driver(data):
-            self._log_event('telemetry:driver', data)
-            self.telemetry_buffer.append({
-                'ts': time.time(),
-                'event': 'telemetry:driver',
-                'data': data
-            })
-            # Extract player telemetry from telemetry:driver (this has actual data!)
-            cars = data.get('cars', [])
-            for car in cars:
-                if car.get('isPlayer'):
-                    speed = car.get('speed', 0) or 0
-                    if speed > 1:  # Only log moving samples
-                        player_data = {
-                            'ts': time.time(),
-                            'speed': speed,
-                            'speed_mph': speed * 2.237,
-                            'rpm': car.get('rpm', 0) or 0,
-                            'gear': car.get('gear', 0) or 0,
-                            'throttle': car.get('throttle', 0) or 0,
-                            'brake': car.get('brake', 0) or 0,
-                            'steering': car.get('steering', 0) or 0,
-                            'lap': car.get('lap', 0) or 0,
-                            'position': car.get('position', 0) or 0,
-                            'trackPct': car.get('trackPct', 0) or car.get('lapDistPct', 0) or 0,
-                            'fuelLevel': car.get('fuelLevel', 0) or 0,
-                            'fuelPct': car.get('fuelPct', 0) or 0,
-                            'inPit': car.get('inPit', False),
-                            'lastLapTime': car.get('lastLapTime', 0) or 0,
-                            'bestLapTime': car.get('bestLapTime', 0) or 0,
-                        }
-                        self.player_telemetry_buffer.append(player_data)
-                    break
-            
-        @self.sio.on('car:status')
-        def on_car_status(data):
-            self._log_event('car:status', data)
-            self.strategy_buffer.append({
-                'ts': time.time(),
-                'data': data
-            })
-            
+
         @self.sio.on('session:active')
         def on_session_active(data):
             self._log_event('session:active', data)
-            self.session_info.append({
-                'ts': time.time(),
-                'event': 'session:active',
-                'data': data
-            })
             print(f"📋 Session: {data.get('trackName', 'Unknown')} [{data.get('sessionType', 'Unknown')}]")
-            
-        @self.sio.on('session_info')
-        def on_session_info(data):
-            self._log_event('session_info', data)
-            self.session_info.append({
-                'ts': time.time(),
-                'event': 'session_info',
-                'data': data
-            })
-            
-        @self.sio.on('standings')
-        def on_standings(data):
-            self._log_event('standings', data)
-            self.standings_buffer.append({
-                'ts': time.time(),
-                'data': data
-            })
-            
+
         @self.sio.on('incident:new')
         def on_incident(data):
             self._log_event('incident:new', data)
-            self.incidents_buffer.append({
-                'ts': time.time(),
-                'data': data
-            })
             print(f"⚠️ Incident logged: {data}")
-            
-        @self.sio.on('engineer:update')
-        def on_engineer(data):
-            self._log_event('engineer:update', data)
-            
-        @self.sio.on('race:intelligence')
-        def on_intelligence(data):
-            self._log_event('race:intelligence', data)
-            
-        @self.sio.on('spotter:callout')
-        def on_spotter(data):
-            self._log_event('spotter:callout', data)
-            
-        @self.sio.on('behavioral:update')
-        def on_behavioral(data):
-            self._log_event('behavioral:update', data)
-            
+
     def _log_event(self, event: str, data):
-        """Log any event to the all_events buffer"""
-        self.event_counts[event] = self.event_counts.get(event, 0) + 1
-        self.all_events.append({
-            'ts': time.time(),
-            'event': event,
-            'data': data
-        })
-        
+        """Log any event to the all_events batch"""
+        now = time.time()
+        with self._lock:
+            self.event_counts[event] = self.event_counts.get(event, 0) + 1
+            self.all_events.append({
+                'ts': now,
+                'event': event,
+                'data': data
+            })
+            if self._writer_behind:
+                # Retry the handoff once a second instead of on every event
+                due = now - self.last_flush > 1
+            else:
+                due = now - self.last_flush > FLUSH_SECONDS or len(self.all_events) > FLUSH_EVENTS
+
         # Auto-flush every 30 seconds or 1000 events
-        if time.time() - self.last_flush > 30 or len(self.all_events) > 1000:
+        if due:
             self._flush_all()
-            
-    def _write_jsonl_gz(self, filepath: Path, items: list):
-        """Write items to a gzip-compressed JSONL file (append mode)"""
-        # For gzip append, we need to handle it specially
-        # gzip.open with 'ab' mode works for appending
-        with gzip.open(filepath, 'at', encoding='utf-8') as f:
-            for item in items:
-                f.write(json.dumps(item, separators=(',', ':')) + '\n')
-    
+
     def _flush_all(self):
-        """Write all buffers to disk (gzip compressed)"""
-        self.last_flush = time.time()
-        elapsed = time.time() - self.start_time
-        
-        # Write all events (compressed)
-        if self.all_events:
-            all_file = self.log_dir / "all_events.jsonl.gz"
-            self._write_jsonl_gz(all_file, self.all_events)
+        """Hand the current batch to the writer thread (never blocks on disk)"""
+        with self._lock:
+            self.last_flush = time.time()
+            if not self.all_events:
+                return
+            batch = self.all_events
+            stats = self._stats()
+            if not self.writer.submit(batch, stats):
+                # Writer is behind: keep the batch and retry on the next flush
+                self.deferred_flushes += 1
+                self._writer_behind = True
+                return
             self.all_events = []
-            
-        # Write telemetry (compressed)
-        if self.telemetry_buffer:
-            telem_file = self.log_dir / "telemetry.jsonl.gz"
-            self._write_jsonl_gz(telem_file, self.telemetry_buffer)
-            self.telemetry_buffer = []
-        
-        # Write player telemetry (compressed)
-        if self.player_telemetry_buffer:
-            player_file = self.log_dir / "player_telemetry.jsonl.gz"
-            self._write_jsonl_gz(player_file, self.player_telemetry_buffer)
-            self.player_telemetry_buffer = []
-            
-        # Write strategy/car status (compressed)
-        if self.strategy_buffer:
-            strat_file = self.log_dir / "strategy.jsonl.gz"
-            self._write_jsonl_gz(strat_file, self.strategy_buffer)
-            self.strategy_buffer = []
-            
-        # Write standings (compressed)
-        if self.standings_buffer:
-            stand_file = self.log_dir / "standings.jsonl.gz"
-            self._write_jsonl_gz(stand_file, self.standings_buffer)
-            self.standings_buffer = []
-            
-        # Write incidents (not compressed - small file, useful to read directly)
-        if self.incidents_buffer:
-            inc_file = self.log_dir / "incidents.jsonl"
-            with open(inc_file, 'a') as f:
-                for item in self.incidents_buffer:
-                    f.write(json.dumps(item) + '\n')
-            self.incidents_buffer = []
-            
-        # Write session info (not compressed - small file)
-        if self.session_info:
-            sess_file = self.log_dir / "session.jsonl"
-            with open(sess_file, 'a') as f:
-                for item in self.session_info:
-                    f.write(json.dumps(item) + '\n')
-            self.session_info = []
-            
-        # Write stats summary
-        stats = {
+            self._writer_behind = False
+
+        total_events = sum(stats['event_counts'].values())
+        print(f"💾 Flushed | {total_events} total events | {stats['elapsed_seconds']:.0f}s elapsed | "
+              f"Events: {dict(list(stats['event_counts'].items())[:5])}...")
+
+    def _stats(self) -> Dict[str, Any]:
+        return {
             'session_id': self.session_id,
-            'elapsed_seconds': elapsed,
-            'event_counts': self.event_counts,
+            'elapsed_seconds': time.time() - self.start_time,
+            'event_counts': dict(self.event_counts),
+            'write_backlog_batches': self.writer.queue.qsize(),
+            'deferred_flushes': self.deferred_flushes,
             'last_update': datetime.now().isoformat()
         }
-        with open(self.log_dir / "stats.json", 'w') as f:
-            json.dump(stats, f, indent=2)
-            
-        total_events = sum(self.event_counts.values())
-        print(f"💾 Flushed | {total_events} total events | {elapsed:.0f}s elapsed | Events: {dict(list(self.event_counts.items())[:5])}...")
-        
+
+    def close(self):
+        """Write everything still buffered and stop the writer"""
+        with self._lock:
+            batch, self.all_events = self.all_events, []
+            stats = self._stats()
+        if batch:
+            self.writer.queue.put((batch, stats))
+        self.writer.stop()
+
     def connect(self):
         try:
             self.sio.connect(SERVER_URL, transports=['websocket'], auth={'relayId': 'race-logger'})
@@ -266,16 +352,17 @@ class RaceLogger:
         except Exception as e:
             print(f"❌ Connection failed: {e}")
             return False
-            
+
     def run(self):
         """Run the logger until interrupted"""
         if not self.connect():
+            self.close()
             return
-            
+
         print("\n" + "="*60)
         print("🏁 RACE LOGGER ACTIVE - Press Ctrl+C to stop")
         print("="*60 + "\n")
-        
+
         try:
             while True:
                 time.sleep(1)
@@ -284,17 +371,39 @@ class RaceLogger:
                     elapsed = time.time() - self.start_time
                     total = sum(self.event_counts.values())
                     rate = total / elapsed if elapsed > 0 else 0
-                    print(f"📊 {total} events | {rate:.1f}/sec | Running {elapsed:.0f}s")
+                    print(f"📊 {total} events | {rate:.1f}/sec | Running {elapsed:.0f}s | "
+                          f"write backlog {self.writer.queue.qsize()}")
         except KeyboardInterrupt:
             print("\n\n🛑 Stopping logger...")
-            self._flush_all()
             self.sio.disconnect()
-            
+        self.close()
+
         print(f"\n✅ Race data saved to: {self.log_dir}")
         print(f"   Total events: {sum(self.event_counts.values())}")
         print(f"   Event breakdown: {json.dumps(self.event_counts, indent=2)}")
 
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description='Log every relay event for later analysis')
+    parser.add_argument('--derive', metavar='SESSION_DIR',
+                        help='Build per-type view files from a session\'s all_events log and exit')
+    parser.add_argument('views', nargs='*',
+                        help=f'Views to derive (default: all of {", ".join(VIEWS)})')
+    parser.add_argument('--force', action='store_true', help='Rebuild views that already exist')
+    args = parser.parse_args()
+
+    if args.derive:
+        log_dir = Path(args.derive)
+        for name in args.views or VIEWS:
+            if name not in VIEWS:
+                parser.error(f"Unknown view {name} (choose from {', '.join(VIEWS)})")
+            path = derive_view(log_dir, name, force=args.force)
+            print(f"  ✓ {path.name}: {path.stat().st_size / 1024:.1f}KB")
+        return
+
     logger = RaceLogger()
     logger.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+OBB Replay Intelligence — Batch Clip Re-categorization
+
+Re-runs the clip categorizer over an existing clip library, so improved
+heuristics apply to clips that were already recorded.
+
+For every clip in the directory a worker process loads the telemetry
+sidecar (columnar `.obbt` if present, else `_telemetry.json`), re-runs
+categorize_clip from the original trigger type/label, and writes the new
+metadata JSON to a temp file. The main process then applies a batch of
+results to the clip index in one transaction and atomically renames the
+temp files over the metadata JSON.
+
+Incremental: clips whose metadata already records the current
+CATEGORIZER_VERSION are skipped. A crash between the index commit and the
+rename leaves the JSON on the old version, so the next run simply redoes
+that clip.
+
+Usage:
+    python recategorize_clips.py                       # CLIP_OUTPUT_DIR or ~/Ok-Box-Box/clips
+    python recategorize_clips.py --clip-dir D:/clips --workers 8
+    python recategorize_clips.py --force --dry-run     # show what would change
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from clip_categorizer import (
+    CATEGORIZER_VERSION,
+    NUMPY_AVAILABLE,
+    SIDECAR_CHANNELS,
+    categorize_clip,
+    columns_from_sidecar,
+)
+from clip_library import ClipLibrary, sidecar_paths
+from telemetry_sidecar import SidecarReader
+
+BATCH_SIZE = 256        # results per index transaction
+TMP_SUFFIX = '.recat.tmp'
+
+
+# ═══════════════════════════════════════
+# Worker (runs in the process pool)
+# ═══════════════════════════════════════
+
+def load_sidecar_channels(paths: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Categorizer channels from the clip's telemetry sidecar, or None if it has none."""
+    columnar = paths['telemetry_columnar']
+    if os.path.exists(columnar):
+        reader = SidecarReader.open(columnar)
+        return {key: reader.channel(key) for key in SIDECAR_CHANNELS if key in reader.channels}
+    if os.path.exists(paths['telemetry']):
+        with open(paths['telemetry']) as f:
+            records = json.load(f)
+        return {key: [r.get(key) or 0 for r in records] for key in SIDECAR_CHANNELS}
+    return None
+
+
+def _samples_from_channels(channels: Dict[str, Any]) -> List[SimpleNamespace]:
+    """Sample objects for the reference categorizer (no NumPy)."""
+    count = len(next(iter(channels.values()), ()))
+    return [
+        SimpleNamespace(**{name: channels[key][i] if key in channels else 0
+                           for key, name in SIDECAR_CHANNELS.items()})
+        for i in range(count)
+    ]
+
+
+def recategorize_one(video_path: str, force: bool = False, dry_run: bool = False) -> Tuple[str, str, Optional[dict]]:
+    """
+    Re-categorize one clip. Returns (clip_id, status, metadata) where status
+    is 'current', 'no_metadata', 'no_telemetry', 'unchanged', 'changed' or
+    'error: ...'. For unchanged/changed clips (and not a dry run) the new
+    metadata has been written to <metadata>.recat.tmp for the caller to commit.
+    """
+    paths = sidecar_paths(video_path)
+    clip_id = os.path.basename(video_path)[:-len('.mp4')]
+    try:
+        with open(paths['metadata']) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return clip_id, 'no_metadata', None
+    clip_id = metadata.get('clip_id') or clip_id
+
+    if not force and metadata.get('categorizer_version') == CATEGORIZER_VERSION:
+        return clip_id, 'current', None
+
+    try:
+        channels = load_sidecar_channels(paths)
+        if not channels:
+            return clip_id, 'no_telemetry', None
+
+        # Older clips did not record the trigger; their event_type is the best we have
+        trigger_type = metadata.get('trigger_type') or metadata.get('event_type') or 'unknown'
+        trigger_label = metadata.get('trigger_label') or metadata.get('event_label') or ''
+        samples = columns_from_sidecar(channels) if NUMPY_AVAILABLE else _samples_from_channels(channels)
+        category = categorize_clip(samples, event_type=trigger_type, event_label=trigger_label)
+
+        changed = (
+            category.primary != metadata.get('event_type')
+            or category.label != metadata.get('event_label')
+            or list(category.tags) != list(metadata.get('tags') or [])
+        )
+        metadata.update({
+            'event_type': category.primary,
+            'event_label': category.label,
+            'tags': list(category.tags),
+            'trigger_type': trigger_type,
+            'trigger_label': trigger_label,
+            'categorizer_version': CATEGORIZER_VERSION,
+        })
+        if not dry_run:
+            with open(paths['metadata'] + TMP_SUFFIX, 'w') as f:
+                json.dump(metadata, f, indent=2)
+        return clip_id, 'changed' if changed else 'unchanged', metadata
+    except Exception as e:
+        return clip_id, f'error: {e}', None
+
+
+# ═══════════════════════════════════════
+# Driver
+# ═══════════════════════════════════════
+
+def commit_batch(library: ClipLibrary, batch: List[Tuple[str, str, dict]]) -> int:
+    """
+    Index first (one transaction), then rename each temp JSON into place.
+    If the index update fails nothing is renamed. Returns clips committed.
+    """
+    entries = {clip_id: (video_path, metadata) for clip_id, video_path, metadata in batch}
+    try:
+        missing = set(library.update_clips([(clip_id, metadata) for clip_id, _, metadata in batch]))
+    except Exception:
+        for _, video_path, _ in batch:
+            _discard_tmp(video_path)
+        raise
+    for clip_id, video_path, _ in batch:
+        meta_path = sidecar_paths(video_path)['metadata']
+        os.replace(meta_path + TMP_SUFFIX, meta_path)
+    # Clips the index has never seen: add them with their new metadata
+    for clip_id in missing:
+        video_path, metadata = entries[clip_id]
+        library.add_clip(metadata, video_path, created_at=os.path.getmtime(video_path))
+    return len(batch)
+
+
+def _discard_tmp(video_path: str):
+    try:
+        os.remove(sidecar_paths(video_path)['metadata'] + TMP_SUFFIX)
+    except OSError:
+        pass
+
+
+def main():
+    default_dir = ''
+    try:
+        import config
+        default_dir = config.CLIP_OUTPUT_DIR
+    except ImportError:
+        pass
+    default_dir = default_dir or str(Path.home() / 'Ok-Box-Box' / 'clips')
+
+    parser = argparse.ArgumentParser(description='Re-run the clip categorizer over a clip library')
+    parser.add_argument('--clip-dir', default=default_dir, help=f'Clip directory (default: {default_dir})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--force', action='store_true', help='Re-categorize clips already on the current version')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing anything')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every changed clip')
+    args = parser.parse_args()
+
+    clip_dir = Path(args.clip_dir)
+    if not clip_dir.is_dir():
+        print(f"Clip directory not found: {clip_dir}")
+        sys.exit(1)
+
+    videos = sorted(str(p) for p in clip_dir.glob('*.mp4'))
+    print(f"🏷️ Re-categorizing {len(videos)} clips in {clip_dir} "
+          f"(categorizer v{CATEGORIZER_VERSION}, {args.workers} workers"
+          f"{', dry run' if args.dry_run else ''})")
+
+    library = None if args.dry_run else ClipLibrary(str(clip_dir))
+    counts: Dict[str, int] = {}
+    batch: List[Tuple[str, str, dict]] = []
+    committed = 0
+    start = time.time()
+
+    chunksize = max(1, min(64, len(videos) // (args.workers * 4) or 1))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(
+            recategorize_one, videos,
+            [args.force] * len(videos), [args.dry_run] * len(videos),
+            chunksize=chunksize,
+        )
+        for video_path, (clip_id, status, metadata) in zip(videos, results):
+            key = 'error' if status.startswith('error') else status
+            counts[key] = counts.get(key, 0) + 1
+            if key == 'error':
+                print(f"  ✗ {clip_id}: {status[len('error: '):]}")
+            elif key == 'changed' and args.verbose:
+                print(f"  ✓ {clip_id}: {metadata['event_type']} — {metadata['event_label']} {metadata['tags']}")
+
+            if metadata is not None and library is not None:
+                batch.append((clip_id, video_path, metadata))
+                if len(batch) >= BATCH_SIZE:
+                    committed += commit_batch(library, batch)
+                    batch = []
+        if batch and library is not None:
+            committed += commit_batch(library, batch)
+
+    if library is not None:
+        library.close()
+
+    elapsed = time.time() - start
+    summary = ', '.join(f"{k}: {v}" for k, v in sorted(counts.items()))
+    print(f"Done in {elapsed:.1f}s — {summary or 'no clips'}"
+          f"{f'; {committed} written' if library is not None else ''}")
+    sys.exit(1 if counts.get('error') else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,85 +6,24 @@ This allows processing historical sessions that were captured without a live ser
 """
 import socketio
 import json
-import gzip
 import argparse
 import time
 from pathlib import Path
-from typing import Optional, Generator, Dict, Any
+from typing import Optional, Dict, Any
+
+from session_log import SessionLog
 
 DEFAULT_SERVER_URL = "http://localhost:3001"
 LOG_DIR = Path(__file__).parent / "race_logs"
 
-def open_jsonl(filepath: Path):
-    """Open a JSONL file, handling both compressed and uncompressed formats"""
-    if filepath.suffix == '.gz':
-        return gzip.open(filepath, 'rt', encoding='utf-8', errors='ignore')
-    else:
-        return open(filepath, 'r', errors='ignore')
-
-def get_events_file(log_dir: Path) -> Optional[Path]:
-    """Find the all_events file (compressed or uncompressed)"""
-    gz_path = log_dir / "all_events.jsonl.gz"
-    if gz_path.exists():
-        return gz_path
-    plain_path = log_dir / "all_events.jsonl"
-    if plain_path.exists():
-        return plain_path
-    return None
-
-def stream_events(log_dir: Path) -> Generator[Dict[str, Any], None, None]:
-    """Stream events from log file in timestamp order"""
-    events_file = get_events_file(log_dir)
-    if not events_file:
-        raise FileNotFoundError(f"No all_events.jsonl(.gz) found in {log_dir}")
-    
-    with open_jsonl(events_file) as f:
-        for line in f:
-            try:
-                evt = json.loads(line)
-                yield evt
-            except json.JSONDecodeError:
-                continue
-
 def get_session_info(log_dir: Path) -> Dict[str, Any]:
     """Get session metadata"""
-    session_file = log_dir / "session.jsonl"
-    if not session_file.exists():
-        session_file = log_dir / "session.jsonl.gz"
-    
-    info = {
-        'sessionId': log_dir.name,
-        'trackName': 'Unknown',
-        'sessionType': 'Unknown',
+    session = SessionLog(log_dir).session_info()
+    return {
+        'sessionId': session.get('sessionId') or log_dir.name,
+        'trackName': session.get('trackName', 'Unknown'),
+        'sessionType': session.get('sessionType', 'Unknown'),
     }
-    
-    if session_file.exists():
-        with open_jsonl(session_file) as f:
-            for line in f:
-                try:
-                    data = json.loads(line).get('data', {})
-                    if data.get('trackName'):
-                        info['trackName'] = data['trackName']
-                    if data.get('sessionType'):
-                        info['sessionType'] = data['sessionType']
-                    if data.get('sessionId'):
-                        info['sessionId'] = data['sessionId']
-                except:
-                    pass
-    
-    return info
-
-def count_events(log_dir: Path) -> int:
-    """Count total events for progress tracking"""
-    events_file = get_events_file(log_dir)
-    if not events_file:
-        return 0
-    
-    count = 0
-    with open_jsonl(events_file) as f:
-        for _ in f:
-            count += 1
-    return count
 
 class SessionReplayer:
     def __init__(self, server_url: str, speed_multiplier: float = 10.0):
@@ -147,9 +86,13 @@ class SessionReplayer:
         print(f"Type: {session_info['sessionType']}")
         print(f"Speed: {self.speed_multiplier}x")
         
+        log = SessionLog(log_dir)
+        if not log.exists:
+            raise FileNotFoundError(f"No all_events.jsonl(.gz) found in {log_dir}")
+        
         # Count events for progress
         print("Counting events...", end=" ")
-        total_events = count_events(log_dir)
+        total_events = log.count(event_map)
         print(f"{total_events:,} events")
         
         if total_events == 0:
@@ -173,10 +116,10 @@ class SessionReplayer:
             'car:status': 'strategy_raw',
         }
         
-        for evt in stream_events(log_dir):
-            event_type = evt.get('event', '')
-            data = evt.get('data', {})
-            ts = evt.get('ts', 0)
+        for evt in log.events(event_map):
+            event_type = evt.event
+            data = evt.data
+            ts = evt.ts
             
             # Simulate timing (with speed multiplier)
             if last_ts and self.speed_multiplier < 100:
@@ -13,21 +13,12 @@ import json
 import logging
 import os
 import queue
-import subprocess
-import tempfile
 import threading
 import time
 import uuid
-from collections import deque
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import Any, Deque, Dict, List, Optional
-
-try:
-    import mss
-    MSS_AVAILABLE = True
-except ImportError:
-    MSS_AVAILABLE = False
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from PIL import Image
@@ -42,7 +33,20 @@ try:
 except ImportError:
     CV2_AVAILABLE = False
 
+from capture_pipeline import CompressPipeline, RawFrame
+from capture_source import MSS_AVAILABLE, CaptureConsumer, CaptureSource, SharedFrame
+from clip_library import ClipLibrary
+from clip_manager import ClipManager, ClipWindow
+from encode_pool import SEVERITY_PRIORITY, EncodePool, clip_priority
+from ffmpeg_pipe import encode_frames, find_ffmpeg, h264_output_args, jpeg_input_args
+from frame_arena import FrameArena
+from segment_recorder import SegmentRecorder
+from telemetry_ring import TelemetryRing
+from telemetry_sidecar import SUFFIX as COLUMNAR_SIDECAR_SUFFIX, write_clip_sidecar
+from log_throttle import RateLimitedLogger
+
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
 
 
 # ═══════════════════════════════════════
@@ -55,6 +59,7 @@ class CaptureConfig:
     capture_width: int = 1280         # Downscale target
     capture_height: int = 720
     buffer_seconds: int = 60          # Rolling buffer size
+    buffer_max_mb: int = 256          # Hard memory budget for the frame arena
     jpeg_quality: int = 80            # In-memory compression
     pre_event_seconds: int = 10       # Seconds before event to include
     post_event_seconds: int = 10      # Seconds after event to record
@@ -65,7 +70,16 @@ class CaptureConfig:
     video_preset: str = 'fast'        # Encoding speed
     max_storage_mb: int = 5000        # 5GB cap
     monitor_index: int = 1            # 1 = primary monitor (mss convention)
+    region_mode: str = 'monitor'      # monitor | rect | center | window (see capture_source)
+    region: Optional[Tuple[int, int, int, int]] = None  # (left, top, width, height) for 'rect'
     use_cv2: bool = True              # Use cv2 if available (faster encode)
+    encode_workers: int = 1           # Max concurrent clip encodes
+    compress_workers: int = 2         # JPEG compression threads behind the grab thread
+    merge_overlapping_clips: bool = False  # One clip per pileup instead of one per trigger
+    segment_mode: bool = False        # Continuously encode H.264 segments (needs FFmpeg)
+    segment_seconds: float = 2.0      # Segment length; clip boundaries snap to this
+    telemetry_format: str = 'json'    # Telemetry sidecar: json | columnar | both
+    telemetry_compress: bool = False  # zlib-compress columnar sidecar channels
 
 
 # ═══════════════════════════════════════
@@ -95,6 +109,7 @@ class BufferedFrame:
     timestamp: float              # wall clock (time.time())
     session_time_ms: int          # iRacing SessionTime at capture moment
     jpeg_bytes: bytes             # JPEG-compressed frame data
+    telemetry: Optional[TelemetrySample] = None  # Sample current at capture
 
 
 @dataclass
@@ -114,43 +129,16 @@ class ClipMetadata:
     file_path: str = ''           # Absolute path to MP4
     file_size_bytes: int = 0
     tags: list = field(default_factory=list)  # Auto-categorization tags
+    trigger_type: str = ''        # event_type/label as triggered, before auto-categorization
+    trigger_label: str = ''
+    categorizer_version: int = 0  # clip_categorizer.CATEGORIZER_VERSION that set the tags (0 = none)
+    merged_events: list = field(default_factory=list)  # Other triggers folded into this clip
     telemetry_sync: dict = field(default_factory=lambda: {
         'session_time_ms_at_frame_0': 0,
         'fps': 15
     })
 
 
-# ═══════════════════════════════════════
-# FFmpeg Detection
-# ═══════════════════════════════════════
-
-def find_ffmpeg() -> Optional[str]:
-    """Locate ffmpeg binary on PATH or common install locations."""
-    # Try PATH first
-    try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True, timeout=5
-        )
-        if result.returncode == 0:
-            return 'ffmpeg'
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
-
-    # Common Windows locations
-    common_paths = [
-        r'C:\ffmpeg\bin\ffmpeg.exe',
-        r'C:\Program Files\ffmpeg\bin\ffmpeg.exe',
-        r'C:\ProgramData\chocolatey\bin\ffmpeg.exe',
-        os.path.expanduser(r'~\scoop\apps\ffmpeg\current\bin\ffmpeg.exe'),
-    ]
-    for p in common_paths:
-        if os.path.isfile(p):
-            return p
-
-    return None
-
-
 # ═══════════════════════════════════════
 # Screen Capture Engine
 # ═══════════════════════════════════════
@@ -177,14 +165,29 @@ class ScreenCapture:
         capture.stop()
     """
 
-    def __init__(self, config: Optional[CaptureConfig] = None):
+    FFMPEG_TIMEOUT_S = 60
+
+    def __init__(self, config: Optional[CaptureConfig] = None,
+                 source: Optional[CaptureSource] = None,
+                 telemetry_ring: Optional[TelemetryRing] = None):
         self.config = config or CaptureConfig()
-        self.buffer: Deque[BufferedFrame] = deque(
-            maxlen=self.config.buffer_seconds * self.config.target_fps
+        # High-rate player telemetry; clip sidecars interpolate it per frame
+        self.telemetry_ring = telemetry_ring
+        # Grabs are shared with the live VideoEncoder when both use one source
+        self.source = source or CaptureSource(
+            monitor_index=self.config.monitor_index,
+            region_mode=self.config.region_mode,
+            region=self.config.region,
         )
+        self._consumer: Optional[CaptureConsumer] = None
+        # Rolling buffer: JPEG payloads + telemetry in one preallocated arena.
+        # Empty until start() (frame mode only) so an idle capture holds no memory;
+        # in segment mode encoded segments on disk replace it entirely.
+        self.buffer = self._new_arena(0)
+        self.segments: Optional[SegmentRecorder] = None
         self.running = False
-        self.capture_thread: Optional[threading.Thread] = None
-        self.encode_threads: List[threading.Thread] = []
+        self.pipeline: Optional[CompressPipeline] = None
+        self.encode_pool = EncodePool(workers=self.config.encode_workers)
         self.pending_clips: queue.Queue[ClipMetadata] = queue.Queue()
 
         # Session context (updated from telemetry loop)
@@ -192,17 +195,18 @@ class ScreenCapture:
         self.session_id: str = ''
         self.session_active: bool = False  # Only buffer when session is active
 
-        # Post-event continuation recording
-        self._post_event_until: float = 0  # wall clock time to stop post-event capture
-        self._post_event_frames: List[BufferedFrame] = []
-        self._post_event_meta: Optional[dict] = None
-
-        # Telemetry snapshot buffer (mirrors frame buffer timing)
-        self._telemetry_buffer: Deque[TelemetrySample] = deque(
-            maxlen=self.config.buffer_seconds * self.config.target_fps
+        # Open clip windows (any number, triggered from any thread)
+        self.clips = ClipManager(
+            merge_overlapping=self.config.merge_overlapping_clips,
+            max_clip_seconds=self.config.max_clip_seconds,
         )
+        # Held while a frame is buffered + routed to open windows, and while a
+        # trigger collects its pre-frames + opens its window, so the boundary
+        # frame lands in exactly one of the two
+        self._frame_lock = threading.Lock()
+
+        # Latest telemetry snapshot, attached to each captured frame
         self._current_telemetry: Optional[TelemetrySample] = None
-        self._post_event_telemetry: List[TelemetrySample] = []
 
         # FFmpeg
         self._ffmpeg_path = find_ffmpeg()
@@ -214,9 +218,13 @@ class ScreenCapture:
             )
         os.makedirs(self.config.output_dir, exist_ok=True)
 
+        # Persistent index of saved clips (storage accounting + UI queries)
+        self.library = ClipLibrary(self.config.output_dir)
+
         # Stats
         self.frames_captured: int = 0
         self.clips_saved: int = 0
+        self.last_encode_fps: float = 0
         self._last_stats_log: float = 0
 
     # ─── Lifecycle ───────────────────────────
@@ -235,15 +243,44 @@ class ScreenCapture:
             logger.error("   Install FFmpeg: choco install ffmpeg  OR  pip install opencv-python")
             return
 
+        if self.config.segment_mode:
+            if self._ffmpeg_path:
+                self.segments = SegmentRecorder(
+                    ffmpeg_path=self._ffmpeg_path,
+                    work_dir=os.path.join(self.config.output_dir, '.segments'),
+                    fps=self.config.target_fps,
+                    segment_seconds=self.config.segment_seconds,
+                    retain_seconds=self.config.buffer_seconds,
+                    codec=self.config.video_codec,
+                    crf=self.config.video_crf,
+                )
+                self.segments.start()
+            else:
+                logger.warning("⚠️ Segment mode needs FFmpeg — falling back to frame buffer")
+        if not self.segments:
+            self.buffer = self._new_arena(self.config.buffer_max_mb * 1024 * 1024)
+
         self.running = True
-        self.capture_thread = threading.Thread(
-            target=self._capture_loop, daemon=True, name='ScreenCapture'
+        self.encode_pool.start()
+        w, h = self.config.capture_width, self.config.capture_height
+        self.pipeline = CompressPipeline(
+            compress_fn=lambda frame: self._compress_frame(frame, w, h),
+            sink=self._on_frame,
+            workers=self.config.compress_workers,
+            name='ClipCompress',
+        )
+        self.pipeline.start()
+        # Only buffer while a session is active (iRacing rendering)
+        self._consumer = self.source.add_consumer(
+            'clips', self.config.target_fps, self._on_grab,
+            wants=lambda: self.running and self.session_active,
         )
-        self.capture_thread.start()
         logger.info(
             f"🎥 Screen Capture started: {self.config.capture_width}x{self.config.capture_height} "
             f"@ {self.config.target_fps}fps, {self.config.buffer_seconds}s buffer"
         )
+        if self.segments:
+            logger.info(f"   Segment mode: {self.config.segment_seconds}s H.264 segments")
         if self._ffmpeg_path:
             logger.info(f"   FFmpeg: {self._ffmpeg_path}")
         elif CV2_AVAILABLE:
@@ -252,20 +289,39 @@ class ScreenCapture:
     def stop(self):
         """Stop capture, flush any pending clips."""
         self.running = False
-        if self.capture_thread:
-            self.capture_thread.join(timeout=3.0)
-            self.capture_thread = None
-
-        # Wait for pending encodes
-        for t in self.encode_threads:
-            t.join(timeout=10.0)
-        self.encode_threads = [t for t in self.encode_threads if t.is_alive()]
-
+        if self._consumer:
+            self.source.remove_consumer(self._consumer)
+            self._consumer = None
+        if self.pipeline:
+            self.pipeline.stop()
+
+        # Flush clips still in their post-event phase. No more frames are coming, so
+        # end them now; in segment mode the encoder closes its open segment once idle
+        # and the job keeps whatever segments completed.
+        now = time.time()
+        for window in self.clips.pop_all():
+            window.end_ts = min(window.end_ts, now)
+            self._finalize_clip(window)
+
+        # Wait for pending encodes; segment jobs hold their own recorder reference
+        self.encode_pool.shutdown(timeout=30.0)
+
+        # Only now delete the segments the jobs were reading
+        if self.segments:
+            self.segments.stop()
+            self.segments = None
+        # Pre-frames were copied out at trigger time: release the arena
+        self.buffer = self._new_arena(0)
+
+        throttled.flush()
         logger.info(
             f"🎥 Screen Capture stopped. "
             f"Frames: {self.frames_captured}, Clips: {self.clips_saved}"
         )
 
+    def _new_arena(self, budget_bytes: int) -> FrameArena:
+        return FrameArena(budget_bytes=budget_bytes, max_age_s=self.config.buffer_seconds)
+
     # ─── Session Context ─────────────────────
 
     def update_session_context(self, session_id: str, session_time_ms: int,
@@ -313,132 +369,136 @@ class ScreenCapture:
         event_session_time = session_time_ms or self.session_time_ms
         event_wall_clock = time.time()
 
-        # Extract pre-event frames from buffer
         cutoff = event_wall_clock - self.config.pre_event_seconds
-        pre_frames = [f for f in self.buffer if f.timestamp >= cutoff]
-
-        if not pre_frames:
-            logger.warning("No buffered frames for clip — buffer may be empty")
-            return
+        clip_end = event_wall_clock + self.config.post_event_seconds
+        with self._frame_lock:
+            pinned = []
+            if self.segments:
+                # Segment mode: frames are already encoded, only the window is needed.
+                # Pin now so _prune can't delete them while the clip waits for the pool.
+                pinned = self.segments.pin_between(cutoff, clip_end)
+                if not pinned:
+                    logger.warning("No encoded segments for clip — buffer may be empty")
+                    return
+                pre_frames = []
+            else:
+                pre_frames = self._copy_pre_event_frames(cutoff)
+                if not pre_frames:
+                    logger.warning("No buffered frames for clip — buffer may be empty")
+                    return
+
+            # Open a post-event window (merged into an overlapping one if enabled)
+            window = self.clips.open_window(
+                meta={
+                    'event_type': event_type,
+                    'event_label': event_label,
+                    'severity': severity,
+                    'event_session_time': event_session_time,
+                    'event_wall_clock': event_wall_clock,
+                },
+                start_ts=cutoff,
+                end_ts=clip_end,
+                pre_frames=pre_frames,
+                pinned=pinned,
+            )
 
         logger.info(
             f"📹 Clip triggered: [{event_type}] {event_label} "
             f"({len(pre_frames)} pre-frames, recording {self.config.post_event_seconds}s more)"
         )
+        if len(window.events) > 1:
+            logger.info(f"   ↳ merged into open clip #{window.window_id} ({len(window.events)} events)")
 
-        # Extract matching pre-event telemetry samples
-        pre_telemetry = list(self._telemetry_buffer)[-len(pre_frames):]
-
-        # Store context for post-event continuation
-        self._post_event_until = event_wall_clock + self.config.post_event_seconds
-        self._post_event_frames = list(pre_frames)
-        self._post_event_telemetry = list(pre_telemetry)
-        self._post_event_meta = {
-            'event_type': event_type,
-            'event_label': event_label,
-            'severity': severity,
-            'event_session_time': event_session_time,
-            'event_wall_clock': event_wall_clock,
-        }
+    def _copy_pre_event_frames(self, cutoff: float) -> List[BufferedFrame]:
+        """
+        Collect frames newer than `cutoff`. Frames already held by another
+        open clip are shared by reference; only the rest are copied out of
+        the arena.
+        """
+        shared = self.clips.shared_frames_since(cutoff)
+        frames = []
+        for record in self.buffer.records_since(cutoff):
+            frame = shared.get(record.timestamp)
+            if frame is None:
+                payload = self.buffer.read(record)
+                if payload is None:
+                    continue
+                frame = BufferedFrame(
+                    timestamp=record.timestamp,
+                    session_time_ms=record.session_time_ms,
+                    jpeg_bytes=payload,
+                    telemetry=record.telemetry,
+                )
+            frames.append(frame)
+        return frames
 
     # ─── Capture Loop ────────────────────────
 
-    def _capture_loop(self):
+    def _on_grab(self, frame: SharedFrame):
         """
-        Background thread: grabs screen at target_fps,
-        resizes, JPEG-compresses, pushes to ring buffer.
+        Runs on the shared grab thread: tag the frame with session time and
+        telemetry as of the grab, then hand it to the compress workers.
+        Resize + JPEG happen off this thread.
         """
-        interval = 1.0 / self.config.target_fps
-        w, h = self.config.capture_width, self.config.capture_height
-
-        with mss.mss() as sct:
-            monitor = sct.monitors[self.config.monitor_index]
-            logger.info(
-                f"📺 Capturing monitor {self.config.monitor_index}: "
-                f"{monitor['width']}x{monitor['height']}"
+        self.pipeline.submit(RawFrame(
+            image=frame,
+            timestamp=frame.timestamp,
+            session_time_ms=self.session_time_ms,
+            telemetry=self._current_telemetry,
+            grab_ms=frame.grab_ms,
+        ))
+
+    def _on_frame(self, raw: RawFrame, payload):
+        """Compressed frames arrive here in grab order (single caller at a time)."""
+        now = raw.timestamp
+        with self._frame_lock:
+            if self.segments:
+                # Hand off to the background segment encoder
+                self.segments.add_frame(payload, now, raw.session_time_ms, raw.telemetry)
+            else:
+                # Copy into the arena alongside its telemetry sample
+                self.buffer.append(payload, now, raw.session_time_ms, raw.telemetry)
+
+            # Open clips share one copy of each post-event frame
+            if not self.segments and self.clips.wants_frames(now):
+                self.clips.add_frame(BufferedFrame(
+                    timestamp=now,
+                    session_time_ms=raw.session_time_ms,
+                    jpeg_bytes=bytes(payload),
+                    telemetry=raw.telemetry,
+                ))
+        self.frames_captured += 1
+
+        # Post-event recording finished — encode clips
+        for window in self.clips.pop_expired(now):
+            self._finalize_clip(window)
+
+        # Periodic stats
+        if now - self._last_stats_log > 60:
+            stats = self.pipeline.get_stats()
+            logger.debug(
+                f"📊 Buffer: {len(self.buffer)} frames "
+                f"({self.buffer.span_seconds:.0f}s, "
+                f"{self.buffer.used_bytes / (1024 * 1024):.1f}MB), "
+                f"Total: {self.frames_captured} frames, "
+                f"{stats['achieved_fps']:.1f}/{self.config.target_fps} fps, "
+                f"dropped {stats['frames_dropped']}"
             )
+            self._last_stats_log = now
 
-            while self.running:
-                loop_start = time.perf_counter()
-
-                # Only capture when session is active (iRacing rendering)
-                if not self.session_active:
-                    time.sleep(0.25)
-                    continue
-
-                try:
-                    # Grab screen
-                    screenshot = sct.grab(monitor)
-
-                    # Encode to JPEG (using cv2 if available, else PIL)
-                    jpeg_bytes = self._compress_frame(screenshot, w, h)
-                    if not jpeg_bytes:
-                        continue
-
-                    frame = BufferedFrame(
-                        timestamp=time.time(),
-                        session_time_ms=self.session_time_ms,
-                        jpeg_bytes=jpeg_bytes,
-                    )
-
-                    # Push to ring buffer
-                    self.buffer.append(frame)
-                    self.frames_captured += 1
-
-                    # Push matching telemetry sample
-                    if self._current_telemetry:
-                        self._telemetry_buffer.append(self._current_telemetry)
-                    else:
-                        self._telemetry_buffer.append(TelemetrySample(
-                            session_time_ms=self.session_time_ms
-                        ))
-
-                    # If we're in post-event recording, also capture for clip
-                    if self._post_event_meta and time.time() <= self._post_event_until:
-                        self._post_event_frames.append(frame)
-                        if self._current_telemetry:
-                            self._post_event_telemetry.append(self._current_telemetry)
-                        else:
-                            self._post_event_telemetry.append(TelemetrySample(
-                                session_time_ms=self.session_time_ms
-                            ))
-                    elif self._post_event_meta and time.time() > self._post_event_until:
-                        # Post-event recording finished — encode clip
-                        self._finalize_clip()
-
-                    # Periodic stats
-                    now = time.time()
-                    if now - self._last_stats_log > 60:
-                        buf_secs = len(self.buffer) / max(1, self.config.target_fps)
-                        buf_mb = sum(len(f.jpeg_bytes) for f in self.buffer) / (1024 * 1024)
-                        logger.debug(
-                            f"📊 Buffer: {len(self.buffer)} frames "
-                            f"({buf_secs:.0f}s, {buf_mb:.1f}MB), "
-                            f"Total: {self.frames_captured} frames"
-                        )
-                        self._last_stats_log = now
-
-                except Exception as e:
-                    logger.error(f"Capture error: {e}")
-                    time.sleep(0.5)
-
-                # Sleep to maintain target fps
-                elapsed = time.perf_counter() - loop_start
-                sleep_time = interval - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-
-    def _compress_frame(self, screenshot, w: int, h: int) -> Optional[bytes]:
-        """Compress a screen grab to JPEG bytes, resizing to target resolution."""
+    def _compress_frame(self, frame: SharedFrame, w: int, h: int):
+        """
+        Compress a screen grab to JPEG, resizing to target resolution.
+        Returns a buffer-protocol object (ndarray or bytes) so the arena can
+        copy it in without an intermediate bytes allocation. The cv2 path
+        goes through the shared frame, so another consumer at the same size
+        and quality reuses the result.
+        """
         if CV2_AVAILABLE and self.config.use_cv2:
-            frame = np.array(screenshot)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-            frame = cv2.resize(frame, (w, h))
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.config.jpeg_quality]
-            ok, buffer = cv2.imencode('.jpg', frame, encode_param)
-            return buffer.tobytes() if ok else None
+            return frame.jpeg(w, h, self.config.jpeg_quality)
 
         if PIL_AVAILABLE:
+            screenshot = frame.raw
             img = Image.frombytes('RGB', screenshot.size, screenshot.bgra, 'raw', 'BGRX')
             img = img.resize((w, h), Image.LANCZOS)
             buf = io.BytesIO()
@@ -449,30 +509,51 @@ class ScreenCapture:
 
     # ─── Clip Finalization ───────────────────
 
-    def _finalize_clip(self):
-        """Package collected frames and encode in background thread."""
-        frames = self._post_event_frames
-        telemetry_samples = self._post_event_telemetry
-        meta_ctx = self._post_event_meta
-
-        # Clear state
-        self._post_event_frames = []
-        self._post_event_telemetry = []
-        self._post_event_meta = None
-        self._post_event_until = 0
+    def _finalize_clip(self, window: ClipWindow):
+        """Package a finished clip window and encode in background thread."""
+        meta_ctx = dict(window.meta, merged_events=window.events[1:])
+
+        on_cancel = None
+        recorder = self.segments
+        if recorder:
+            # Segment mode: the video already exists, just concatenate it.
+            # Pin segments written since the trigger too; the job releases them all.
+            # The job gets the recorder itself: stop() clears self.segments.
+            pinned = window.pinned + recorder.pin_between(window.start_ts, window.end_ts)
+            target, args = self._encode_clip_from_segments, (recorder, window, meta_ctx, pinned)
+            on_cancel = lambda: recorder.unpin(pinned)
+        else:
+            if not window.frames:
+                return
+            # Categorize + encode on the pool, never on the capture thread
+            target, args = self._build_and_encode_clip, (window.frames, meta_ctx)
+
+        # Encode on the bounded pool (manual > major > moderate > minor)
+        self.encode_pool.submit(
+            target, *args,
+            priority=clip_priority(meta_ctx['severity'], meta_ctx['event_type']),
+            label=f"clip#{window.window_id}",
+            on_cancel=on_cancel,
+        )
 
-        if not frames or not meta_ctx:
-            return
+    def _build_and_encode_clip(self, frames: List[BufferedFrame], meta_ctx: dict) -> bool:
+        """Frame mode: build metadata (incl. auto-categorization), then encode."""
+        frames, metadata, telemetry_samples = self._build_clip(frames, meta_ctx)
+        return self._encode_clip(frames, metadata, telemetry_samples)
 
+    def _build_clip(self, frames: List[BufferedFrame], meta_ctx: dict):
+        """Trim to max length, auto-categorize, and build ClipMetadata."""
         # Enforce max clip length
         max_frames = self.config.max_clip_seconds * self.config.target_fps
         if len(frames) > max_frames:
             frames = frames[-max_frames:]
-            telemetry_samples = telemetry_samples[-max_frames:]
+
+        telemetry_samples = self._frame_telemetry(frames)
 
         # Auto-categorize from telemetry context
+        categorizer_version = 0
         try:
-            from clip_categorizer import categorize_clip
+            from clip_categorizer import CATEGORIZER_VERSION, categorize_clip
             category = categorize_clip(
                 samples=telemetry_samples,
                 event_type=meta_ctx['event_type'],
@@ -481,6 +562,7 @@ class ScreenCapture:
             enriched_type = category.primary
             enriched_label = category.label
             enriched_tags = category.tags
+            categorizer_version = CATEGORIZER_VERSION
             logger.info(f"🏷️ Auto-categorized: {enriched_type} — {enriched_label} (tags: {enriched_tags})")
         except Exception as e:
             logger.debug(f"Auto-categorization skipped: {e}")
@@ -504,6 +586,13 @@ class ScreenCapture:
             frame_count=len(frames),
             resolution=f"{self.config.capture_width}x{self.config.capture_height}",
             tags=enriched_tags,
+            trigger_type=meta_ctx['event_type'],
+            trigger_label=meta_ctx['event_label'],
+            categorizer_version=categorizer_version,
+            merged_events=[
+                {k: e[k] for k in ('event_type', 'event_label', 'severity', 'event_session_time')}
+                for e in meta_ctx.get('merged_events', [])
+            ],
             telemetry_sync={
                 'session_time_ms_at_frame_0': frames[0].session_time_ms,
                 'fps': self.config.target_fps,
@@ -514,32 +603,37 @@ class ScreenCapture:
             f"📼 Encoding clip {clip_id}: {len(frames)} frames, "
             f"{metadata.duration_ms / 1000:.1f}s"
         )
+        return frames, metadata, telemetry_samples
 
-        # Encode in background thread
-        t = threading.Thread(
-            target=self._encode_clip,
-            args=(list(frames), metadata, list(telemetry_samples)),
-            daemon=True,
-            name=f'ClipEncode-{clip_id}',
+    def _frame_telemetry(self, frames: List[BufferedFrame]) -> List[TelemetrySample]:
+        """
+        One telemetry sample per frame: interpolated from the high-rate ring
+        at the frame's grab time when it covers the frame, else the poll-rate
+        snapshot that was current when the frame was grabbed.
+        """
+        interpolated = (
+            self.telemetry_ring.interpolate([f.timestamp for f in frames])
+            if self.telemetry_ring else [None] * len(frames)
         )
-        t.start()
-        self.encode_threads.append(t)
-
-        # Clean up finished threads
-        self.encode_threads = [t for t in self.encode_threads if t.is_alive()]
+        samples = []
+        for frame, values in zip(frames, interpolated):
+            if values is not None:
+                samples.append(TelemetrySample(session_time_ms=frame.session_time_ms, **values))
+            else:
+                samples.append(frame.telemetry or TelemetrySample(session_time_ms=frame.session_time_ms))
+        return samples
 
     def _encode_clip(self, frames: List[BufferedFrame], metadata: ClipMetadata,
-                     telemetry_samples: Optional[List[TelemetrySample]] = None):
+                     telemetry_samples: Optional[List[TelemetrySample]] = None) -> bool:
         """
         Encode frames to MP4. Tries cv2 VideoWriter first,
         falls back to FFmpeg subprocess (JPEG → MP4).
-        Also writes a telemetry JSON sidecar for browser playback sync.
+        Returns False on failure (the pool counts it as a failed job).
         """
         output_path = os.path.join(
             self.config.output_dir,
             f'{metadata.clip_id}.mp4'
         )
-        meta_path = output_path.replace('.mp4', '.json')
 
         try:
             success = False
@@ -554,24 +648,103 @@ class ScreenCapture:
 
             if not success:
                 logger.error(f"❌ Failed to encode clip {metadata.clip_id}")
-                return
+                return False
 
-            # Update metadata with file info
-            metadata.file_path = os.path.abspath(output_path)
-            metadata.file_size_bytes = os.path.getsize(output_path)
+            thumb_jpeg = frames[len(frames) // 2].jpeg_bytes
+            self._save_clip_outputs(output_path, metadata, telemetry_samples, thumb_jpeg)
+            return True
 
-            # Write JSON sidecar (clip metadata)
-            with open(meta_path, 'w') as f:
-                json.dump(asdict(metadata), f, indent=2)
+        except Exception as e:
+            logger.error(f"❌ Clip encode error ({metadata.clip_id}): {e}")
+            return False
 
-            # Generate thumbnail from mid-clip frame
+    def _encode_clip_from_segments(self, recorder: SegmentRecorder, window: ClipWindow,
+                                   meta_ctx: dict, pinned: list) -> bool:
+        """
+        Segment mode: stream-copy the segments covering the clip window.
+        `pinned` holds the segments pinned for this clip; all are released here.
+        Returns False on failure.
+        """
+        try:
+            # Segments the encoder opened after _finalize_clip ran (it can lag the capture thread)
+            pinned = pinned + recorder.pin_between(window.start_ts, window.end_ts)
+            segments = sorted({seg.index: seg for seg in pinned}.values(), key=lambda seg: seg.index)
+            if not segments:
+                logger.warning("No encoded segments cover clip window")
+                return False
+
+            # The last segment is still being written until ~segment_seconds after the window
+            if not recorder.wait_complete(segments, timeout=self.config.segment_seconds * 2 + 10):
+                logger.error("❌ Timed out waiting for clip segments")
+                return False
+            segments = [seg for seg in segments if seg.ok]
+
+            # Enforce max clip length at segment granularity
+            max_frames = self.config.max_clip_seconds * self.config.target_fps
+            while len(segments) > 1 and sum(seg.frame_count for seg in segments) > max_frames:
+                segments.pop(0)
+
+            frames = [
+                BufferedFrame(timestamp=ts, session_time_ms=st, jpeg_bytes=b'', telemetry=tel)
+                for seg in segments
+                for ts, st, tel in zip(seg.frame_timestamps, seg.session_times_ms, seg.telemetry)
+            ]
+            if not frames:
+                return False
+
+            frames, metadata, telemetry_samples = self._build_clip(frames, meta_ctx)
+            output_path = os.path.join(self.config.output_dir, f'{metadata.clip_id}.mp4')
+
+            result = recorder.concat(segments, output_path)
+            if not result.ok:
+                logger.error(f"❌ Failed to concatenate clip {metadata.clip_id}: {result.stderr[:300]}")
+                return False
+            logger.info(
+                f"   ⚡ Segment concat: {len(segments)} segments in {result.seconds * 1000:.0f}ms"
+            )
+
+            thumb_jpeg = segments[len(segments) // 2].thumb_jpeg
+            self._save_clip_outputs(output_path, metadata, telemetry_samples, thumb_jpeg)
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Clip concat error: {e}")
+            return False
+        finally:
+            # Release the original pins, not the filtered/trimmed list
+            recorder.unpin(pinned)
+
+    def _save_clip_outputs(self, output_path: str, metadata: ClipMetadata,
+                           telemetry_samples: Optional[List[TelemetrySample]],
+                           thumb_jpeg: Optional[bytes]):
+        """
+        Write metadata + thumbnail + telemetry sidecars for an encoded clip,
+        then hand it to Electron/cloud and enforce the storage quota.
+        """
+        meta_path = output_path.replace('.mp4', '.json')
+        telemetry_format = self.config.telemetry_format
+        write_json = telemetry_format in ('json', 'both')
+        write_columnar = telemetry_format in ('columnar', 'both')
+
+        # Update metadata with file info
+        metadata.file_path = os.path.abspath(output_path)
+        metadata.file_size_bytes = os.path.getsize(output_path)
+        if telemetry_samples:
+            # Tell the player which telemetry sidecar(s) to load
+            metadata.telemetry_sync['sidecars'] = (
+                (['json'] if write_json else []) + (['columnar'] if write_columnar else [])
+            )
+
+        # Write JSON sidecar (clip metadata)
+        with open(meta_path, 'w') as f:
+            json.dump(asdict(metadata), f, indent=2)
+
+        # Generate thumbnail from mid-clip frame
+        if thumb_jpeg:
             try:
-                mid_idx = len(frames) // 2
                 thumb_path = output_path.replace('.mp4', '_thumb.jpg')
-                thumb_frame = frames[mid_idx]
                 if CV2_AVAILABLE:
-                    import numpy as np
-                    img = cv2.imdecode(np.frombuffer(thumb_frame.jpeg_data, np.uint8), cv2.IMREAD_COLOR)
+                    img = cv2.imdecode(np.frombuffer(thumb_jpeg, np.uint8), cv2.IMREAD_COLOR)
                     if img is not None:
                         # Resize to 320px wide
                         h, w = img.shape[:2]
@@ -582,55 +755,71 @@ class ScreenCapture:
                 else:
                     # Fallback: save raw JPEG mid-frame as thumbnail
                     with open(thumb_path, 'wb') as tf:
-                        tf.write(thumb_frame.jpeg_data)
+                        tf.write(thumb_jpeg)
                     logger.info(f"   🖼️ Thumbnail saved (raw): {thumb_path}")
             except Exception as e:
                 logger.debug(f"Thumbnail generation failed: {e}")
 
-            # Write telemetry sidecar for browser sync
-            if telemetry_samples:
-                telemetry_path = output_path.replace('.mp4', '_telemetry.json')
-                # Downsample: keep 1 sample per ~66ms (15fps) for efficiency
-                samples_out = []
-                fps = self.config.target_fps
-                for i, sample in enumerate(telemetry_samples):
-                    # Compute video time offset in seconds
-                    video_time_s = i / fps
-                    samples_out.append({
-                        't': round(video_time_s, 3),
-                        'st': sample.session_time_ms,
-                        'spd': round(sample.speed, 1),
-                        'rpm': round(sample.rpm),
-                        'gear': sample.gear,
-                        'thr': round(sample.throttle, 3),
-                        'brk': round(sample.brake, 3),
-                        'str': round(sample.steering, 3),
-                        'fuel': round(sample.fuel_level, 2),
-                        'fuelPct': round(sample.fuel_pct, 3),
-                        'lap': sample.lap,
-                        'dist': round(sample.lap_dist_pct, 4),
-                        'pos': sample.position,
-                        'inc': sample.incident_count,
-                    })
-                with open(telemetry_path, 'w') as f:
-                    json.dump(samples_out, f)
-                logger.info(f"   📊 Telemetry sidecar: {len(samples_out)} samples")
-
-            # Enqueue for Electron/cloud
-            self.pending_clips.put_nowait(metadata)
-            self.clips_saved += 1
-
-            size_mb = metadata.file_size_bytes / (1024 * 1024)
-            logger.info(
-                f"✅ Clip saved: {metadata.clip_id}.mp4 "
-                f"({size_mb:.1f}MB, {metadata.duration_ms / 1000:.1f}s)"
-            )
+        # Columnar sidecar: header + one typed array per channel
+        if telemetry_samples and write_columnar:
+            try:
+                size = write_clip_sidecar(
+                    output_path.replace('.mp4', COLUMNAR_SIDECAR_SUFFIX),
+                    telemetry_samples,
+                    fps=self.config.target_fps,
+                    compress=self.config.telemetry_compress,
+                )
+                logger.info(f"   📊 Columnar telemetry sidecar: {len(telemetry_samples)} samples, {size / 1024:.1f}KB")
+            except Exception as e:
+                logger.warning(f"Columnar telemetry sidecar failed: {e}")
+
+        # Write telemetry sidecar for browser sync
+        if telemetry_samples and write_json:
+            telemetry_path = output_path.replace('.mp4', '_telemetry.json')
+            # Downsample: keep 1 sample per ~66ms (15fps) for efficiency
+            samples_out = []
+            fps = self.config.target_fps
+            for i, sample in enumerate(telemetry_samples):
+                # Compute video time offset in seconds
+                video_time_s = i / fps
+                samples_out.append({
+                    't': round(video_time_s, 3),
+                    'st': sample.session_time_ms,
+                    'spd': round(sample.speed, 1),
+                    'rpm': round(sample.rpm),
+                    'gear': sample.gear,
+                    'thr': round(sample.throttle, 3),
+                    'brk': round(sample.brake, 3),
+                    'str': round(sample.steering, 3),
+                    'fuel': round(sample.fuel_level, 2),
+                    'fuelPct': round(sample.fuel_pct, 3),
+                    'lap': sample.lap,
+                    'dist': round(sample.lap_dist_pct, 4),
+                    'pos': sample.position,
+                    'inc': sample.incident_count,
+                })
+            with open(telemetry_path, 'w') as f:
+                json.dump(samples_out, f)
+            logger.info(f"   📊 Telemetry sidecar: {len(samples_out)} samples")
+
+        # Index the clip and all of its sidecars
+        try:
+            self.library.add_clip(asdict(metadata), output_path)
+        except Exception as e:
+            logger.error(f"Failed to index clip {metadata.clip_id}: {e}")
 
-            # Enforce storage quota
-            self._enforce_storage_quota()
+        # Enqueue for Electron/cloud
+        self.pending_clips.put_nowait(metadata)
+        self.clips_saved += 1
 
-        except Exception as e:
-            logger.error(f"❌ Clip encode error ({metadata.clip_id}): {e}")
+        size_mb = metadata.file_size_bytes / (1024 * 1024)
+        logger.info(
+            f"✅ Clip saved: {metadata.clip_id}.mp4 "
+            f"({size_mb:.1f}MB, {metadata.duration_ms / 1000:.1f}s)"
+        )
+
+        # Enforce storage quota
+        self._enforce_storage_quota()
 
     def _encode_with_cv2(
         self, frames: List[BufferedFrame], output_path: str
@@ -660,92 +849,73 @@ class ScreenCapture:
     def _encode_with_ffmpeg(
         self, frames: List[BufferedFrame], output_path: str
     ) -> bool:
-        """Encode using FFmpeg subprocess (better quality, browser-compatible)."""
-        try:
-            with tempfile.TemporaryDirectory(prefix='obb_clip_') as tmpdir:
-                # Write numbered frames
-                for i, frame in enumerate(frames):
-                    frame_path = os.path.join(tmpdir, f'frame_{i:06d}.jpg')
-                    with open(frame_path, 'wb') as f:
-                        f.write(frame.jpeg_bytes)
-
-                # Encode with FFmpeg
-                cmd = [
-                    self._ffmpeg_path, '-y',
-                    '-framerate', str(self.config.target_fps),
-                    '-i', os.path.join(tmpdir, 'frame_%06d.jpg'),
-                    '-c:v', self.config.video_codec,
-                    '-crf', str(self.config.video_crf),
-                    '-preset', self.config.video_preset,
-                    '-pix_fmt', 'yuv420p',       # Browser compatibility
-                    '-movflags', '+faststart',    # Streaming-friendly
-                    output_path,
-                ]
-
-                result = subprocess.run(
-                    cmd, capture_output=True, timeout=60
-                )
-
-                if result.returncode != 0:
-                    stderr = result.stderr.decode('utf-8', errors='replace')[:500]
-                    logger.warning(f"FFmpeg stderr: {stderr}")
-                    return False
-
-                return os.path.isfile(output_path) and os.path.getsize(output_path) > 0
+        """
+        Encode using FFmpeg (better quality, browser-compatible).
+        JPEG frames are streamed into ffmpeg's stdin while it runs.
+        """
+        args = (
+            jpeg_input_args(self.config.target_fps)
+            + h264_output_args(self.config.video_codec, self.config.video_crf,
+                               self.config.video_preset)
+            + [output_path]
+        )
+        result = encode_frames(
+            self._ffmpeg_path, (f.jpeg_bytes for f in frames), args,
+            timeout_s=self.FFMPEG_TIMEOUT_S,
+        )
 
-        except subprocess.TimeoutExpired:
-            logger.error("FFmpeg encoding timed out (>60s)")
-            return False
-        except Exception as e:
-            logger.warning(f"FFmpeg encode failed: {e}")
+        if not result.ok:
+            if result.returncode is None or result.returncode < 0:
+                logger.error(f"FFmpeg encoding timed out or failed to start (>{self.FFMPEG_TIMEOUT_S}s)")
+            else:
+                logger.warning(f"FFmpeg stderr: {result.stderr[:500]}")
             return False
 
+        self.last_encode_fps = result.fps
+        logger.info(
+            f"   ⚙️ FFmpeg: {result.frames} frames in {result.seconds:.2f}s "
+            f"({result.fps:.0f} fps)"
+        )
+        return os.path.isfile(output_path) and os.path.getsize(output_path) > 0
+
     # ─── Storage Management ──────────────────
 
     def _enforce_storage_quota(self):
-        """Delete oldest clips if total storage exceeds quota."""
-        clip_dir = self.config.output_dir
-        if not os.path.isdir(clip_dir):
+        """
+        Evict clips once the library exceeds its quota. The check is O(1)
+        against the library's running total (video + sidecars); eviction
+        prefers old minor clips and keeps major incidents longest.
+        """
+        max_bytes = self.config.max_storage_mb * 1024 * 1024
+        if not self.library.over_quota(max_bytes):
             return
 
-        # Gather all clip files
-        clips = []
-        for f in os.listdir(clip_dir):
-            if f.endswith('.mp4'):
-                fp = os.path.join(clip_dir, f)
-                clips.append((fp, os.path.getmtime(fp), os.path.getsize(fp)))
-
-        total_mb = sum(c[2] for c in clips) / (1024 * 1024)
+        # Storage pressure: don't spend disk on queued minor clips
+        cancelled = self.encode_pool.cancel_pending(SEVERITY_PRIORITY['minor'])
+        if cancelled:
+            logger.warning(f"💾 Storage over quota — cancelled {cancelled} pending minor clip encodes")
 
-        if total_mb <= self.config.max_storage_mb:
-            return
-
-        # Sort oldest first, delete until under quota
-        clips.sort(key=lambda c: c[1])
-        while total_mb > self.config.max_storage_mb * 0.8 and clips:
-            fp, _, size = clips.pop(0)
-            try:
-                os.remove(fp)
-                # Also remove JSON sidecar
-                json_path = fp.replace('.mp4', '.json')
-                if os.path.isfile(json_path):
-                    os.remove(json_path)
-                total_mb -= size / (1024 * 1024)
-                logger.info(f"🗑️ Deleted old clip: {os.path.basename(fp)}")
-            except OSError as e:
-                logger.warning(f"Failed to delete clip: {e}")
+        for clip_id in self.library.enforce_quota(max_bytes, target_ratio=0.8):
+            logger.info(f"🗑️ Deleted old clip: {clip_id}")
 
     # ─── Utility ─────────────────────────────
 
     def get_buffer_stats(self) -> dict:
         """Return current buffer statistics."""
-        buf_frames = len(self.buffer)
-        buf_mb = sum(len(f.jpeg_bytes) for f in self.buffer) / (1024 * 1024) if buf_frames else 0
         return {
-            'frames': buf_frames,
-            'seconds': buf_frames / max(1, self.config.target_fps),
-            'memory_mb': round(buf_mb, 1),
+            'frames': len(self.buffer),
+            'seconds': round(self.buffer.span_seconds, 1),
+            'memory_mb': round(self.buffer.used_bytes / (1024 * 1024), 1),
+            'budget_mb': self.config.buffer_max_mb,
+            'frames_evicted': self.buffer.frames_evicted,
             'clips_saved': self.clips_saved,
             'total_frames_captured': self.frames_captured,
-            'recording_active': self._post_event_meta is not None,
+            'last_encode_fps': round(self.last_encode_fps, 1),
+            'segments': self.segments.get_stats() if self.segments else None,
+            'encode_pool': self.encode_pool.get_stats(),
+            'capture': self.pipeline.get_stats() if self.pipeline else None,
+            'recording_active': self.clips.open_count > 0,
+            'open_clips': self.clips.open_count,
+            'library': self.library.get_stats(),
+            'telemetry_ring': self.telemetry_ring.get_stats() if self.telemetry_ring else None,
         }
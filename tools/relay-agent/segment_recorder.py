@@ -0,0 +1,316 @@
+"""
+OBB Replay Intelligence — Continuous Segment Recorder
+
+Alternative to re-encoding JPEG frames at clip time: the capture stream is
+encoded continuously into short H.264 MPEG-TS segments by a low-priority
+ffmpeg, one process per segment. A clip is then just a stream-copy
+concatenation of the segments covering its window (`-c copy`), so
+finalising takes milliseconds and encode CPU is spread evenly across the
+session instead of spiking mid-race.
+
+Each Segment keeps the wall-clock timestamp, session time and telemetry of
+every frame it contains, so clip metadata and telemetry sidecars line up
+exactly with the concatenated video.
+"""
+
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from ffmpeg_pipe import EncodeResult, FFmpegPipe, jpeg_input_args
+from log_throttle import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
+
+
+@dataclass
+class Segment:
+    index: int
+    path: str
+    start_ts: float
+    end_ts: float = 0
+    frame_timestamps: List[float] = field(default_factory=list)
+    session_times_ms: List[int] = field(default_factory=list)
+    telemetry: List[Any] = field(default_factory=list)
+    thumb_jpeg: Optional[bytes] = None
+    size_bytes: int = 0
+    complete: bool = False
+    ok: bool = False
+    pins: int = 0
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_timestamps)
+
+
+class SegmentRecorder:
+    """
+    Encodes the live frame stream into rolling segments on a worker thread.
+
+    add_frame() never blocks the capture loop: frames go through a bounded
+    queue and are dropped (and counted) if the encoder falls behind.
+    """
+
+    CONCAT_TIMEOUT_S = 30
+    IDLE_CLOSE_S = 1.0    # Close the open segment after this long without frames
+
+    def __init__(self, ffmpeg_path: str, work_dir: str, fps: int,
+                 segment_seconds: float = 2.0, retain_seconds: float = 60,
+                 codec: str = 'libx264', crf: int = 23, preset: str = 'veryfast'):
+        self.ffmpeg_path = ffmpeg_path
+        self.work_dir = work_dir
+        self.fps = fps
+        self.frames_per_segment = max(1, int(round(segment_seconds * fps)))
+        self.retain_seconds = retain_seconds
+        self.codec = codec
+        self.crf = crf
+        self.preset = preset
+
+        self.segments: List[Segment] = []
+        self._lock = threading.Lock()
+        self._completed = threading.Condition(self._lock)
+        self._frames: queue.Queue = queue.Queue(maxsize=self.frames_per_segment * 2)
+        self._finishing: queue.Queue = queue.Queue()
+        self._next_index = 0
+        self.running = False
+        self._worker: Optional[threading.Thread] = None
+        self._finisher: Optional[threading.Thread] = None
+
+        # Stats
+        self.frames_dropped = 0
+        self.segments_failed = 0
+
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    # ─── Lifecycle ───────────────────────────
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._worker = threading.Thread(target=self._encode_loop, daemon=True, name='SegmentEncode')
+        self._finisher = threading.Thread(target=self._finish_loop, daemon=True, name='SegmentFinish')
+        self._worker.start()
+        self._finisher.start()
+
+    def stop(self):
+        self.running = False
+        if self._worker:
+            self._worker.join(timeout=5.0)
+        self._finishing.put(None)
+        if self._finisher:
+            self._finisher.join(timeout=10.0)
+        with self._lock:
+            for seg in self.segments:
+                self._delete(seg)
+            self.segments.clear()
+
+    # ─── Input ───────────────────────────────
+
+    def add_frame(self, jpeg, timestamp: float, session_time_ms: int,
+                  telemetry: Any = None) -> bool:
+        """Queue one JPEG frame for encoding. Returns False if dropped."""
+        try:
+            self._frames.put_nowait((bytes(jpeg), timestamp, session_time_ms, telemetry))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            throttled.warning('segment_drop', "Segment encoder behind, dropping frames (%d total)",
+                              self.frames_dropped)
+            return False
+
+    # ─── Queries ─────────────────────────────
+
+    def segments_between(self, start_ts: float, end_ts: float) -> List[Segment]:
+        """Segments (complete or in-flight) overlapping [start_ts, end_ts]."""
+        with self._lock:
+            return self._between(start_ts, end_ts)
+
+    def pin_between(self, start_ts: float, end_ts: float) -> List[Segment]:
+        """Select and pin the segments overlapping [start_ts, end_ts] in one step, so
+        _prune cannot delete them in between. Release with unpin()."""
+        with self._lock:
+            segments = self._between(start_ts, end_ts)
+            for seg in segments:
+                seg.pins += 1
+            return segments
+
+    def _between(self, start_ts: float, end_ts: float) -> List[Segment]:
+        return [
+            seg for seg in self.segments
+            if seg.start_ts <= end_ts and (seg.end_ts >= start_ts or not seg.complete)
+        ]
+
+    def wait_complete(self, segments: List[Segment], timeout: float) -> bool:
+        """Block until every segment has been closed by ffmpeg."""
+        deadline = time.time() + timeout
+        with self._completed:
+            while not all(seg.complete for seg in segments):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._completed.wait(remaining)
+        return True
+
+    def pin(self, segments: List[Segment]):
+        with self._lock:
+            for seg in segments:
+                seg.pins += 1
+
+    def unpin(self, segments: List[Segment]):
+        with self._lock:
+            for seg in segments:
+                seg.pins -= 1
+
+    def concat(self, segments: List[Segment], output_path: str) -> EncodeResult:
+        """Stream-copy segments into a single MP4 (no re-encode)."""
+        usable = [seg for seg in segments if seg.ok]
+        if not usable:
+            return EncodeResult(ok=False, stderr='no usable segments')
+
+        list_path = output_path + '.concat.txt'
+        started = time.perf_counter()
+        try:
+            with open(list_path, 'w') as f:
+                for seg in usable:
+                    f.write(f"file '{os.path.abspath(seg.path)}'\n")
+            result = subprocess.run(
+                [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+                 '-f', 'concat', '-safe', '0', '-i', list_path,
+                 '-c', 'copy', '-movflags', '+faststart', output_path],
+                capture_output=True, timeout=self.CONCAT_TIMEOUT_S,
+            )
+            return EncodeResult(
+                ok=result.returncode == 0,
+                frames=sum(seg.frame_count for seg in usable),
+                seconds=time.perf_counter() - started,
+                returncode=result.returncode,
+                stderr=result.stderr.decode('utf-8', errors='replace')[-4096:],
+            )
+        except subprocess.TimeoutExpired:
+            return EncodeResult(ok=False, seconds=time.perf_counter() - started,
+                                stderr='concat timed out')
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    # ─── Workers ─────────────────────────────
+
+    def _encode_loop(self):
+        """Pipe queued frames into the current segment, rotating every N frames."""
+        pipe: Optional[FFmpegPipe] = None
+        seg: Optional[Segment] = None
+        last_frame = time.monotonic()
+
+        while self.running or not self._frames.empty():
+            try:
+                jpeg, ts, st, telemetry = self._frames.get(timeout=0.25)
+            except queue.Empty:
+                # Capture paused (no active session): close the open segment now
+                # rather than leave ffmpeg blocked on stdin until its watchdog fires
+                if pipe is not None and time.monotonic() - last_frame > self.IDLE_CLOSE_S:
+                    self._finishing.put((seg, pipe))
+                    seg, pipe = None, None
+                continue
+            last_frame = time.monotonic()
+
+            if pipe is None:
+                seg, pipe = self._open_segment(ts)
+                if pipe is None:
+                    continue
+
+            if not pipe.write(jpeg):
+                throttled.error('segment_write', "Segment %d: ffmpeg pipe closed early", seg.index)
+            seg.frame_timestamps.append(ts)
+            seg.session_times_ms.append(st)
+            seg.telemetry.append(telemetry)
+            seg.end_ts = ts
+            if seg.frame_count == self.frames_per_segment // 2:
+                seg.thumb_jpeg = jpeg
+
+            if seg.frame_count >= self.frames_per_segment:
+                self._finishing.put((seg, pipe))
+                seg, pipe = None, None
+
+        if pipe is not None:
+            self._finishing.put((seg, pipe))
+
+    def _open_segment(self, ts: float):
+        index = self._next_index
+        self._next_index += 1
+        seg = Segment(index=index, path=os.path.join(self.work_dir, f'seg_{index:06d}.ts'), start_ts=ts)
+        args = jpeg_input_args(self.fps) + [
+            '-c:v', self.codec,
+            '-crf', str(self.crf),
+            '-preset', self.preset,
+            '-pix_fmt', 'yuv420p',
+            '-g', str(self.frames_per_segment),
+            '-f', 'mpegts', seg.path,
+        ]
+        pipe = FFmpegPipe(self.ffmpeg_path, args, timeout_s=60, low_priority=True)
+        try:
+            pipe.start()
+        except OSError as e:
+            throttled.error('segment_start', "Failed to start segment encoder: %s", e)
+            return None, None
+        with self._lock:
+            self.segments.append(seg)
+        return seg, pipe
+
+    def _finish_loop(self):
+        """Wait for each closed segment's ffmpeg, then prune expired segments."""
+        while True:
+            item = self._finishing.get()
+            if item is None:
+                return
+            seg, pipe = item
+            result = pipe.close()
+            with self._completed:
+                seg.ok = result.ok and os.path.isfile(seg.path)
+                seg.size_bytes = os.path.getsize(seg.path) if seg.ok else 0
+                seg.complete = True
+                if not seg.ok:
+                    self.segments_failed += 1
+                    throttled.warning('segment_fail', "Segment %d failed: %s", seg.index, result.stderr[:200])
+                self._prune()
+                self._completed.notify_all()
+
+    def _prune(self):
+        """Drop complete, unpinned segments older than the retention window (lock held)."""
+        cutoff = time.time() - self.retain_seconds
+        keep = []
+        for seg in self.segments:
+            if seg.complete and seg.pins <= 0 and seg.end_ts < cutoff:
+                self._delete(seg)
+            else:
+                keep.append(seg)
+        self.segments = keep
+
+    @staticmethod
+    def _delete(seg: Segment):
+        try:
+            os.remove(seg.path)
+        except OSError:
+            pass
+
+    # ─── Stats ───────────────────────────────
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            complete = [s for s in self.segments if s.complete and s.ok]
+            return {
+                'segments': len(complete),
+                'seconds': round(sum(s.frame_count for s in complete) / max(1, self.fps), 1),
+                'disk_mb': round(sum(s.size_bytes for s in complete) / (1024 * 1024), 1),
+                'frames_dropped': self.frames_dropped,
+                'segments_failed': self.segments_failed,
+                'queue_depth': self._frames.qsize(),
+            }
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Seekable Block-Compressed Session Archive
+
+Race logs used to be appended as one gzip member per flush, so the only
+way to find "lap 40" or "telemetry:driver between t1 and t2" was to
+decompress the whole file from the start. This module writes the same
+all_events.jsonl.gz as a sequence of small, independently compressed
+gzip members (BGZF-style blocks) and indexes them:
+
+  - every block's gzip header carries an extra field with its total size
+    and a mini index: event count, wall-time range, sessionTime range,
+    player lap range and per-event-type counts
+  - close() appends a footer (empty gzip members holding the compressed
+    block index) and a fixed-size trailer pointing at it
+
+Readers load the footer with two small reads, pick the blocks whose
+ranges overlap a query and decompress only those. Without a footer (a
+logger that is still running, or crashed) the index is rebuilt by hopping
+from block header to block header. Everything is still a valid
+multi-member gzip file: `zcat`, gzip.open() and older tools read it
+unchanged, and legacy logs (plain multi-member gzip) are read
+sequentially.
+
+Usage:
+    python session_archive.py info race_logs/<session>/all_events.jsonl.gz
+    python session_archive.py query race_logs/<session>/all_events.jsonl.gz --event telemetry:driver --lap 40
+    python session_archive.py convert race_logs/<session>/all_events.jsonl.gz   # re-block a legacy log
+"""
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+BLOCK_BYTES = 256 * 1024        # target uncompressed bytes per block
+MAX_EXTRA_CHUNK = 60000         # footer index bytes per gzip extra field (limit 65535)
+
+GZIP_MAGIC = b'\x1f\x8b'
+FEXTRA = 0x04
+SUBFIELD_SIZE = b'OS'           # u32 total member size
+SUBFIELD_INDEX = b'OI'          # block mini index (JSON)
+SUBFIELD_FOOTER = b'OX'         # chunk of the compressed footer index
+SUBFIELD_TRAILER = b'OF'        # trailer: magic, version, footer offset, chunk count
+TRAILER_MAGIC = b'OBBX'
+TRAILER_DATA = struct.Struct('<4sHQI')
+EMPTY_DEFLATE = b'\x03\x00'
+
+
+# ═══════════════════════════════════════
+# Index
+# ═══════════════════════════════════════
+
+@dataclass
+class BlockInfo:
+    """One compressed block and what it contains."""
+    offset: int
+    size: int
+    count: int = 0
+    ts: Optional[Tuple[float, float]] = None       # wall time range
+    st: Optional[Tuple[float, float]] = None       # sessionTime range (s)
+    lap: Optional[Tuple[int, int]] = None          # player lap range
+    events: Dict[str, int] = field(default_factory=dict)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'n': self.count, 't': self.ts, 's': self.st, 'l': self.lap, 'e': self.events}
+
+    @classmethod
+    def from_json(cls, offset: int, size: int, d: Dict[str, Any]) -> 'BlockInfo':
+        def rng(v):
+            return tuple(v) if v else None
+        return cls(offset, size, d.get('n', 0), rng(d.get('t')), rng(d.get('s')), rng(d.get('l')), d.get('e') or {})
+
+    def overlaps(self, events: Optional[set] = None, ts: Optional[Tuple[float, float]] = None,
+                 st: Optional[Tuple[float, float]] = None, laps: Optional[Tuple[int, int]] = None) -> bool:
+        if events is not None and not events.intersection(self.events):
+            return False
+        for query, have in ((ts, self.ts), (st, self.st), (laps, self.lap)):
+            if query is None:
+                continue
+            if have is None or have[1] < query[0] or have[0] > query[1]:
+                return False
+        return True
+
+
+def event_session_time(data: Any) -> Optional[float]:
+    """sessionTime in seconds from an event payload, if it has one"""
+    if not isinstance(data, dict):
+        return None
+    if data.get('sessionTime') is not None:
+        return float(data['sessionTime'])
+    if data.get('sessionTimeMs') is not None:
+        return float(data['sessionTimeMs']) / 1000
+    return None
+
+
+def event_player_lap(event: str, data: Any) -> Optional[int]:
+    """Player lap from telemetry events, if present"""
+    if not isinstance(data, dict):
+        return None
+    if event == 'telemetry:driver':
+        for car in data.get('cars', []):
+            if car.get('isPlayer'):
+                return car.get('lap')
+        return None
+    if event == 'telemetry_update':
+        return data.get('lap')
+    return None
+
+
+def event_tags(events: Optional[Iterable[str]]) -> Optional[List[bytes]]:
+    """Byte patterns for a cheap pre-filter on event names (quoted, so any JSON spacing matches)"""
+    return [json.dumps(e).encode() for e in events] if events else None
+
+
+def decompress_block(raw: bytes) -> bytes:
+    """Inflate one or more concatenated gzip members."""
+    out = []
+    while raw:
+        d = zlib.decompressobj(wbits=31)
+        out.append(d.decompress(raw))
+        raw = d.unused_data
+    return b''.join(out)
+
+
+def _widen(rng, value):
+    if value is None:
+        return rng
+    return (value, value) if rng is None else (min(rng[0], value), max(rng[1], value))
+
+
+# ═══════════════════════════════════════
+# gzip member encoding
+# ═══════════════════════════════════════
+
+def _subfield(tag: bytes, data: bytes) -> bytes:
+    return tag + struct.pack('<H', len(data)) + data
+
+
+def _member(extra: bytes, deflated: bytes, crc: int, isize: int) -> bytes:
+    header = GZIP_MAGIC + bytes([8, FEXTRA]) + b'\0\0\0\0' + b'\0\xff' + struct.pack('<H', len(extra))
+    return header + extra + deflated + struct.pack('<II', crc & 0xffffffff, isize & 0xffffffff)
+
+
+def encode_block(payload: bytes, info: BlockInfo, level: int = 6) -> bytes:
+    """One gzip member with its size and mini index in the header."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(payload) + compressor.flush()
+    index = _subfield(SUBFIELD_INDEX, json.dumps(info.to_json(), separators=(',', ':')).encode())
+    size_field_len = 4 + 4
+    total = 10 + 2 + size_field_len + len(index) + len(deflated) + 8
+    extra = _subfield(SUBFIELD_SIZE, struct.pack('<I', total)) + index
+    return _member(extra, deflated, zlib.crc32(payload), len(payload))
+
+
+def _parse_extra(extra: bytes) -> Dict[bytes, bytes]:
+    fields, i = {}, 0
+    while i + 4 <= len(extra):
+        tag = extra[i:i + 2]
+        (n,) = struct.unpack_from('<H', extra, i + 2)
+        fields[tag] = extra[i + 4:i + 4 + n]
+        i += 4 + n
+    return fields
+
+
+def _read_member_extra(f) -> Optional[Dict[bytes, bytes]]:
+    """Extra subfields of the gzip member at the current position (None at EOF / no extra)."""
+    head = f.read(10)
+    if len(head) < 10 or head[:2] != GZIP_MAGIC:
+        return None
+    if not head[3] & FEXTRA:
+        return {}
+    (xlen,) = struct.unpack('<H', f.read(2))
+    return _parse_extra(f.read(xlen))
+
+
+# ═══════════════════════════════════════
+# Writer
+# ═══════════════════════════════════════
+
+class ArchiveWriter:
+    """
+    Appends events as indexed blocks. Not thread-safe: use from one
+    writer thread. Reopening an existing archive strips its footer (or
+    recovers the index from block headers) and keeps appending.
+    """
+
+    def __init__(self, path, block_bytes: int = BLOCK_BYTES, level: int = 6):
+        self.path = Path(path)
+        self.block_bytes = block_bytes
+        self.level = level
+        self.blocks: List[BlockInfo] = []
+        if self.path.exists() and self.path.stat().st_size:
+            reader = ArchiveReader(self.path)
+            if not reader.indexed:
+                raise ValueError(f"{self.path} is a legacy log; convert it before appending")
+            self.blocks = reader.blocks
+            data_end = reader.data_end
+            reader.close()
+            with open(self.path, 'r+b') as f:
+                f.truncate(data_end)
+        self._f = open(self.path, 'ab')
+
+    def write_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Encode, block and append events (each a {'ts', 'event', 'data'} dict). Returns bytes encoded."""
+        lines: List[bytes] = []
+        info = BlockInfo(0, 0)
+        size = total = 0
+        for evt in events:
+            line = json.dumps(evt, separators=(',', ':')).encode('utf-8') + b'\n'
+            name = evt.get('event', '')
+            data = evt.get('data')
+            info.count += 1
+            info.ts = _widen(info.ts, evt.get('ts'))
+            info.st = _widen(info.st, event_session_time(data))
+            info.lap = _widen(info.lap, event_player_lap(name, data))
+            info.events[name] = info.events.get(name, 0) + 1
+            lines.append(line)
+            size += len(line)
+            total += len(line)
+            if size >= self.block_bytes:
+                self._write_block(b''.join(lines), info)
+                lines, info, size = [], BlockInfo(0, 0), 0
+        if lines:
+            self._write_block(b''.join(lines), info)
+        self._f.flush()
+        return total
+
+    def _write_block(self, payload: bytes, info: BlockInfo):
+        info.offset = self._f.tell()
+        member = encode_block(payload, info, self.level)
+        info.size = len(member)
+        self._f.write(member)
+        self.blocks.append(info)
+
+    def close(self):
+        """Append the footer index and trailer."""
+        if self._f.closed:
+            return
+        index = {
+            'version': FORMAT_VERSION,
+            'blocks': [[b.offset, b.size, b.to_json()] for b in self.blocks],
+        }
+        packed = zlib.compress(json.dumps(index, separators=(',', ':')).encode(), 6)
+        footer_offset = self._f.tell()
+        chunks = [packed[i:i + MAX_EXTRA_CHUNK] for i in range(0, len(packed), MAX_EXTRA_CHUNK)] or [b'']
+        for chunk in chunks:
+            self._f.write(_member(_subfield(SUBFIELD_FOOTER, chunk), EMPTY_DEFLATE, 0, 0))
+        trailer = TRAILER_DATA.pack(TRAILER_MAGIC, FORMAT_VERSION, footer_offset, len(chunks))
+        self._f.write(_member(_subfield(SUBFIELD_TRAILER, trailer), EMPTY_DEFLATE, 0, 0))
+        self._f.close()
+
+
+TRAILER_SIZE = len(_member(_subfield(SUBFIELD_TRAILER, TRAILER_DATA.pack(TRAILER_MAGIC, 0, 0, 0)), EMPTY_DEFLATE, 0, 0))
+
+
+# ═══════════════════════════════════════
+# Reader
+# ═══════════════════════════════════════
+
+class ArchiveReader:
+    """
+    Random-access reader. `indexed` is False for legacy logs, which are
+    then read sequentially (all queries still work, just without skipping).
+
+    Usage:
+        archive = ArchiveReader('all_events.jsonl.gz')
+        for evt in archive.iter_events(events={'telemetry:driver'}, laps=(40, 40)):
+            ...
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._f = open(self.path, 'rb')
+        self.file_size = os.fstat(self._f.fileno()).st_size
+        self.blocks: List[BlockInfo] = []
+        self.indexed = False
+        self.has_footer = False
+        self.data_end = self.file_size
+        if not self._load_footer():
+            self._scan_blocks()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Index loading ───────────────────────
+
+    def _load_footer(self) -> bool:
+        if self.file_size < TRAILER_SIZE:
+            return False
+        self._f.seek(self.file_size - TRAILER_SIZE)
+        fields = _read_member_extra(self._f)
+        trailer = fields.get(SUBFIELD_TRAILER) if fields else None
+        if not trailer or len(trailer) != TRAILER_DATA.size:
+            return False
+        magic, version, footer_offset, chunk_count = TRAILER_DATA.unpack(trailer)
+        if magic != TRAILER_MAGIC or version > FORMAT_VERSION:
+            return False
+
+        self._f.seek(footer_offset)
+        packed = b''
+        for _ in range(chunk_count):
+            fields = _read_member_extra(self._f)
+            if fields is None or SUBFIELD_FOOTER not in fields:
+                return False
+            packed += fields[SUBFIELD_FOOTER]
+            self._f.read(len(EMPTY_DEFLATE) + 8)
+        index = json.loads(zlib.decompress(packed))
+        self.blocks = [BlockInfo.from_json(off, size, d) for off, size, d in index['blocks']]
+        self.indexed = self.has_footer = True
+        self.data_end = footer_offset
+        return True
+
+    def _scan_blocks(self):
+        """Rebuild the index by hopping block headers (no decompression)."""
+        offset = 0
+        blocks = []
+        while offset < self.file_size:
+            self._f.seek(offset)
+            fields = _read_member_extra(self._f)
+            if not fields or SUBFIELD_SIZE not in fields:
+                break
+            (size,) = struct.unpack('<I', fields[SUBFIELD_SIZE])
+            if offset + size > self.file_size:
+                break       # torn final block from a crash
+            info = json.loads(fields.get(SUBFIELD_INDEX) or b'{}')
+            blocks.append(BlockInfo.from_json(offset, size, info))
+            offset += size
+        if blocks or offset == 0 and self.file_size == 0:
+            self.blocks = blocks
+            self.indexed = True
+            self.data_end = offset
+        else:
+            # Legacy multi-member gzip: one pseudo-block covering everything
+            self.blocks = [BlockInfo(0, self.file_size, count=-1)]
+
+    # ─── Reading ─────────────────────────────
+
+    def read_raw(self, block: BlockInfo) -> bytes:
+        """Compressed bytes of one block (decompress with decompress_block)."""
+        self._f.seek(block.offset)
+        return self._f.read(block.size)
+
+    def read_block(self, block: BlockInfo) -> bytes:
+        """Decompressed payload of one block."""
+        return decompress_block(self.read_raw(block))
+
+    def select_blocks(self, events: Optional[Iterable[str]] = None, ts: Optional[Tuple[float, float]] = None,
+                      st: Optional[Tuple[float, float]] = None,
+                      laps: Optional[Tuple[int, int]] = None) -> List[BlockInfo]:
+        if not self.indexed:
+            return list(self.blocks)
+        wanted = set(events) if events else None
+        return [b for b in self.blocks if b.overlaps(wanted, ts, st, laps)]
+
+    def iter_lines(self, events: Optional[Iterable[str]] = None, ts=None, st=None, laps=None) -> Iterator[bytes]:
+        """Raw JSON lines from the selected blocks, pre-filtered on event name bytes."""
+        tags = event_tags(events)
+        if not self.indexed:
+            # Legacy log: stream it rather than inflating the whole file at once
+            with gzip.open(self.path, 'rb') as f:
+                for line in f:
+                    if tags is None or any(tag in line for tag in tags):
+                        yield line
+            return
+        for block in self.select_blocks(events, ts, st, laps):
+            for line in self.read_block(block).splitlines():
+                if tags is None or any(tag in line for tag in tags):
+                    yield line
+
+    def iter_events(self, events: Optional[Iterable[str]] = None, ts: Optional[Tuple[float, float]] = None,
+                    st: Optional[Tuple[float, float]] = None,
+                    laps: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, Any]]:
+        """Events matching every given filter (ranges are inclusive)."""
+        wanted = set(events) if events else None
+        for line in self.iter_lines(wanted, ts, st, laps):
+            try:
+                evt = json.loads(line)
+            except ValueError:
+                continue
+            name = evt.get('event')
+            if wanted is not None and name not in wanted:
+                continue
+            if ts is not None and not ts[0] <= evt.get('ts', 0) <= ts[1]:
+                continue
+            data = evt.get('data')
+            if st is not None:
+                value = event_session_time(data)
+                if value is None or not st[0] <= value <= st[1]:
+                    continue
+            if laps is not None:
+                value = event_player_lap(name, data)
+                if value is None or not laps[0] <= value <= laps[1]:
+                    continue
+            yield evt
+
+    def summary(self) -> Dict[str, Any]:
+        events: Dict[str, int] = {}
+        ts = st = lap = None
+        for b in self.blocks:
+            for name, n in b.events.items():
+                events[name] = events.get(name, 0) + n
+            for value in (b.ts or ()):
+                ts = _widen(ts, value)
+            for value in (b.st or ()):
+                st = _widen(st, value)
+            for value in (b.lap or ()):
+                lap = _widen(lap, value)
+        return {
+            'indexed': self.indexed,
+            'footer': self.has_footer,
+            'blocks': len(self.blocks),
+            'bytes': self.file_size,
+            'events': sum(b.count for b in self.blocks) if self.indexed else None,
+            'ts': ts, 'sessionTime': st, 'laps': lap,
+            'event_counts': events,
+        }
+
+
+def convert(path, out_path=None) -> Path:
+    """Re-write any all_events log (legacy gzip or plain JSONL) as an indexed archive."""
+    path = Path(path)
+    out_path = Path(out_path) if out_path else path.with_name(path.name + '.tmp')
+    if out_path.exists():
+        out_path.unlink()
+    writer = ArchiveWriter(out_path)
+    batch: List[Dict[str, Any]] = []
+    if path.suffix == '.gz':
+        with ArchiveReader(path) as reader:
+            lines = reader.iter_lines()
+            for line in lines:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= 5000:
+                    writer.write_events(batch)
+                    batch = []
+    else:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= 5000:
+                    writer.write_events(batch)
+                    batch = []
+    writer.write_events(batch)
+    writer.close()
+    if out_path.name.endswith('.tmp'):
+        final = path if path.suffix == '.gz' else path.with_name(path.name + '.gz')
+        os.replace(out_path, final)
+        return final
+    return out_path
+
+
+def _range(value: Optional[str], cast=float) -> Optional[Tuple]:
+    if value is None:
+        return None
+    lo, _, hi = value.partition(':')
+    return cast(lo), cast(hi or lo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Indexed race log archive tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    info = sub.add_parser('info', help='Print the archive index summary')
+    info.add_argument('path')
+
+    query = sub.add_parser('query', help='Print matching events as JSONL')
+    query.add_argument('path')
+    query.add_argument('--event', action='append', help='Event type (repeatable)')
+    query.add_argument('--ts', help='Wall time range T1:T2')
+    query.add_argument('--st', help='sessionTime range S1:S2 (seconds)')
+    query.add_argument('--lap', help='Player lap or range L1:L2')
+    query.add_argument('--count', action='store_true', help='Only print the number of matches')
+
+    conv = sub.add_parser('convert', help='Re-block a legacy all_events log in place')
+    conv.add_argument('paths', nargs='+')
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        with ArchiveReader(args.path) as reader:
+            print(json.dumps(reader.summary(), indent=2))
+    elif args.command == 'query':
+        start = time.time()
+        n = 0
+        with ArchiveReader(args.path) as reader:
+            blocks = reader.select_blocks(args.event, _range(args.ts), _range(args.st), _range(args.lap, int))
+            for evt in reader.iter_events(args.event, _range(args.ts), _range(args.st), _range(args.lap, int)):
+                n += 1
+                if not args.count:
+                    print(json.dumps(evt, separators=(',', ':')))
+            print(f"{n} events from {len(blocks)}/{len(reader.blocks)} blocks in {time.time() - start:.2f}s",
+                  file=sys.stderr)
+    else:
+        for path in args.paths:
+            size_in = Path(path).stat().st_size
+            out = convert(path)
+            print(f"  ✓ {out.name}: {size_in / 1024:.0f}KB → {out.stat().st_size / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Columnar Telemetry Cache - parse a session's telemetry once
+
+Rebuilding the player time series means inflating and parsing the whole
+all_events log every time a tool runs. The first read of a session now
+writes the parsed samples under <session>/telemetry_cache/<scope>/ as
+one .npy file per channel plus manifest.json; later runs np.load them
+with mmap_mode='r', which takes milliseconds and shares page cache
+between processes.
+
+Scopes:
+    player   the player car (one row per telemetry:driver event)
+    all      every car (rows interleaved, `car` indexes manifest['cars'])
+
+The player scope stores floats as float64, so samples rebuilt from it
+match the log exactly; the much larger all-cars scope stores float32 and
+rounds back to the shortest float32 repr when materialising CarSamples.
+
+manifest.json records the source log's size, mtime and SHA-1. A size or
+mtime change triggers a hash check: a touched or copied log keeps its
+cache, and a changed one is rebuilt. Builds go to a temporary directory
+that is renamed into place, so concurrent builders (several tools opening
+the same session) never see each other's half-written files.
+
+Without numpy the helpers fall back to streaming the log through
+session_log.
+
+Usage:
+    from session_cache import cached_cars, load_columns
+    cols = load_columns('race_logs/20260303_110231')        # player
+    speed = cols['speed'][cols['lap'] == 12]
+    for sample in cached_cars(log_dir, min_speed=1):         # CarSample records
+        ...
+
+    python session_cache.py                                  # build for every session
+    python session_cache.py race_logs/<session> --all-cars --rebuild
+    python session_cache.py race_logs/<session> --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from session_log import CarSample, SessionLog, find_sessions
+
+CACHE_VERSION = 2
+CACHE_DIR = "telemetry_cache"
+SCOPES = ('player', 'all')
+STALE_BUILD_SECONDS = 3600  # Leftover .tmp/.old build dirs older than this are swept
+
+# channel -> (CarSample attribute, array typecode, numpy dtype)
+CHANNELS: Dict[str, Tuple[str, str, str]] = {
+    'ts': ('ts', 'd', '<f8'),
+    'speed': ('speed', 'f', '<f4'),
+    'rpm': ('rpm', 'f', '<f4'),
+    'gear': ('gear', 'b', 'i1'),
+    'throttle': ('throttle', 'f', '<f4'),
+    'brake': ('brake', 'f', '<f4'),
+    'steering': ('steering', 'f', '<f4'),
+    'lap': ('lap', 'h', '<i2'),
+    'position': ('position', 'h', '<i2'),
+    'class_position': ('class_position', 'h', '<i2'),
+    'track_pct': ('track_pct', 'f', '<f4'),
+    'fuel_level': ('fuel_level', 'f', '<f4'),
+    'fuel_pct': ('fuel_pct', 'f', '<f4'),
+    'in_pit': ('in_pit', 'b', '|b1'),
+    'on_pit_road': ('on_pit_road', 'b', '|b1'),
+    'incident_count': ('incident_count', 'h', '<i2'),
+    'last_lap_time': ('last_lap_time', 'f', '<f4'),
+    'best_lap_time': ('best_lap_time', 'f', '<f4'),
+    'car': ('', 'H', '<u2'),            # index into manifest['cars']
+}
+CAR_FIELDS = ('driver_name', 'car_name', 'car_number', 'car_idx', 'is_player', 'i_rating')
+FLOAT32 = '<f4'
+
+
+def channel_dtype(name: str, scope: str) -> str:
+    """Stored dtype of a channel: float channels widen to float64 in the player scope"""
+    dtype = CHANNELS[name][2]
+    return '<f8' if dtype == FLOAT32 and scope == 'player' else dtype
+
+
+def cache_dir(log_dir: Path, scope: str = 'player') -> Path:
+    return Path(log_dir) / CACHE_DIR / scope
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _source_key(path: Path, with_hash: bool = True) -> Dict[str, Any]:
+    st = path.stat()
+    key = {'name': path.name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if with_hash:
+        key['sha1'] = file_hash(path)
+    return key
+
+
+# ═══════════════════════════════════════
+# Columns
+# ═══════════════════════════════════════
+
+class TelemetryColumns:
+    """
+    Loaded (memory-mapped) channels of one cache scope.
+
+    Usage:
+        cols = load_columns(log_dir)
+        cols['speed'], cols['lap'] ...         # numpy arrays, read-only
+        cols.for_driver('Jane Doe')            # channels masked to one car
+    """
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any], columns: Dict[str, Any]):
+        self.directory = directory
+        self.manifest = manifest
+        self.columns = columns
+        self.cars: List[Dict[str, Any]] = manifest.get('cars', [])
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __len__(self) -> int:
+        return self.manifest.get('rows', 0)
+
+    @property
+    def scope(self) -> str:
+        return self.manifest.get('scope', 'player')
+
+    def car_ids(self, driver: str) -> List[int]:
+        wanted = driver.lower()
+        return [i for i, car in enumerate(self.cars) if (car['driver_name'] or '').lower() == wanted]
+
+    def for_driver(self, driver: str) -> Dict[str, Any]:
+        """Channels restricted to one driver's rows (copies, not memory-mapped)"""
+        mask = np.isin(self.columns['car'], self.car_ids(driver))
+        return {name: col[mask] for name, col in self.columns.items()}
+
+    def samples(self, driver: Optional[str] = None, min_speed: Optional[float] = None) -> Iterator[CarSample]:
+        """Rows rebuilt as CarSample records (for code written against session_log)"""
+        mask = None
+        if driver:
+            mask = np.isin(self.columns['car'], self.car_ids(driver))
+        elif self.scope != 'player':
+            mask = np.isin(self.columns['car'], [i for i, car in enumerate(self.cars) if car['is_player']])
+        if min_speed is not None:
+            fast = self.columns['speed'] >= min_speed
+            mask = fast if mask is None else mask & fast
+        index = np.flatnonzero(mask) if mask is not None else range(len(self))
+        lists = {name: _as_python(self.columns[name][index]) for name in CHANNELS if name != 'car'}
+        car_ids = self.columns['car'][index].tolist()
+        car_info = [{k: car[k] for k in CAR_FIELDS} for car in self.cars]
+        for i, car_id in enumerate(car_ids):
+            fields = {CHANNELS[name][0]: values[i] for name, values in lists.items()}
+            fields.update(car_info[car_id])
+            yield CarSample(**fields)
+
+
+def _as_python(column) -> list:
+    """Column values as Python scalars; float32 goes through its shortest repr (0.1, not 0.10000000149)"""
+    if column.dtype == np.float32:
+        return column.astype(str).astype(np.float64).tolist()
+    return column.tolist()
+
+
+# ═══════════════════════════════════════
+# Build / load
+# ═══════════════════════════════════════
+
+def _read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(directory / "manifest.json") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == CACHE_VERSION else None
+
+
+def is_valid(log_dir: Path, scope: str = 'player') -> bool:
+    """Whether the cached scope still matches the session's event log"""
+    log = SessionLog(log_dir)
+    directory = cache_dir(log_dir, scope)
+    manifest = _read_manifest(directory)
+    if manifest is None or not log.exists:
+        return False
+    source = manifest['source']
+    current = _source_key(log.events_file, with_hash=False)
+    if source['name'] != current['name'] or source['size'] != current['size']:
+        return False
+    if source['mtime_ns'] == current['mtime_ns']:
+        return True
+    # Touched or copied: same bytes keep the cache
+    if file_hash(log.events_file) != source['sha1']:
+        return False
+    manifest['source']['mtime_ns'] = current['mtime_ns']
+    _write_json(directory / "manifest.json", manifest)
+    return True
+
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def build(log_dir: Path, scope: str = 'player', workers: Optional[int] = None) -> Path:
+    """Parse the session log into a cache scope. Returns the cache directory."""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is required for the telemetry cache")
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown cache scope: {scope}")
+    log = SessionLog(log_dir) if workers is None else SessionLog(log_dir, workers=workers)
+    if not log.exists:
+        raise FileNotFoundError(f"No all_events.jsonl(.gz) in {log_dir}")
+
+    start = time.time()
+    source = _source_key(log.events_file, with_hash=False)
+    channels = {name: channel_dtype(name, scope) for name in CHANNELS}
+    buffers = {
+        name: array('d' if channels[name] == '<f8' else typecode)
+        for name, (_, typecode, _) in CHANNELS.items()
+    }
+    attrs = [(buffers[name].append, attr) for name, (attr, _, _) in CHANNELS.items() if attr]
+    append_car = buffers['car'].append
+    car_ids: Dict[Tuple[str, Any], int] = {}
+    cars: List[Dict[str, Any]] = []
+
+    for sample in log.cars(all_cars=(scope == 'all')):
+        for append, attr in attrs:
+            append(getattr(sample, attr))
+        key = (sample.driver_name, sample.car_idx)
+        car_id = car_ids.get(key)
+        if car_id is None:
+            car_id = car_ids[key] = len(cars)
+            cars.append({k: getattr(sample, k) for k in CAR_FIELDS})
+        append_car(car_id)
+
+    # Write into a private directory, then rename it into place
+    directory = cache_dir(log_dir, scope)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    _sweep_stale(directory)
+    tmp = directory.with_name(f".{scope}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.mkdir()
+    installed = False
+    try:
+        for name, dtype in channels.items():
+            np.save(tmp / f"{name}.npy", np.frombuffer(buffers[name], dtype=buffers[name].typecode).astype(dtype))
+
+        # Hash what was read; if the log grew meanwhile the size check invalidates it next time
+        source['sha1'] = file_hash(log.events_file)
+        _write_json(tmp / "manifest.json", {
+            'version': CACHE_VERSION,
+            'scope': scope,
+            'source': source,
+            'rows': len(buffers['ts']),
+            'channels': channels,
+            'cars': cars,
+            'built': time.time(),
+            'build_seconds': round(time.time() - start, 3),
+        })
+        installed = _install(tmp, directory)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if installed:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return directory
+    # Couldn't swap (cache in use): this run reads the private build instead;
+    # a later build sweeps it once it is stale
+    return tmp
+
+
+def _sweep_stale(directory: Path):
+    """Remove private build / swap-aside dirs of this scope left by crashed or
+    fallback runs. Only old ones: a fresh one may belong to a running build."""
+    cutoff = time.time() - STALE_BUILD_SECONDS
+    for pattern in (f".{directory.name}.*.tmp", f".{directory.name}.*.old"):
+        for path in directory.parent.glob(pattern):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+def _install(tmp: Path, directory: Path) -> bool:
+    """
+    Swap a finished build into place. A directory can't be os.replace()d
+    over a non-empty one, so the current cache is renamed aside first. If
+    another process installs its build in between, that one is kept (both
+    were parsed from the same log) and ours is discarded by the caller.
+    Returns False if the current cache couldn't be moved aside.
+    """
+    old = directory.with_name(f".{directory.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.old")
+    try:
+        os.replace(directory, old)
+    except FileNotFoundError:
+        old = None
+    except OSError:
+        return False  # In use (e.g. memory-mapped on Windows)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        pass
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    return True
+
+
+def load_columns(log_dir: Path, all_cars: bool = False, rebuild: bool = False) -> TelemetryColumns:
+    """Memory-mapped channels for a session, building or refreshing the cache first if needed"""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is required for the telemetry cache")
+    scope = 'all' if all_cars else 'player'
+    directory = cache_dir(log_dir, scope)
+    if rebuild or not is_valid(log_dir, scope):
+        directory = build(log_dir, scope)
+    manifest = _read_manifest(directory)
+    columns = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in manifest['channels']}
+    return TelemetryColumns(directory, manifest, columns)
+
+
+def cached_cars(log_dir: Path, driver: Optional[str] = None,
+                min_speed: Optional[float] = None) -> Iterator[CarSample]:
+    """
+    Player (or named driver) samples via the cache, or straight from the
+    log when numpy is missing. A named driver uses the all-cars cache
+    unless it is the player.
+    """
+    if not NUMPY_AVAILABLE or not SessionLog(log_dir).exists:
+        yield from SessionLog(log_dir).cars(driver=driver, min_speed=min_speed)
+        return
+    cols = load_columns(log_dir)
+    if driver and not cols.car_ids(driver):
+        cols = load_columns(log_dir, all_cars=True)
+    yield from cols.samples(driver=driver, min_speed=min_speed)
+
+
+def clear(log_dir: Path):
+    directory = Path(log_dir) / CACHE_DIR
+    if directory.exists():
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the columnar telemetry cache for logged sessions')
+    parser.add_argument('sessions', nargs='*', help='race_logs/<session> directories (default: all)')
+    parser.add_argument('--all-cars', action='store_true', help='Also cache every car, not just the player')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if the cache is current')
+    parser.add_argument('--clear', action='store_true', help='Delete the cache instead of building it')
+    args = parser.parse_args()
+
+    sessions = [Path(s) for s in args.sessions] or find_sessions()
+    if not sessions:
+        print("No race log sessions found")
+        return
+
+    for session in sessions:
+        if args.clear:
+            clear(session)
+            print(f"  🗑️ {session.name}: cache cleared")
+            continue
+        for scope in (('player', 'all') if args.all_cars else ('player',)):
+            if not args.rebuild and is_valid(session, scope):
+                print(f"  ✓ {session.name} [{scope}]: current")
+                continue
+            start = time.time()
+            try:
+                directory = build(session, scope)
+            except Exception as e:
+                print(f"  ✗ {session.name} [{scope}]: {e}")
+                continue
+            manifest = _read_manifest(directory)
+            size = sum(p.stat().st_size for p in directory.glob('*.npy'))
+            print(f"  ✓ {session.name} [{scope}]: {manifest['rows']:,} rows, {len(manifest['cars'])} cars, "
+                  f"{size / 1024 / 1024:.1f}MB in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Session Log Reader - one streaming reader for race_logs/<session>
+
+Every offline tool used to carry its own open_jsonl + json.loads loop
+over all_events.jsonl(.gz), each with a different idea of gz support and
+of which field holds the lap distance (trackPct, lapDistPct or pos.s).
+This module is the shared replacement:
+
+  - SessionLog(dir).events(types, ts=..., laps=...)   → Event records
+  - SessionLog(dir).cars(driver=..., all_cars=...)     → CarSample records
+  - session_info(), incidents(), stats(), drivers(), count()
+
+Lines are rejected on cheap byte matches (event name, isPlayer flag,
+driver name) before json.loads. Indexed archives (see session_archive.py)
+skip blocks that cannot match, and their gzip blocks are inflated on a
+thread pool (zlib releases the GIL) while the caller parses. Legacy gzip
+logs and plain .jsonl files are streamed sequentially.
+
+Usage:
+    from session_log import SessionLog
+    log = SessionLog('race_logs/20260303_110231')
+    for s in log.cars(min_speed=1):
+        print(s.ts, s.lap, s.track_pct, s.speed_mph)
+
+    python session_log.py race_logs/<session>              # summary
+    python session_log.py race_logs/<session> --driver "Jane Doe" --laps 5:6
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from session_archive import ArchiveReader, decompress_block, event_player_lap, event_tags
+
+LOG_DIR = Path(__file__).parent / "race_logs"
+
+TELEMETRY_EVENT = 'telemetry:driver'
+SESSION_EVENTS = ('session:active', 'session_info')
+INCIDENT_EVENT = 'incident:new'
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+PLAYER_TAGS = (b'"isPlayer":true', b'"isPlayer": true')
+
+
+def find_events_file(log_dir: Path) -> Optional[Path]:
+    """all_events.jsonl.gz (preferred) or all_events.jsonl in a session directory"""
+    for name in ('all_events.jsonl.gz', 'all_events.jsonl'):
+        path = Path(log_dir) / name
+        if path.exists():
+            return path
+    return None
+
+
+def find_sessions(log_base: Path = LOG_DIR) -> List[Path]:
+    """Session directories with an event log, oldest first"""
+    if not log_base.exists():
+        return []
+    return sorted(d for d in log_base.iterdir() if d.is_dir() and find_events_file(d))
+
+
+def track_pct(car: Dict[str, Any]) -> float:
+    """Lap distance fraction 0-1, whichever field the logger version used"""
+    value = car.get('trackPct') or car.get('lapDistPct')
+    if value:
+        return value
+    pos = car.get('pos')
+    return (pos.get('s') or 0) if isinstance(pos, dict) else 0
+
+
+# ═══════════════════════════════════════
+# Records
+# ═══════════════════════════════════════
+
+@dataclass
+class Event:
+    """One logged event"""
+    ts: float
+    event: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class CarSample:
+    """One car from a telemetry:driver event. Units as logged: m/s, 0-1 pedals."""
+    ts: float
+    driver_name: str = ''
+    car_name: str = ''
+    car_number: str = ''
+    car_idx: Optional[int] = None
+    is_player: bool = False
+    speed: float = 0.0
+    rpm: float = 0.0
+    gear: int = 0
+    throttle: float = 0.0
+    brake: float = 0.0
+    steering: float = 0.0
+    lap: int = 0
+    position: int = 0
+    class_position: int = 0
+    track_pct: float = 0.0
+    fuel_level: float = 0.0
+    fuel_pct: float = 0.0
+    in_pit: bool = False
+    on_pit_road: bool = False
+    incident_count: int = 0
+    last_lap_time: float = 0.0
+    best_lap_time: float = 0.0
+    i_rating: int = 0
+
+    @classmethod
+    def from_car(cls, ts: float, car: Dict[str, Any]) -> 'CarSample':
+        return cls(
+            ts=ts,
+            driver_name=car.get('driverName') or '',
+            car_name=car.get('carName') or '',
+            car_number=car.get('carNumber') or '',
+            car_idx=car.get('carIdx', car.get('carId')),
+            is_player=bool(car.get('isPlayer')),
+            speed=car.get('speed') or 0,
+            rpm=car.get('rpm') or 0,
+            gear=car.get('gear') or 0,
+            throttle=car.get('throttle') or 0,
+            brake=car.get('brake') or 0,
+            steering=car.get('steering') or 0,
+            lap=car.get('lap') or 0,
+            position=car.get('position') or 0,
+            class_position=car.get('classPosition') or 0,
+            track_pct=track_pct(car),
+            fuel_level=car.get('fuelLevel') or 0,
+            fuel_pct=car.get('fuelPct') or 0,
+            in_pit=bool(car.get('inPit')),
+            on_pit_road=bool(car.get('onPitRoad')),
+            incident_count=car.get('incidentCount') or 0,
+            last_lap_time=car.get('lastLapTime') or 0,
+            best_lap_time=car.get('bestLapTime') or 0,
+            i_rating=car.get('iRating') or 0,
+        )
+
+    @property
+    def speed_mph(self) -> float:
+        return self.speed * 2.237
+
+    @property
+    def speed_kph(self) -> float:
+        return self.speed * 3.6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Row in the camelCase layout of the logger's player_telemetry view"""
+        return {
+            'ts': self.ts,
+            'speed': self.speed,
+            'speed_mph': self.speed_mph,
+            'rpm': self.rpm,
+            'gear': self.gear,
+            'throttle': self.throttle,
+            'brake': self.brake,
+            'steering': self.steering,
+            'lap': self.lap,
+            'position': self.position,
+            'classPosition': self.class_position,
+            'trackPct': self.track_pct,
+            'fuelLevel': self.fuel_level,
+            'fuelPct': self.fuel_pct,
+            'inPit': self.in_pit,
+            'onPitRoad': self.on_pit_road,
+            'incidentCount': self.incident_count,
+            'driverName': self.driver_name,
+            'carName': self.car_name,
+            'lastLapTime': self.last_lap_time,
+            'bestLapTime': self.best_lap_time,
+        }
+
+
+def merge_session_info(rows: Iterable[Event]) -> Dict[str, Any]:
+    """Session metadata merged across events; trackName/sessionType normalized from track/session"""
+    info: Dict[str, Any] = {}
+    for row in rows:
+        if isinstance(row.data, dict):
+            info.update({k: v for k, v in row.data.items() if v not in (None, '')})
+    if info.get('track') and not info.get('trackName'):
+        info['trackName'] = info['track']
+    if info.get('session') and not info.get('sessionType'):
+        info['sessionType'] = info['session']
+    return info
+
+
+# ═══════════════════════════════════════
+# Reader
+# ═══════════════════════════════════════
+
+def _inflate_and_filter(raw: bytes, tags: Optional[List[bytes]], extra: Optional[Tuple[bytes, ...]]) -> List[bytes]:
+    """Worker: one block → matching lines"""
+    lines = decompress_block(raw).splitlines()
+    if tags is not None:
+        lines = [line for line in lines if any(tag in line for tag in tags)]
+    if extra is not None:
+        lines = [line for line in lines if any(tag in line for tag in extra)]
+    return lines
+
+
+class SessionLog:
+    """
+    Reader for one race_logs/<session> directory (or a bare events file).
+
+    Usage:
+        log = SessionLog(log_dir)
+        info = log.session_info()
+        for sample in log.cars():              # player car
+            ...
+        for evt in log.events(['race:event']):
+            ...
+    """
+
+    def __init__(self, path, workers: int = DEFAULT_WORKERS):
+        path = Path(path)
+        if path.is_dir():
+            self.log_dir = path
+            self.events_file = find_events_file(path)
+        else:
+            self.log_dir = path.parent
+            self.events_file = path if path.exists() else None
+        self.workers = max(1, workers)
+
+    @property
+    def exists(self) -> bool:
+        return self.events_file is not None
+
+    @property
+    def size(self) -> int:
+        return self.events_file.stat().st_size if self.events_file else 0
+
+    # ─── Raw lines ───────────────────────────
+
+    def _lines(self, types: Optional[Iterable[str]], ts, laps, extra: Optional[Tuple[bytes, ...]]) -> Iterator[bytes]:
+        if self.events_file is None:
+            return
+        tags = event_tags(types)
+        if self.events_file.suffix == '.gz':
+            with ArchiveReader(self.events_file) as archive:
+                if archive.indexed:
+                    yield from self._parallel_lines(archive, archive.select_blocks(types, ts, None, laps), tags, extra)
+                    return
+            source = gzip.open(self.events_file, 'rb')
+        else:
+            source = open(self.events_file, 'rb')
+        with source as f:
+            for line in f:
+                if tags is not None and not any(tag in line for tag in tags):
+                    continue
+                if extra is not None and not any(tag in line for tag in extra):
+                    continue
+                yield line
+
+    def _parallel_lines(self, archive: ArchiveReader, blocks, tags, extra) -> Iterator[bytes]:
+        """Inflate blocks on a thread pool, a bounded window ahead of the consumer, in order"""
+        if self.workers == 1 or len(blocks) < 2:
+            for block in blocks:
+                yield from _inflate_and_filter(archive.read_raw(block), tags, extra)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='SessionLogInflate') as pool:
+            pending = deque()
+            it = iter(blocks)
+            try:
+                for block in it:
+                    pending.append(pool.submit(_inflate_and_filter, archive.read_raw(block), tags, extra))
+                    if len(pending) >= self.workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    # ─── Records ─────────────────────────────
+
+    def events(self, types: Optional[Iterable[str]] = None, ts: Optional[Tuple[float, float]] = None,
+               laps: Optional[Tuple[int, int]] = None, limit: Optional[int] = None) -> Iterator[Event]:
+        """
+        Events in log order. `types` restricts event names, `ts` is an
+        inclusive wall-time range, `laps` an inclusive player-lap range
+        (only events that carry a player lap can match it).
+        """
+        wanted = set(types) if types else None
+        n = 0
+        for line in self._lines(wanted, ts, laps, None):
+            try:
+                evt = json.loads(line)
+            except ValueError:
+                continue
+            name = evt.get('event', '')
+            if wanted is not None and name not in wanted:
+                continue
+            evt_ts = evt.get('ts', 0)
+            if ts is not None and not ts[0] <= evt_ts <= ts[1]:
+                continue
+            data = evt.get('data') or {}
+            if laps is not None:
+                lap = event_player_lap(name, data)
+                if lap is None or not laps[0] <= lap <= laps[1]:
+                    continue
+            yield Event(evt_ts, name, data)
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+    def cars(self, driver: Optional[str] = None, drivers: Optional[Iterable[str]] = None, all_cars: bool = False,
+             min_speed: Optional[float] = None, ts: Optional[Tuple[float, float]] = None,
+             laps: Optional[Tuple[int, int]] = None, limit: Optional[int] = None) -> Iterator[CarSample]:
+        """
+        Car samples from telemetry:driver events. Default is the player car;
+        `driver`/`drivers` select by name (case-insensitive), `all_cars`
+        yields every car. `min_speed` (m/s) drops slower samples and `limit`
+        caps the number of events read.
+        """
+        names = [driver] if driver else list(drivers or [])
+        wanted = {n.lower() for n in names} or None
+        lowered = None
+        extra = None
+        if wanted:
+            # Case-insensitive byte match on the quoted name (ASCII names only)
+            if all(n.isascii() for n in wanted):
+                lowered = tuple(json.dumps(n).encode() for n in wanted)
+        elif not all_cars:
+            extra = PLAYER_TAGS
+
+        # The archive index only knows the player's lap range
+        block_laps = laps if extra is PLAYER_TAGS else None
+        n = 0
+        for line in self._lines((TELEMETRY_EVENT,), ts, block_laps, extra):
+            if lowered is not None:
+                low = line.lower()
+                if not any(tag in low for tag in lowered):
+                    continue
+            try:
+                evt = json.loads(line)
+            except ValueError:
+                continue
+            if evt.get('event') != TELEMETRY_EVENT:
+                continue
+            evt_ts = evt.get('ts', 0)
+            if ts is not None and not ts[0] <= evt_ts <= ts[1]:
+                continue
+            for car in (evt.get('data') or {}).get('cars', []):
+                if wanted:
+                    if (car.get('driverName') or '').lower() not in wanted:
+                        continue
+                elif not all_cars and not car.get('isPlayer'):
+                    continue
+                if laps is not None and not laps[0] <= (car.get('lap') or 0) <= laps[1]:
+                    continue
+                if min_speed is not None and (car.get('speed') or 0) < min_speed:
+                    continue
+                yield CarSample.from_car(evt_ts, car)
+                if not all_cars and not wanted:
+                    break
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+    def count(self, types: Optional[Iterable[str]] = None) -> int:
+        """Number of events, optionally of some types (from the archive index when there is one)"""
+        if self.events_file is None:
+            return 0
+        wanted = set(types) if types else None
+        if self.events_file.suffix == '.gz':
+            with ArchiveReader(self.events_file) as archive:
+                if archive.indexed:
+                    if wanted is None:
+                        return sum(b.count for b in archive.blocks)
+                    return sum(n for b in archive.blocks for name, n in b.events.items() if name in wanted)
+        return sum(1 for _ in self._lines(wanted, None, None, None))
+
+    def drivers(self, limit: int = 10) -> Dict[str, CarSample]:
+        """Drivers seen in the first `limit` telemetry events → their first sample"""
+        found: Dict[str, CarSample] = {}
+        for sample in self.cars(all_cars=True, limit=limit):
+            if sample.driver_name and sample.driver_name not in found:
+                found[sample.driver_name] = sample
+        return found
+
+    # ─── Side files ──────────────────────────
+
+    def side_rows(self, name: str, event: str = '') -> Optional[List[Event]]:
+        """Rows of a small live view file (incidents.jsonl, session.jsonl), None if it is missing"""
+        for filename in (name, name + '.gz'):
+            path = self.log_dir / filename
+            if not path.exists():
+                continue
+            opener = gzip.open if path.suffix == '.gz' else open
+            rows = []
+            with opener(path, 'rb') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    rows.append(Event(row.get('ts', 0), row.get('event', event), row.get('data', row)))
+            return rows
+        return None
+
+    def incidents(self) -> List[Event]:
+        rows = self.side_rows('incidents.jsonl', INCIDENT_EVENT)
+        return rows if rows is not None else list(self.events((INCIDENT_EVENT,)))
+
+    def session_info(self) -> Dict[str, Any]:
+        """Merged session metadata (see merge_session_info)"""
+        rows = self.side_rows('session.jsonl')
+        return merge_session_info(rows if rows is not None else self.events(SESSION_EVENTS))
+
+    def stats(self) -> Dict[str, Any]:
+        path = self.log_dir / "stats.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+
+def _range(value: Optional[str], cast=float) -> Optional[Tuple]:
+    if value is None:
+        return None
+    lo, _, hi = value.partition(':')
+    return cast(lo), cast(hi or lo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read a logged race session')
+    parser.add_argument('session', help='race_logs/<session> directory or events file')
+    parser.add_argument('--driver', help='Print samples for this driver (default: player)')
+    parser.add_argument('--all-cars', action='store_true', help='Print samples for every car')
+    parser.add_argument('--laps', help='Lap or range L1:L2')
+    parser.add_argument('--samples', action='store_true', help='Print samples as JSONL instead of a summary')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Decompression threads')
+    args = parser.parse_args()
+
+    log = SessionLog(args.session, workers=args.workers)
+    if not log.exists:
+        print(f"❌ No all_events.jsonl(.gz) in {args.session}")
+        sys.exit(1)
+
+    start = time.time()
+    samples = log.cars(driver=args.driver, all_cars=args.all_cars, laps=_range(args.laps, int))
+    if args.samples:
+        for s in samples:
+            print(json.dumps(s.to_dict(), separators=(',', ':')))
+        return
+
+    n = 0
+    laps = set()
+    first = last = None
+    for s in samples:
+        n += 1
+        laps.add(s.lap)
+        first = first or s
+        last = s
+    info = log.session_info()
+    print(f"📁 {log.events_file} ({log.size / 1024 / 1024:.1f}MB)")
+    print(f"   Track: {info.get('trackName', 'Unknown')}  Session: {info.get('sessionType', 'Unknown')}")
+    if first:
+        print(f"   Driver: {first.driver_name}  Car: {first.car_name}")
+        print(f"   Samples: {n:,}  Laps: {min(laps)}-{max(laps)}  Span: {last.ts - first.ts:.0f}s")
+    else:
+        print("   No matching samples")
+    print(f"   Read in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Session Pipeline - every report from one read of the log
+
+Each offline report used to re-read all_events on its own. IDP alone read
+it twice: once for telemetry, once for flags. Here every analyzer is a
+streaming accumulator:
+
+    begin(ctx)                  once, before the pass
+    feed(evt, player)           for each event the analyzer asked for;
+                                `player` is the player CarSample on
+                                telemetry:driver events (parsed once,
+                                shared by all analyzers)
+    finish(ctx) -> report text  once, after the pass; ctx carries
+                                session info, incidents and stats
+
+The pipeline takes the union of the event types the analyzers want and
+makes a single decompress-and-parse pass through session_log. Session
+info and incidents come from the small live files when they exist;
+otherwise their events are collected during the same pass.
+
+Analyzers live next to the tools whose report they produce and register
+under a name with @register:
+
+    idp        process_logged_session   IDP_ANALYSIS.md (+ summary JSON)
+    style      analyze_driving_style    DRIVING_ANALYSIS.md (BSI/TCI/CPI-2/RCI)
+    strategy   analyze_strategy         STRATEGY_ANALYSIS.md (stints, pace, fuel)
+    report     generate_race_report     RACE_REPORT.md (lap table, drivers)
+
+Usage:
+    python session_pipeline.py race_logs/<session>                 # all reports
+    python session_pipeline.py race_logs/<session> --only idp,style
+"""
+import argparse
+import importlib
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from session_log import (
+    INCIDENT_EVENT, SESSION_EVENTS, TELEMETRY_EVENT, CarSample, Event, SessionLog,
+    find_sessions, merge_session_info,
+)
+
+# Modules that define the registered analyzers (imported on demand)
+ANALYZER_MODULES = ('process_logged_session', 'analyze_driving_style', 'analyze_strategy', 'generate_race_report')
+
+
+@dataclass
+class SessionContext:
+    """What analyzers can see besides the event stream"""
+    log_dir: Path
+    log: SessionLog
+    stats: Dict[str, Any] = field(default_factory=dict)
+    session_info: Dict[str, Any] = field(default_factory=dict)
+    incidents: List[Event] = field(default_factory=list)
+
+
+class Analyzer:
+    """
+    Base class for pipeline accumulators.
+
+    Subclasses set `events` (event types to receive besides telemetry),
+    `player` (receive telemetry:driver events with the player sample),
+    `all_cars` (receive telemetry:driver events even without a player
+    car) and `report_file` (written with the text finish() returns).
+    `driver` names the driver for driver-specific reports (None: player);
+    finish() may leave structured output in `result`.
+    """
+    name = ''
+    events: tuple = ()
+    player = True
+    all_cars = False
+    report_file: Optional[str] = None
+    result: Any = None
+
+    def __init__(self, driver: Optional[str] = None):
+        self.driver = driver
+
+    def begin(self, ctx: SessionContext):
+        pass
+
+    def feed(self, evt: Event, player: Optional[CarSample]):
+        pass
+
+    def finish(self, ctx: SessionContext) -> Optional[str]:
+        return None
+
+
+REGISTRY: Dict[str, Callable[..., Analyzer]] = {}
+
+
+def register(name: str):
+    """Class decorator: make an Analyzer available to the pipeline CLI by name"""
+    def wrap(cls):
+        cls.name = name
+        REGISTRY[name] = cls
+        return cls
+    return wrap
+
+
+def load_registry() -> Dict[str, Callable[..., Analyzer]]:
+    for module in ANALYZER_MODULES:
+        importlib.import_module(module)
+    return REGISTRY
+
+
+class SessionPipeline:
+    """
+    Runs analyzers over one session in a single pass.
+
+    Usage:
+        pipeline = SessionPipeline(log_dir, [IDPAnalyzer(), DrivingStyleAnalyzer()])
+        reports = pipeline.run()       # {name: report text}
+
+    An analyzer that raises is dropped from the pass (its report is None,
+    the error is kept in `errors`); the others still finish.
+    """
+
+    def __init__(self, log_dir: Path, analyzers: List[Analyzer]):
+        self.log_dir = Path(log_dir)
+        self.log = SessionLog(self.log_dir)
+        self.analyzers = analyzers
+        self.errors: Dict[str, str] = {}
+        self.events_read = 0
+        self.seconds = 0.0
+
+    def run(self, write: bool = True) -> Dict[str, Optional[str]]:
+        if not self.log.exists:
+            raise FileNotFoundError(f"No all_events.jsonl(.gz) in {self.log_dir}")
+        start = time.time()
+        ctx = SessionContext(self.log_dir, self.log, stats=self.log.stats())
+
+        # Small side files when present, else collect their events in the pass
+        session_rows = self.log.side_rows('session.jsonl')
+        incidents = self.log.side_rows('incidents.jsonl', INCIDENT_EVENT)
+        collect: Set[str] = set()
+        if session_rows is None:
+            session_rows = []
+            collect.update(SESSION_EVENTS)
+        if incidents is None:
+            incidents = []
+            collect.add(INCIDENT_EVENT)
+
+        self.errors = {}
+        active = list(self.analyzers)
+        routes, telemetry = self._routes(active)
+        types = set(routes) | collect | ({TELEMETRY_EVENT} if telemetry else set())
+
+        def drop(analyzer: Analyzer, stage: str, e: Exception):
+            # Rebuilt lists take effect from the next event
+            nonlocal routes, telemetry
+            self.errors[analyzer.name] = f"{stage}: {type(e).__name__}: {e}"
+            if analyzer in active:
+                active.remove(analyzer)
+                routes, telemetry = self._routes(active)
+
+        # Session info first so begin() can use it when it came from session.jsonl
+        ctx.session_info = merge_session_info(session_rows)
+        for analyzer in self.analyzers:
+            try:
+                analyzer.begin(ctx)
+            except Exception as e:
+                drop(analyzer, 'begin', e)
+
+        for evt in self.log.events(types):
+            self.events_read += 1
+            if evt.event == TELEMETRY_EVENT:
+                player = None
+                for car in evt.data.get('cars', []):
+                    if car.get('isPlayer'):
+                        player = CarSample.from_car(evt.ts, car)
+                        break
+                for analyzer in telemetry:
+                    if player is not None or analyzer.all_cars:
+                        try:
+                            analyzer.feed(evt, player)
+                        except Exception as e:
+                            drop(analyzer, 'feed', e)
+                continue
+            if evt.event in collect:
+                (incidents if evt.event == INCIDENT_EVENT else session_rows).append(evt)
+            for analyzer in routes.get(evt.event, ()):
+                try:
+                    analyzer.feed(evt, None)
+                except Exception as e:
+                    drop(analyzer, 'feed', e)
+
+        ctx.session_info = merge_session_info(session_rows)
+        ctx.incidents = incidents
+        reports: Dict[str, Optional[str]] = {analyzer.name: None for analyzer in self.analyzers}
+        for analyzer in list(active):
+            try:
+                report = analyzer.finish(ctx)
+            except Exception as e:
+                drop(analyzer, 'finish', e)
+                continue
+            reports[analyzer.name] = report
+            if write and report is not None and analyzer.report_file:
+                with open(self.log_dir / analyzer.report_file, 'w', encoding='utf-8') as f:
+                    f.write(report)
+        self.seconds = time.time() - start
+        return reports
+
+    @staticmethod
+    def _routes(analyzers: List[Analyzer]):
+        """Event type → analyzers that asked for it, plus the telemetry analyzers"""
+        routes: Dict[str, List[Analyzer]] = {}
+        telemetry: List[Analyzer] = []
+        for analyzer in analyzers:
+            for name in analyzer.events:
+                routes.setdefault(name, []).append(analyzer)
+            if analyzer.player or analyzer.all_cars:
+                telemetry.append(analyzer)
+        return routes, telemetry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate all session reports in one pass over the log')
+    parser.add_argument('sessions', nargs='*', help='race_logs/<session> directories (default: most recent)')
+    parser.add_argument('--only', help='Comma-separated analyzers to run (default: all)')
+    parser.add_argument('--driver', '-d', help='Driver name for driver-specific reports (IDP incidents)')
+    args = parser.parse_args()
+
+    registry = load_registry()
+    names = args.only.split(',') if args.only else list(registry)
+    unknown = [n for n in names if n not in registry]
+    if unknown:
+        parser.error(f"unknown analyzer(s): {', '.join(unknown)} (available: {', '.join(registry)})")
+
+    sessions = [Path(s) for s in args.sessions] or find_sessions()[-1:]
+    if not sessions:
+        print("No race log sessions found")
+        return
+
+    for session in sessions:
+        analyzers = [registry[n](driver=args.driver) for n in names]
+        pipeline = SessionPipeline(session, analyzers)
+        try:
+            reports = pipeline.run()
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            continue
+        except Exception as e:
+            # One unreadable session shouldn't stop the rest
+            print(f"❌ {session.name}: {type(e).__name__}: {e}")
+            continue
+        print(f"📁 {session.name}: {pipeline.events_read:,} events in one pass, {pipeline.seconds:.1f}s")
+        for analyzer in analyzers:
+            if analyzer.name in pipeline.errors:
+                print(f"   ❌ {analyzer.name}: {pipeline.errors[analyzer.name]}")
+            elif reports.get(analyzer.name) is None:
+                print(f"   ⚠️ {analyzer.name}: not enough data")
+            else:
+                print(f"   ✅ {analyzer.name}: {session / analyzer.report_file}")
+
+
+if __name__ == "__main__":
+    # Tools register into the importable module's REGISTRY, not __main__'s
+    import session_pipeline
+    session_pipeline.main()
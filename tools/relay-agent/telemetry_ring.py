@@ -0,0 +1,238 @@
+"""
+OBB Replay Intelligence — Player Telemetry Ring
+
+High-rate (iRacing tick, 60Hz) player telemetry history for clip
+sidecars, decoupled from the relay's network poll rate.
+
+ScreenCapture used to tag frames with whatever snapshot the 10Hz
+telemetry loop last pushed, so a 15fps clip repeated the same sample
+across several frames. The sampler thread here records iRacing ticks
+(every tick, or decimated to a lower rate_hz) into a fixed-size columnar
+ring (typed arrays, no per-sample objects), and clip building
+interpolates the ring to each frame's grab timestamp:
+
+  - continuous channels (speed, rpm, pedals, steering, fuel) are linearly
+    interpolated; lap_dist_pct is interpolated across the S/F line wrap
+  - discrete channels (gear, lap, position, incidents) take the sample at
+    or before the frame
+
+The sampler reads through its own IRSDK handle so it never contends with
+the main loop's frozen frame.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import irsdk
+    IRSDK_AVAILABLE = True
+except ImportError:
+    IRSDK_AVAILABLE = False
+
+from log_throttle import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
+
+# (channel, iRacing variable)
+CONTINUOUS_CHANNELS = [
+    ('speed', 'Speed'),
+    ('rpm', 'RPM'),
+    ('throttle', 'Throttle'),
+    ('brake', 'Brake'),
+    ('steering', 'SteeringWheelAngle'),
+    ('fuel_level', 'FuelLevel'),
+    ('fuel_pct', 'FuelLevelPct'),
+    ('lap_dist_pct', 'LapDistPct'),
+]
+DISCRETE_CHANNELS = [
+    ('gear', 'Gear'),
+    ('lap', 'Lap'),
+    ('position', 'PlayerCarPosition'),
+    ('incident_count', 'PlayerCarMyIncidentCount'),
+]
+WRAPPING_CHANNELS = {'lap_dist_pct'}
+IRACING_TICK_HZ = 60   # SessionTick rate; the ring can't sample faster than this
+
+
+class TelemetryRing:
+    """
+    Fixed-capacity ring of timestamped player samples, stored per channel.
+
+    Thread-safe: the sampler appends while clip encode workers read.
+    """
+
+    def __init__(self, seconds: float = 120, rate_hz: float = 60):
+        # The sampler records at this rate, so capacity covers `seconds` of history
+        self.rate_hz = min(rate_hz, IRACING_TICK_HZ)
+        self.capacity = max(2, int(seconds * self.rate_hz))
+        self._ts = array('d', bytes(8 * self.capacity))
+        self._cont = {name: array('f', bytes(4 * self.capacity)) for name, _ in CONTINUOUS_CHANNELS}
+        self._disc = {name: array('i', bytes(4 * self.capacity)) for name, _ in DISCRETE_CHANNELS}
+        self._head = 0          # next write slot
+        self._size = 0
+        self._lock = threading.Lock()
+        self.samples_written = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._size = 0
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """Record one sample; missing channels are stored as 0."""
+        with self._lock:
+            i = self._head
+            self._ts[i] = timestamp
+            for name, col in self._cont.items():
+                col[i] = float(values.get(name) or 0)
+            for name, col in self._disc.items():
+                col[i] = int(values.get(name) or 0)
+            self._head = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.samples_written += 1
+
+    def span(self) -> Optional[tuple]:
+        """(oldest, newest) timestamp held, or None when empty."""
+        with self._lock:
+            if not self._size:
+                return None
+            return self._ts[self._slot(0)], self._ts[self._slot(self._size - 1)]
+
+    def _slot(self, k: int) -> int:
+        """Physical index of the k-th oldest sample (lock held)."""
+        return (self._head - self._size + k) % self.capacity
+
+    def interpolate(self, timestamps: Sequence[float]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Sample the ring at each timestamp (ascending). Entries outside the
+        ring's span are None. One bisect for the first timestamp, then a
+        forward walk: O(len(ring) + len(timestamps)) worst case.
+        """
+        out: List[Optional[Dict[str, Any]]] = []
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return [None] * len(timestamps)
+            ts = [self._ts[self._slot(k)] for k in range(n)]
+            k = 0
+            for t in timestamps:
+                if t < ts[0] or t > ts[-1]:
+                    out.append(None)
+                    continue
+                if k == 0 or ts[k] > t:
+                    k = max(0, bisect.bisect_right(ts, t) - 1)
+                while k + 1 < n and ts[k + 1] <= t:
+                    k += 1
+                a = self._slot(k)
+                b = self._slot(min(k + 1, n - 1))
+                span = ts[min(k + 1, n - 1)] - ts[k]
+                frac = (t - ts[k]) / span if span > 0 else 0.0
+
+                sample: Dict[str, Any] = {}
+                for name, col in self._cont.items():
+                    va, vb = col[a], col[b]
+                    if name in WRAPPING_CHANNELS and abs(vb - va) > 0.5:
+                        # Crossed the start/finish line between samples
+                        vb += 1.0 if vb < va else -1.0
+                        sample[name] = (va + (vb - va) * frac) % 1.0
+                    else:
+                        sample[name] = va + (vb - va) * frac
+                for name, col in self._disc.items():
+                    sample[name] = col[a]
+                out.append(sample)
+        return out
+
+    def get_stats(self) -> dict:
+        span = self.span()
+        return {
+            'rate_hz': self.rate_hz,
+            'samples': self._size,
+            'capacity': self.capacity,
+            'seconds': round(span[1] - span[0], 1) if span else 0,
+            'samples_written': self.samples_written,
+        }
+
+
+class PlayerTelemetrySampler:
+    """
+    Background thread recording iRacing ticks into a TelemetryRing,
+    decimated to the ring's rate_hz (every tick at 60Hz).
+    """
+
+    def __init__(self, ring: TelemetryRing, poll_hz: float = 120):
+        self.ring = ring
+        self.poll_interval = 1.0 / poll_hz
+        self.tick_step = IRACING_TICK_HZ / ring.rate_hz
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._ir = None
+        self._last_tick = None
+        self._next_tick = None
+
+    def start(self):
+        if self.running:
+            return
+        if not IRSDK_AVAILABLE:
+            logger.warning("⚠️ pyirsdk not available — high-rate clip telemetry disabled")
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name='TelemetrySampler')
+        self.thread.start()
+        logger.info(f"📈 Player telemetry ring: {self.ring.rate_hz:.0f}Hz, {self.ring.capacity} samples")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self._ir:
+            self._ir.shutdown()
+            self._ir = None
+
+    def _run(self):
+        self._ir = irsdk.IRSDK()
+        while self.running:
+            try:
+                if not self._ir.is_initialized or not self._ir.is_connected:
+                    self._last_tick = None
+                    self._next_tick = None
+                    if not self._ir.startup():
+                        time.sleep(1.0)
+                        continue
+                self._sample()
+            except Exception as e:
+                throttled.error('sample', "Telemetry sampler error: %s", e)
+                time.sleep(0.5)
+            time.sleep(self.poll_interval)
+
+    def _sample(self):
+        """Record the current tick if it is new and due (iRacing updates at 60Hz)."""
+        ir = self._ir
+        ir.freeze_var_buffer_latest()
+        try:
+            tick = ir['SessionTick']
+            if tick is None or tick == self._last_tick:
+                return
+            if self._last_tick is not None and tick < self._last_tick:
+                self._next_tick = None  # New session: SessionTick restarted
+            self._last_tick = tick
+            if self._next_tick is not None and tick < self._next_tick:
+                return
+            # Step from the due tick so fractional steps (60/25 = 2.4) average out to
+            # rate_hz; resync after a gap instead of bursting to catch up
+            if self._next_tick is None or tick - self._next_tick >= self.tick_step:
+                self._next_tick = tick + self.tick_step
+            else:
+                self._next_tick += self.tick_step
+            values = {name: ir[var] for name, var in CONTINUOUS_CHANNELS + DISCRETE_CHANNELS}
+        finally:
+            ir.unfreeze_var_buffer_latest()
+        self.ring.append(time.time(), values)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+OBB Replay Intelligence — Columnar Telemetry Sidecar (.obbt)
+
+Compact replacement for the `_telemetry.json` clip sidecar (a JSON array
+of per-sample dicts). One small JSON header describes the clip and its
+channels, followed by one little-endian typed array per channel. The
+browser player can fetch the file as a single ArrayBuffer and wrap each
+channel in a Float32Array / Int32Array view without parsing anything but
+the header.
+
+Layout:
+    0   4  magic b'OBBT'
+    4   2  u16 format version
+    6   2  u16 flags (bit 0: channels are zlib-compressed)
+    8   4  u32 header length
+    12  n  header JSON (utf-8), zero-padded so data starts 8-byte aligned
+    ..     channel data; each channel starts 8-byte aligned, offsets in
+           the header are relative to the start of the data section
+
+Header:
+    {"count": 450, "fps": 15, "t0_session_ms": 123456, "compressed": false,
+     "channels": [{"name": "t", "dtype": "<f4", "offset": 0, "nbytes": 1800,
+                   "raw_nbytes": 1800}, ...]}
+
+Channel names match the abbreviated keys of the JSON sidecar. Channel 't'
+is video time in seconds (monotonic) and is what random access bisects.
+Compression is per channel, so a reader can still decode one channel
+without inflating the rest.
+
+CLI:
+    python telemetry_sidecar.py convert clips/*_telemetry.json [--compress] [--delete-json]
+    python telemetry_sidecar.py info clips/abc_telemetry.obbt
+"""
+import argparse
+import bisect
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from clip_library import DB_FILENAME, ClipLibrary
+
+MAGIC = b'OBBT'
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x1
+PREAMBLE = struct.Struct('<4sHHI')
+ALIGN = 8
+SUFFIX = '_telemetry.obbt'
+
+# dtype (numpy / JS style) -> array typecode
+DTYPES = {
+    '<f8': 'd',
+    '<f4': 'f',
+    '<i4': 'i',
+    '<i2': 'h',
+    '<u2': 'H',
+    '<i1': 'b',
+    '<u1': 'B',
+}
+
+# (channel, dtype, TelemetrySample attribute or None for derived)
+CLIP_CHANNELS: List[Tuple[str, str, Optional[str]]] = [
+    ('t', '<f4', None),
+    ('st', '<i4', 'session_time_ms'),
+    ('spd', '<f4', 'speed'),
+    ('rpm', '<f4', 'rpm'),
+    ('gear', '<i1', 'gear'),
+    ('thr', '<f4', 'throttle'),
+    ('brk', '<f4', 'brake'),
+    ('str', '<f4', 'steering'),
+    ('fuel', '<f4', 'fuel_level'),
+    ('fuelPct', '<f4', 'fuel_pct'),
+    ('lap', '<i2', 'lap'),
+    ('dist', '<f4', 'lap_dist_pct'),
+    ('pos', '<u1', 'position'),
+    ('inc', '<u2', 'incident_count'),
+]
+CHANNEL_DTYPES = {name: dtype for name, dtype, _ in CLIP_CHANNELS}
+
+Columns = Dict[str, Tuple[str, Sequence]]
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def _to_array(dtype: str, values: Sequence) -> array:
+    code = DTYPES[dtype]
+    if code in 'fd':
+        arr = array(code, (float(v) for v in values))
+    else:
+        arr = array(code, (int(v) for v in values))
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+# ═══════════════════════════════════════
+# Writer
+# ═══════════════════════════════════════
+
+def encode_sidecar(columns: Columns, meta: Optional[Dict[str, Any]] = None,
+                   compress: bool = False) -> bytes:
+    """Serialize {name: (dtype, values)} (all the same length) to .obbt bytes."""
+    counts = {len(values) for _, values in columns.values()}
+    if len(counts) > 1:
+        raise ValueError(f"Channels have different lengths: {sorted(counts)}")
+
+    blobs, channels, offset = [], [], 0
+    for name, (dtype, values) in columns.items():
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype for channel {name}: {dtype}")
+        raw = _to_array(dtype, values).tobytes()
+        data = zlib.compress(raw, 6) if compress else raw
+        channels.append({
+            'name': name,
+            'dtype': dtype,
+            'offset': offset,
+            'nbytes': len(data),
+            'raw_nbytes': len(raw),
+        })
+        padding = b'\0' * _pad(len(data))
+        blobs.append(data + padding)
+        offset += len(data) + len(padding)
+
+    header = dict(meta or {})
+    header.update({
+        'count': counts.pop() if counts else 0,
+        'compressed': compress,
+        'channels': channels,
+    })
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b'\0' * _pad(PREAMBLE.size + len(header_bytes))
+    preamble = PREAMBLE.pack(MAGIC, FORMAT_VERSION, FLAG_ZLIB if compress else 0, len(header_bytes))
+    return preamble + header_bytes + b''.join(blobs)
+
+
+def write_sidecar(path: Union[str, Path], columns: Columns,
+                  meta: Optional[Dict[str, Any]] = None, compress: bool = False) -> int:
+    """Write a sidecar file. Returns its size in bytes."""
+    data = encode_sidecar(columns, meta, compress)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def columns_from_samples(samples: Sequence[Any], fps: float) -> Columns:
+    """Per-channel columns from TelemetrySample objects, one per video frame."""
+    columns: Columns = {'t': ('<f4', [i / fps for i in range(len(samples))])}
+    for name, dtype, attr in CLIP_CHANNELS:
+        if attr:
+            columns[name] = (dtype, [getattr(s, attr) for s in samples])
+    return columns
+
+
+def write_clip_sidecar(path: Union[str, Path], samples: Sequence[Any], fps: float,
+                       compress: bool = False) -> int:
+    """Write the columnar telemetry sidecar for a clip's per-frame samples."""
+    meta = {
+        'fps': fps,
+        't0_session_ms': samples[0].session_time_ms if samples else 0,
+    }
+    return write_sidecar(path, columns_from_samples(samples, fps), meta, compress)
+
+
+# ═══════════════════════════════════════
+# Reader
+# ═══════════════════════════════════════
+
+class SidecarReader:
+    """
+    Random-access reader. Channels are decoded lazily, one at a time.
+
+    Usage:
+        sidecar = SidecarReader.open('abc_telemetry.obbt')
+        sidecar.channel('spd')          # array('f', [...])
+        sidecar.sample_at(4.2)          # {'t': 4.2, 'spd': 51.3, ...}
+        sidecar.slice(2.0, 5.0)         # {'t': [...], 'spd': [...], ...}
+    """
+
+    def __init__(self, data: bytes):
+        if len(data) < PREAMBLE.size:
+            raise ValueError("Not a telemetry sidecar (too short)")
+        magic, version, flags, header_len = PREAMBLE.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a telemetry sidecar (bad magic)")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported sidecar version {version}")
+        self.version = version
+        self.compressed = bool(flags & FLAG_ZLIB)
+        header_end = PREAMBLE.size + header_len
+        self.header: Dict[str, Any] = json.loads(data[PREAMBLE.size:header_end].rstrip(b'\0'))
+        self.count: int = self.header['count']
+        self._data = memoryview(data)[header_end:]
+        self._specs = {c['name']: c for c in self.header['channels']}
+        self._cache: Dict[str, array] = {}
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> 'SidecarReader':
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self._specs)
+
+    @property
+    def fps(self) -> float:
+        return self.header.get('fps', 0)
+
+    def channel(self, name: str) -> array:
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+        spec = self._specs[name]
+        raw = self._data[spec['offset']:spec['offset'] + spec['nbytes']]
+        raw = zlib.decompress(raw) if self.compressed else bytes(raw)
+        arr = array(DTYPES[spec['dtype']])
+        arr.frombytes(raw)
+        if sys.byteorder == 'big':
+            arr.byteswap()
+        self._cache[name] = arr
+        return arr
+
+    def index_at(self, video_time_s: float) -> int:
+        """Index of the last sample at or before video_time_s (clamped)."""
+        if self.count == 0:
+            raise IndexError("Empty sidecar")
+        i = bisect.bisect_right(self.channel('t'), video_time_s) - 1
+        return min(max(i, 0), self.count - 1)
+
+    def sample_at(self, video_time_s: float, channels: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        i = self.index_at(video_time_s)
+        return {name: self.channel(name)[i] for name in (channels or self.channels)}
+
+    def slice(self, start_s: float, end_s: float,
+              channels: Optional[Iterable[str]] = None) -> Dict[str, List]:
+        """All samples with start_s <= t < end_s."""
+        t = self.channel('t')
+        lo = bisect.bisect_left(t, start_s)
+        hi = bisect.bisect_left(t, end_s)
+        return {name: self.channel(name)[lo:hi].tolist() for name in (channels or self.channels)}
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Row-oriented view, matching the legacy JSON sidecar."""
+        columns = {name: self.channel(name) for name in self.channels}
+        return [{name: col[i] for name, col in columns.items()} for i in range(self.count)]
+
+
+# ═══════════════════════════════════════
+# Converter
+# ═══════════════════════════════════════
+
+def columns_from_records(records: List[Dict[str, Any]]) -> Columns:
+    """Columns from legacy JSON sidecar rows; unknown keys are stored as float32."""
+    names: List[str] = []
+    for record in records:
+        for key in record:
+            if key not in names:
+                names.append(key)
+    return {
+        name: (CHANNEL_DTYPES.get(name, '<f4'), [r.get(name) or 0 for r in records])
+        for name in names
+    }
+
+
+def legacy_fps(json_path: Path, records: List[Dict[str, Any]]) -> Optional[float]:
+    """
+    Frame rate of a legacy JSON sidecar: telemetry_sync.fps from the clip's
+    metadata JSON when present, else the mean over the full span of `t`
+    (t is rounded to 1ms, so adjacent samples alone give e.g. 14.925 for 15fps).
+    """
+    name = json_path.name
+    if name.endswith('_telemetry.json'):
+        meta_path = json_path.with_name(name[:-len('_telemetry.json')] + '.json')
+        try:
+            with open(meta_path) as f:
+                fps = json.load(f).get('telemetry_sync', {}).get('fps')
+            if fps:
+                return fps
+        except (OSError, ValueError, AttributeError):
+            pass
+    if len(records) >= 2:
+        span = (records[-1].get('t') or 0) - (records[0].get('t') or 0)
+        if span > 0:
+            return round((len(records) - 1) / span, 3)
+    return None
+
+
+def convert_json_sidecar(json_path: Union[str, Path], out_path: Union[str, Path, None] = None,
+                         compress: bool = False) -> Path:
+    """Convert a legacy `_telemetry.json` sidecar. Returns the .obbt path."""
+    json_path = Path(json_path)
+    if out_path is None:
+        name = json_path.name
+        stem = name[:-len('_telemetry.json')] if name.endswith('_telemetry.json') else json_path.stem
+        out_path = json_path.with_name(stem + SUFFIX)
+    with open(json_path) as f:
+        records = json.load(f)
+
+    meta: Dict[str, Any] = {}
+    fps = legacy_fps(json_path, records)
+    if fps:
+        meta['fps'] = fps
+    if records:
+        meta['t0_session_ms'] = records[0].get('st', 0)
+    write_sidecar(out_path, columns_from_records(records), meta, compress)
+    return Path(out_path)
+
+
+def update_clip_index(json_path: Path, json_deleted: bool,
+                      libraries: Dict[Path, Optional[ClipLibrary]]):
+    """
+    After converting a clip's sidecar, point its metadata JSON
+    (telemetry_sync.sidecars) at the files that now exist and re-stat the
+    clip in the directory's ClipLibrary, if the directory has one.
+    """
+    name = json_path.name
+    if not name.endswith('_telemetry.json'):
+        return
+    clip_id = name[:-len('_telemetry.json')]
+    meta_path = json_path.with_name(clip_id + '.json')
+    metadata = None
+    try:
+        with open(meta_path) as f:
+            metadata = json.load(f)
+        sync = metadata.setdefault('telemetry_sync', {})
+        sync['sidecars'] = ([] if json_deleted else ['json']) + ['columnar']
+        tmp_path = meta_path.with_name(meta_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, meta_path)
+    except (OSError, ValueError, AttributeError):
+        metadata = None
+
+    clip_dir = json_path.parent
+    if clip_dir not in libraries:
+        # Never create an index in a directory that doesn't have one
+        has_db = (clip_dir / DB_FILENAME).is_file()
+        libraries[clip_dir] = ClipLibrary(str(clip_dir)) if has_db else None
+    if libraries[clip_dir] is not None:
+        libraries[clip_dir].refresh_files(clip_id, metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar telemetry sidecar tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convert', help='Convert _telemetry.json sidecars to .obbt')
+    convert.add_argument('paths', nargs='+', help='JSON sidecar files')
+    convert.add_argument('--compress', action='store_true', help='zlib-compress channels')
+    convert.add_argument('--delete-json', action='store_true', help='Remove the JSON after converting')
+
+    info = sub.add_parser('info', help='Print a sidecar header')
+    info.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        reader = SidecarReader.open(args.path)
+        print(json.dumps(reader.header, indent=2))
+        return
+
+    total_in = total_out = 0
+    libraries: Dict[Path, Optional[ClipLibrary]] = {}
+    for path in map(Path, args.paths):
+        try:
+            out = convert_json_sidecar(path, compress=args.compress)
+        except (OSError, ValueError) as e:
+            print(f"  ✗ {path.name}: {e}")
+            continue
+        size_in, size_out = path.stat().st_size, out.stat().st_size
+        total_in += size_in
+        total_out += size_out
+        print(f"  ✓ {path.name}: {size_in / 1024:.1f}KB → {size_out / 1024:.1f}KB")
+        if args.delete_json:
+            path.unlink()
+        update_clip_index(path, args.delete_json, libraries)
+
+    for library in libraries.values():
+        if library is not None:
+            library.close()
+
+    if total_in:
+        print(f"Converted {total_in / 1024:.1f}KB → {total_out / 1024:.1f}KB "
+              f"({100 * total_out / total_in:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
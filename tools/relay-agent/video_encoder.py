@@ -6,30 +6,32 @@ import base64
 import logging
 import time
 import threading
-import cv2
-import numpy as np
-
-try:
-    import mss
-    MSS_AVAILABLE = True
-except ImportError:
-    MSS_AVAILABLE = False
 
 import config
+from adaptive_video import AdaptiveVideoController
+from capture_source import MSS_AVAILABLE, CV2_AVAILABLE, CaptureSource, LatestFrame
+from ffmpeg_pipe import find_ffmpeg
+from live_stream import H264LiveStream
+from log_throttle import RateLimitedLogger
 
 logger = logging.getLogger(__name__)
+throttled = RateLimitedLogger(logger)
 
 class VideoEncoder:
     """
     Captures SCREEN video and streams compressed frames to dashboard.
-    Uses mss for fast screen capture.
+    Frames come from a CaptureSource, shared with ScreenCapture when both
+    are given the same source.
     """
     
-    def __init__(self, client):
+    def __init__(self, client, source: CaptureSource = None):
         self.client = client
         self.running = False
         self.thread = None
-        self.sct = None
+        self.monitor_index = 1  # Primary monitor (1-indexed in mss)
+        self.source = source or CaptureSource(monitor_index=self.monitor_index)
+        self._consumer = None
+        self._mailbox = LatestFrame()
         
         # Stats
         self.frames_sent = 0
@@ -40,78 +42,153 @@ class VideoEncoder:
         self.height = config.VIDEO_HEIGHT
         self.quality = config.VIDEO_QUALITY
         self.fps = config.VIDEO_FPS
-        self.monitor_index = 1  # Primary monitor (1-indexed in mss)
+        
+        # Congestion control: fps / resolution / quality follow the uplink
+        self.controller = AdaptiveVideoController(
+            fps=self.fps,
+            width=self.width,
+            height=self.height,
+            quality=self.quality,
+            diff_threshold=config.VIDEO_DIFF_THRESHOLD,
+            enabled=config.VIDEO_ADAPTIVE,
+        )
+        self.operating_point = self.controller.operating_point
+        self.on_operating_point = None  # Callback(dict) when the operating point changes
+        
+        # Optional H.264 mode: ffmpeg stream chunks instead of per-frame JPEGs
+        self.mode = config.VIDEO_MODE
+        self.stream = None
         
     def start(self):
-        """Start screen capture thread"""
+        """Start streaming frames from the capture source"""
         if self.running:
             return
         
         if not MSS_AVAILABLE:
             logger.error("❌ mss not installed. Run: pip install mss")
             return
+        if not CV2_AVAILABLE:
+            logger.error("❌ opencv not installed. Run: pip install opencv-python")
+            return
             
         logger.info("🎥 Starting Screen Capture...")
+        if self.mode == 'h264':
+            if config.VIDEO_H264_EXPERIMENTAL:
+                self._start_stream()
+            else:
+                # The server doesn't relay video_chunk yet; chunks would go nowhere
+                logger.warning("⚠️ VIDEO_MODE=h264 is experimental (set VIDEO_H264_EXPERIMENTAL=true) — using JPEG frames")
+        
         self.running = True
         self.start_time = time.time()
         
-        # Start capture thread
-        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        # Encode + send on our own thread; the grab thread only drops
+        # frames into the mailbox (a slow send skips frames, never stalls grabs)
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
         self.thread.start()
+        self._consumer = self.source.add_consumer('live', self.fps, self._mailbox.put)
         
     def stop(self):
         """Stop screen capture"""
         self.running = False
+        if self._consumer:
+            self.source.remove_consumer(self._consumer)
+            self._consumer = None
         if self.thread:
             self.thread.join(timeout=1.0)
+        if self.stream:
+            self.stream.stop()
+            self.stream = None
             
+        throttled.flush()
         logger.info(f"Screen Capture stopped. Frames sent: {self.frames_sent}")
 
-    def _capture_loop(self):
-        """Main capture loop - captures primary monitor"""
-        frame_interval = 1.0 / self.fps
-        last_frame_time = 0
-        
-        with mss.mss() as sct:
-            # Get monitor info (monitor 1 = primary, 0 = all monitors combined)
-            monitor = sct.monitors[self.monitor_index]
-            logger.info(f"✅ Capturing monitor {self.monitor_index}: {monitor['width']}x{monitor['height']}")
+    def _send_loop(self):
+        """Encode the newest grabbed frame and send it"""
+        while self.running:
+            frame = self._mailbox.get(timeout=0.5)
+            if frame is None:
+                continue
             
-            while self.running:
-                # Rate limiting
-                now = time.time()
-                if now - last_frame_time < frame_interval:
-                    time.sleep(0.005)
+            try:
+                op = self.controller.update(self.client.send_backlog())
+                if op != self.operating_point:
+                    self._apply_operating_point(op)
+                
+                if self.stream:
+                    # H.264: ffmpeg does the inter-frame compression
+                    if self.stream.write(frame):
+                        self.frames_sent += 1
                     continue
                 
-                last_frame_time = now
+                # Nothing moved on screen (menus, paused replay): don't resend it
+                if self.controller.should_skip(frame):
+                    continue
                 
-                try:
-                    # Capture screen
-                    screenshot = sct.grab(monitor)
-                    
-                    # Convert to numpy array (BGRA format)
-                    frame = np.array(screenshot)
-                    
-                    # Convert BGRA to BGR (remove alpha channel)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    
-                    # Resize for bandwidth efficiency
-                    frame = cv2.resize(frame, (self.width, self.height))
-                    
-                    # Encode to JPEG
-                    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
-                    _, buffer = cv2.imencode('.jpg', frame, encode_param)
-                    
-                    # Convert to bytes (Binary Mode - No Base64 overhead)
-                    # This reduces payload size by ~33%
-                    jpeg_bytes = buffer.tobytes()
+                # Resize + JPEG encode (shared with other consumers at the same size/quality)
+                buffer = frame.jpeg(op.width, op.height, op.quality)
+                if buffer is None:
+                    continue
+                
+                # Convert to bytes (Binary Mode - No Base64 overhead)
+                # This reduces payload size by ~33%
+                jpeg_bytes = buffer.tobytes()
+                
+                # Send via client (Binary); acks feed the controller's RTT.
+                # No ack callback once the server has shown it doesn't ack:
+                # the Socket.IO client would hold every pending callback forever
+                seq = self.controller.on_sent()
+                on_ack = (lambda seq=seq: self.controller.on_ack(seq)) if self.controller.wants_ack() else None
+                if self.client.send_video_frame(jpeg_bytes, on_ack=on_ack):
+                    self.frames_sent += 1
                     
-                    # Send via client (Binary)
-                    if self.client.send_video_frame(jpeg_bytes):
-                        self.frames_sent += 1
-                        
-                except Exception as e:
-                    logger.error(f"Screen capture error: {e}")
-                    time.sleep(0.5)
+            except Exception as e:
+                throttled.error('video_capture', "Screen capture error: %s", e)
+                time.sleep(0.5)
+
+    def _start_stream(self):
+        """Start the H.264 encoder, falling back to JPEG frames without ffmpeg"""
+        ffmpeg_path = find_ffmpeg()
+        if not ffmpeg_path:
+            logger.warning("⚠️ VIDEO_MODE=h264 needs FFmpeg — falling back to JPEG frames")
+            return
+        stream = H264LiveStream(
+            ffmpeg_path,
+            send_chunk=self.client.send_video_chunk,
+            container=config.VIDEO_H264_CONTAINER,
+            chunk_ms=config.VIDEO_CHUNK_MS,
+            codec=config.VIDEO_H264_CODEC,
+            crf=config.VIDEO_H264_CRF,
+        )
+        op = self.operating_point
+        if stream.start(op.width, op.height, op.fps, self._crf_for(op)):
+            self.stream = stream
+            # Static frames cost almost nothing in H.264; keep the cadence steady
+            self.controller.diff_threshold = 0
+
+    def _crf_for(self, op) -> int:
+        """Map a rung's JPEG quality drop onto the x264 CRF scale"""
+        return config.VIDEO_H264_CRF + (self.controller.ladder[0].quality - op.quality) // 5
+
+    def _apply_operating_point(self, op):
+        """Switch the live feed to a new rung of the quality ladder"""
+        self.operating_point = op
+        if self._consumer:
+            self._consumer.fps = op.fps  # Source re-decimates on the next grab
+        if self.stream:
+            self.stream.restart(op.width, op.height, op.fps, self._crf_for(op))
+        if self.on_operating_point:
+            try:
+                self.on_operating_point(op.to_dict())
+            except Exception as e:
+                logger.debug(f"Operating point callback failed: {e}")
 
+    def get_stats(self) -> dict:
+        """Current operating point plus link / skip counters"""
+        stats = self.controller.get_stats()
+        stats['frames_delivered'] = self.frames_sent
+        stats['frames_replaced'] = self._mailbox.replaced
+        stats['mode'] = 'h264' if self.stream else 'jpeg'
+        if self.stream:
+            stats['stream'] = self.stream.get_stats()
+        return stats